@@ -1,18 +1,13 @@
-from flask import Flask, request, jsonify, render_template_string, send_from_directory
+# First, so the start-up clock also covers the imports below
+from startup import STARTUP
+from flask import Flask, request, jsonify, render_template_string, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-import json
+from selenium.common.exceptions import WebDriverException
 import time
 import os
 import tempfile
 import uuid
 import shutil
-import glob
 import random
 import requests
 import ssl
@@ -20,6 +15,35 @@ import urllib3
 from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 import logging
+import copy
+import itertools
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
+
+import config
+import metrics
+import page_scripts
+from batch import BatchRunner, BrowserSlots
+from cache import BYPASS as CACHE_BYPASS, HIT as CACHE_HIT, MISS as CACHE_MISS, REVALIDATED as CACHE_REVALIDATED
+from cache import ResponseCache, cache_key
+from chrome_watchdog import Watchdog
+from cdp_engine import CdpBrowser, CdpError, PageDriver, TabsBusy
+from crawler import Crawler, CrawlScope, RobotsCache, make_seen_set
+from driver_pool import DriverPool, DriverStartError, PoolTimeout
+from host_limiter import HostBusy, HostLimiter, RequestSlot, parse_retry_after
+from http_client import HttpClient
+from jobs import SUCCEEDED, JobFailed, JobManager, QueueFull
+from metrics import PhaseTimer, server_timing
+from recipes import RecipeError, RecipeRegistry, validate_css
+from resource_policy import ResourcePolicy, parse_list
+from response_format import NDJSON, ResponseFormat
+from result_store import ResultStore, nest
+from retry_policy import BROWSER_CRASHED, UNKNOWN, CircuitBreakers, RetryPolicy, classify, http_error, unreachable_error
+from wait_strategies import MUTATION_QUIESCENCE_JS, WaitStrategy
+from task_queue import open_task_queue, wait_for
+from static_engine import (CONTENT_TAG_WEIGHTS, DEFAULT_LIMITS, MIN_SCORED_BLOCK_LENGTH, NEGATIVE_HINTS,
+                           POSITIVE_HINTS, TEXT_BLOCK_TAGS, StaticScraper, is_html_response, preload_parsers)
 
 # Disable SSL warnings for problematic sites
 urllib3.disable_warnings(InsecureRequestWarning)
@@ -31,10 +55,59 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Prometheus-style metrics exposed on /api/metrics
+PHASE_SECONDS = metrics.REGISTRY.histogram(
+    'scraper_phase_seconds', 'Time spent in each scrape phase', ['phase'])
+SCRAPES_TOTAL = metrics.REGISTRY.counter(
+    'scraper_scrapes_total', 'Scrapes by serving engine and outcome', ['engine', 'outcome'])
+PAGE_LOAD_RETRIES = metrics.REGISTRY.counter(
+    'scraper_page_load_retries_total', 'Retried page loads in smart_get_page', ['reason'])
+PREFLIGHT_RETRIES = metrics.REGISTRY.counter(
+    'scraper_preflight_retries_total', 'Retried preflights after every URL variant failed', ['reason'])
+DRIVER_RESTARTS = metrics.REGISTRY.counter(
+    'scraper_driver_restarts_total', 'WebDriver restarts after connection errors')
+BROWSER_CONTEXTS_OPENED = metrics.REGISTRY.counter(
+    'scraper_browser_contexts_total', 'Browser contexts opened for scrapes')
+RESPONSE_BYTES = metrics.REGISTRY.counter(
+    'scraper_response_bytes_total', 'Scrape response bytes sent by format and content coding',
+    ['format', 'encoding'])
+
+# Hide the usual automation fingerprints; installed in every tab before page scripts run
+STEALTH_JS = """
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined,
+});
+
+Object.defineProperty(navigator, 'plugins', {
+    get: () => [1, 2, 3, 4, 5],
+});
+
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['en-US', 'en'],
+});
+
+window.chrome = {
+    runtime: {},
+};
+"""
+
+# Every scraper that may own a browser, pooled or not, for the watchdog to leave alone
+live_scrapers = weakref.WeakSet()
+
 class SmartWebScraper:
     def __init__(self):
+        live_scrapers.add(self)
         self.driver = None
+        self.driver_started_at = None
+        self.pages_served = 0
+        self.recycle_reason = None  # Set by the watchdog or the page limit; acted on between tasks
+        self.busy = False
         self.user_data_dir = None
+        self.last_timings = {}
+        self.last_wait_timed_out = False
+        self.blocked_urls = None
+        self.home_handle = None
+        self.context_id = None
         
     def get_random_user_agent(self):
         """Get a random realistic user agent"""
@@ -48,71 +121,94 @@ class SmartWebScraper:
     
     def test_url_smart(self, url):
         """Smart URL testing with HTTP/HTTPS fallback"""
-        logger.info(f"🔍 Smart testing URL: {url}")
+        working_url, response = self.fetch_url_smart(url, probe_only=True)
+        return working_url, response is not None
+    
+    def fetch_url_smart(self, url, extra_headers=None, probe_only=False, errors=None):
+        """Fetch a URL with HTTP/HTTPS fallback, returning (working_url, response)
         
-        # Create list of URLs to test
-        urls_to_test = []
+        The response is None when every variant failed; pass a list as errors
+        to collect the classified failure of each variant. extra_headers may add
+        conditional request headers, in which case a 304 also counts as success.
+        probe_only skips downloading the body when only the working URL matters.
+        Requests go through the shared pooled session, trying the scheme that
+        last worked for the host first and its cached redirect target directly.
+        """
+        logger.info(f"🔍 Smart testing URL: {url}")
         
-        if url.startswith('https://'):
-            urls_to_test.append(url)  # Try HTTPS first
-            urls_to_test.append(url.replace('https://', 'http://'))  # Then HTTP
-        elif url.startswith('http://'):
-            urls_to_test.append(url)  # Try HTTP first
-            urls_to_test.append(url.replace('http://', 'https://'))  # Then HTTPS
-        else:
-            # If no protocol specified, try both
-            urls_to_test.append(f"https://{url}")
-            urls_to_test.append(f"http://{url}")
+        # HTTPS/HTTP variants, the one known to work first
+        urls_to_test = preflight_client.candidate_urls(url)
         
         headers = {
             'User-Agent': self.get_random_user_agent(),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING,  # Only encodings we can decode
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
+        if extra_headers:
+            headers.update(extra_headers)
         
         for test_url in urls_to_test:
+            fetch_url = preflight_client.redirect_target(test_url) or test_url
             try:
-                logger.info(f"Testing: {test_url}")
-                response = requests.get(
-                    test_url, 
-                    headers=headers,
-                    timeout=15, 
-                    verify=False,  # Ignore SSL issues
-                    allow_redirects=True
-                )
+                logger.info(f"Testing: {fetch_url}")
+                with host_slot(fetch_url) as slot:
+                    response = preflight_client.get(fetch_url, headers=headers, timeout=15, probe=probe_only)
+                    slot.record(response.status_code, response.headers.get('Retry-After'))
                 
-                if response.status_code == 200:
-                    logger.info(f"✅ SUCCESS: {test_url} (Status: {response.status_code})")
-                    return test_url, True
+                if response.status_code == 200 or (extra_headers and response.status_code == 304):
+                    logger.info(f"✅ SUCCESS: {fetch_url} (Status: {response.status_code})")
+                    preflight_client.remember(test_url, response.url)
+                    return test_url, response
                 else:
-                    logger.warning(f"⚠️ {test_url} returned status: {response.status_code}")
+                    logger.warning(f"⚠️ {fetch_url} returned status: {response.status_code}")
+                    if errors is not None:
+                        errors.append(http_error(fetch_url, response.status_code,
+                                                 parse_retry_after(response.headers.get('Retry-After'))))
                     
+            except HostBusy:
+                raise
             except requests.exceptions.SSLError as e:
-                logger.warning(f"🔒 SSL error for {test_url}: {e}")
-                continue
+                logger.warning(f"🔒 SSL error for {fetch_url}: {e}")
+                if errors is not None:
+                    errors.append(classify(e))
             except requests.exceptions.Timeout as e:
-                logger.warning(f"⏰ Timeout for {test_url}: {e}")
-                continue
+                logger.warning(f"⏰ Timeout for {fetch_url}: {e}")
+                if errors is not None:
+                    errors.append(classify(e))
             except requests.exceptions.ConnectionError as e:
-                logger.warning(f"🔌 Connection error for {test_url}: {e}")
-                continue
+                logger.warning(f"🔌 Connection error for {fetch_url}: {e}")
+                if errors is not None:
+                    errors.append(classify(e))
             except Exception as e:
-                logger.warning(f"❌ Error testing {test_url}: {e}")
-                continue
+                logger.warning(f"❌ Error testing {fetch_url}: {e}")
+                if errors is not None:
+                    errors.append(classify(e))
+            
+            preflight_client.forget(test_url)
         
         logger.error(f"❌ All URL variants failed for: {url}")
-        return url, False
+        return url, None
     
     def setup_smart_driver(self, headless=True):
         """Setup Chrome WebDriver with smart configuration"""
+        # Deferred so workers start without paying for the WebDriver client
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        
         chrome_options = Options()
         
         if headless:
             chrome_options.add_argument("--headless=new")
         
+        # Return from navigation at DOMContentLoaded; wait strategies decide the rest
+        chrome_options.page_load_strategy = 'eager'
+        
+        # CDP Network events for the network-idle wait strategy
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        
         # Generate unique user data directory
         unique_id = uuid.uuid4().hex[:8]
         self.user_data_dir = f"/tmp/chrome_smart_{unique_id}"
@@ -158,7 +254,6 @@ class SmartWebScraper:
         chrome_options.add_argument("--disable-background-networking")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-plugins")
-        chrome_options.add_argument("--disable-images")  # Faster loading
         chrome_options.add_argument("--window-size=1366,768")
         chrome_options.add_argument(f"--user-agent={self.get_random_user_agent()}")
         
@@ -167,9 +262,6 @@ class SmartWebScraper:
             "profile.default_content_setting_values": {
                 "notifications": 2,
                 "media_stream": 2,
-            },
-            "profile.managed_default_content_settings": {
-                "images": 2
             }
         }
         chrome_options.add_experimental_option("prefs", prefs)
@@ -190,48 +282,25 @@ class SmartWebScraper:
                 break
         
         try:
-            # Clean up old directories
-            self.cleanup_temp_dirs()
-            
-            # Initialize Chrome
+            # Initialize Chrome (stale profiles are reaped by the watchdog, off the request path)
             self.driver = webdriver.Chrome(options=chrome_options)
+            self.home_handle = self.driver.current_window_handle
+            self.context_id = None
             
             # Set timeouts
             self.driver.set_page_load_timeout(45)
             self.driver.implicitly_wait(10)
             
-            # Execute stealth JavaScript
-            stealth_js = """
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-            
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-            
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en'],
-            });
-            
-            window.chrome = {
-                runtime: {},
-            };
-            """
-            
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': stealth_js
-            })
+            self.prepare_tab()
             
-            # Test basic navigation
-            try:
-                logger.info("Testing smart WebDriver...")
-                self.driver.get("data:text/html,<html><body><h1>Smart Test</h1></body></html>")
-                logger.info("✅ Smart WebDriver test passed")
-            except Exception as e:
-                logger.warning(f"Smart WebDriver test failed: {e}")
+            # A script round trip proves the browser answers; no navigation needed
+            if not self.is_responsive():
+                logger.warning("Smart WebDriver did not answer its first command")
             
             logger.info(f"✅ Smart WebDriver initialized: {self.user_data_dir}")
+            self.driver_started_at = time.time()
+            self.pages_served = 0
+            self.recycle_reason = None
             return True
             
         except Exception as e:
@@ -239,82 +308,177 @@ class SmartWebScraper:
             self.cleanup_current_session()
             return False
     
-    def smart_get_page(self, url, max_retries=3):
-        """Smart page loading with automatic HTTP/HTTPS fallback"""
+    def prepare_tab(self):
+        """Install the stealth script in the current tab; its resource blocklist starts empty"""
+        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_JS})
+        self.blocked_urls = None
+    
+    def is_responsive(self):
+        """Whether the browser still answers commands"""
+        try:
+            return self.driver is not None and self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+    
+    def open_context(self):
+        """Switch to a new tab in a fresh browser context (own cookies, storage and cache)
+        
+        Contexts live inside the running Chrome, so a clean slate costs
+        milliseconds instead of a browser relaunch. Returns False if the
+        context could not be created; the page then loads in the current tab.
+        """
+        self.close_context()
+        try:
+            context_id = self.driver.execute_cdp_cmd('Target.createBrowserContext', {})['browserContextId']
+            self.context_id = context_id
+            target_id = self.driver.execute_cdp_cmd('Target.createTarget', {
+                'url': 'about:blank',
+                'browserContextId': context_id,
+            })['targetId']
+            self.driver.switch_to.window(target_id)
+            self.prepare_tab()
+        except WebDriverException as e:
+            logger.warning(f"Could not open a browser context: {e}")
+            self.close_context()
+            return False
+        
+        BROWSER_CONTEXTS_OPENED.inc()
+        return True
+    
+    def close_context(self):
+        """Dispose of the current browser context and its tab, back in the home tab"""
+        if self.context_id is None or self.driver is None:
+            return
+        context_id, self.context_id = self.context_id, None
+        try:
+            self.driver.switch_to.window(self.home_handle)
+            self.blocked_urls = None
+            self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+        except Exception as e:
+            logger.warning(f"Could not dispose of browser context {context_id}: {e}")
+    
+    def smart_get_page(self, url, max_retries=None, working_url=None, wait=None, humanize=False, resources=None,
+                       deadline=None):
+        """Smart page loading with automatic HTTP/HTTPS fallback
+        
+        Pass working_url when a preflight already resolved the URL to skip
+        testing it again. The page counts as loaded once the wait strategy
+        says it is ready; human-like pauses and scrolling only happen when
+        humanize is set. resources is the ResourcePolicy of subresources not
+        to download. Per-phase durations end up in self.last_timings.
+        Only transient failures are retried, with jittered back-off and never
+        past deadline (a time.time() value); the last failure is re-raised.
+        """
         
         # First, find the working URL
-        working_url, is_accessible = self.test_url_smart(url)
+        if working_url is None:
+            working_url, _ = preflight(url, probe_only=True, deadline=deadline)
         
-        if not is_accessible:
-            raise Exception(f"URL {url} is not accessible via HTTP or HTTPS")
+        policy = page_load_policy(max_retries, deadline)
+        max_retries = policy.max_attempts
+        if wait is None:
+            wait = WaitStrategy(config.WAIT_STRATEGY, timeout=config.WAIT_TIMEOUT)
+        if resources is None:
+            resources = DEFAULT_RESOURCE_POLICY
         
         logger.info(f"🎯 Using working URL: {working_url}")
         
         for attempt in range(max_retries):
             try:
                 logger.info(f"Smart attempt {attempt + 1}/{max_retries}: Loading {working_url}")
+                if config.BROWSER_CONTEXTS:
+                    self.open_context()
+                timings = {}
+                self.last_timings = timings
+                self.last_wait_timed_out = False
                 
                 # Random delay before navigation (human-like)
-                time.sleep(random.uniform(1, 3))
+                if humanize:
+                    phase_start = time.time()
+                    time.sleep(random.uniform(1, 3))
+                    timings["jitter_before"] = round(time.time() - phase_start, 3)
                 
                 # Navigate to the working URL
-                self.driver.get(working_url)
+                self.apply_resource_policy(resources)
+                wait.before_navigation(self.driver)
+                phase_start = time.time()
+                with host_slot(working_url) as slot:
+                    self.driver.get(working_url)
+                    # WebDriver exposes no response headers, so throttling comes without Retry-After
+                    status = self.document_status()
+                    slot.record(status)
+                timings["navigate"] = round(time.time() - phase_start, 3)
+                if status is not None and status >= 400:
+                    raise http_error(working_url, status)
                 
-                # Wait for page to load
-                WebDriverWait(self.driver, 25).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                
-                # Additional wait for dynamic content
-                time.sleep(random.uniform(2, 4))
+                # Wait until the page is ready rather than for a fixed time
+                phase_start = time.time()
+                self.last_wait_timed_out = not wait.wait(self.driver)
+                timings[f"wait_{wait.kind}"] = round(time.time() - phase_start, 3)
                 
                 # Simulate human behavior
-                try:
-                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/3);")
-                    time.sleep(1)
-                    self.driver.execute_script("window.scrollTo(0, 0);")
-                except:
-                    pass
+                if humanize:
+                    phase_start = time.time()
+                    time.sleep(random.uniform(2, 4))
+                    try:
+                        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/3);")
+                        time.sleep(1)
+                        self.driver.execute_script("window.scrollTo(0, 0);")
+                    except:
+                        pass
+                    timings["jitter_after"] = round(time.time() - phase_start, 3)
                 
-                # Verify page loaded properly
-                page_source = self.driver.page_source
-                if len(page_source) < 200:
+                # Verify page loaded properly without shipping the whole source over the wire
+                phase_start = time.time()
+                page_length = self.driver.execute_script(
+                    "return document.documentElement ? document.documentElement.outerHTML.length : 0;"
+                )
+                timings["verify"] = round(time.time() - phase_start, 3)
+                if page_length < 200:
                     raise Exception("Page appears to be empty or not fully loaded")
                 
-                logger.info(f"✅ Successfully loaded: {working_url}")
+                logger.info(f"✅ Successfully loaded: {working_url} {timings}")
                 return True
                 
-            except TimeoutException:
-                logger.warning(f"Timeout on attempt {attempt + 1}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(3, 6))
-                    continue
-                else:
-                    raise TimeoutException(f"Failed to load {working_url} after {max_retries} attempts")
-                    
-            except WebDriverException as e:
-                error_str = str(e)
-                logger.warning(f"WebDriver error on attempt {attempt + 1}: {error_str}")
-                
-                if any(err in error_str for err in ["ERR_CONNECTION_REFUSED", "ERR_CONNECTION_CLOSED", "net::"]):
-                    if attempt < max_retries - 1:
-                        logger.info("Restarting WebDriver due to connection error...")
-                        self.close()
-                        time.sleep(random.uniform(3, 6))
-                        self.setup_smart_driver()
-                        continue
-                    else:
-                        raise Exception(f"Persistent connection issues: {error_str}")
-                else:
-                    raise
-                    
             except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(2, 5))
-                    continue
-                else:
+                error = classify(e)
+                logger.warning(f"Attempt {attempt + 1}/{max_retries} failed [{error.code}]: {e}")
+                if not policy.should_retry(error, attempt):
                     raise
+                PAGE_LOAD_RETRIES.inc(reason=error.code)
+                
+                if error.code == BROWSER_CRASHED or not self.is_responsive():
+                    logger.info("Restarting WebDriver; the browser stopped responding...")
+                    DRIVER_RESTARTS.inc()
+                    self.close()
+                    self.setup_smart_driver()
+                # Otherwise the host failed us, not the browser: the host limiter has
+                # already narrowed its window, so just back off and try again
+                policy.sleep()
+    
+    @property
+    def current_url(self):
+        """URL of the loaded page, after redirects"""
+        return self.driver.current_url if self.driver else None
+    
+    def document_status(self):
+        """HTTP status of the loaded document, or None when the browser does not report it"""
+        try:
+            status = self.driver.execute_script(page_scripts.NAVIGATION_STATUS_JS)
+        except WebDriverException as e:
+            logger.debug(f"Could not read the document status: {e}")
+            return None
+        return status if isinstance(status, int) else None
+    
+    def apply_resource_policy(self, resources):
+        """Install a subresource blocklist unless the driver already has it"""
+        patterns = resources.patterns()
+        if patterns == self.blocked_urls:
+            return
+        try:
+            self.blocked_urls = resources.apply(self.driver)
+        except (WebDriverException, CdpError) as e:
+            logger.warning(f"Could not install resource blocklist: {e}")
     
     def scrape_text_content(self, url):
         """Smart text content scraping"""
@@ -324,180 +488,175 @@ class SmartWebScraper:
             # Use smart navigation
             self.smart_get_page(url)
             
-            # Wait for dynamic content
-            time.sleep(2)
-            
-            # Get all text elements
-            elements = self.driver.find_elements(By.XPATH, "//p | //h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //span | //div[not(script) and not(style)] | //li | //td | //th")
-            
-            text_content = []
-            for element in elements:
-                try:
-                    text = element.text.strip()
-                    if text and len(text) > 5:  # Include shorter texts
-                        text_content.append(text)
-                except Exception:
-                    continue
-            
-            # Remove duplicates and limit results
-            unique_content = list(dict.fromkeys(text_content))[:100]  # Increased limit
-            logger.info(f"Found {len(unique_content)} text elements")
-            return unique_content
+            return self.extract_text_content()
             
         except Exception as e:
             logger.error(f"Error in smart text scraping: {e}")
             raise
     
+    def extract_text_content(self, limit=DEFAULT_LIMITS['text'], offset=0):
+        """Extract text content from the loaded page in one in-page pass"""
+        unique_content = (self.driver.execute_script(
+            page_scripts.TEXT_CONTENT_JS, page_scripts.TEXT_XPATH, 5, offset + limit
+        ) or [])[offset:]
+        logger.info(f"Found {len(unique_content)} text elements")
+        return unique_content
+    
+    def text_blocks_args(self, main_only, limit):
+        """Arguments of the in-page text block walk, with the static engine's tags and hints"""
+        return (page_scripts.TEXT_BLOCKS_JS, list(TEXT_BLOCK_TAGS), CONTENT_TAG_WEIGHTS, POSITIVE_HINTS,
+                NEGATIVE_HINTS, MIN_SCORED_BLOCK_LENGTH, main_only, limit)
+    
+    def extract_text_blocks(self, limit=DEFAULT_LIMITS['blocks'], offset=0, main_only=False):
+        """Extract each run of text once, with its block tag, in a single DOM walk"""
+        blocks = (self.driver.execute_script(*self.text_blocks_args(main_only, offset + limit)) or [])[offset:]
+        logger.info(f"Found {len(blocks)} {'main content' if main_only else 'text'} blocks")
+        return blocks
+    
     def scrape_links(self, url):
         """Smart link scraping"""
         try:
             logger.info(f"Smart scraping links from: {url}")
             self.smart_get_page(url)
-            time.sleep(2)
-            
-            links = self.driver.find_elements(By.TAG_NAME, "a")
-            link_data = []
-            
-            for link in links:
-                try:
-                    href = link.get_attribute("href")
-                    text = link.text.strip()
-                    
-                    if href and href.startswith(('http://', 'https://', '/')):
-                        if not text:
-                            text = href  # Use URL as text if no text available
-                        
-                        link_data.append({
-                            "text": text[:150],  # Increased text length
-                            "url": href
-                        })
-                except Exception:
-                    continue
-            
-            # Remove duplicates
-            unique_links = []
-            seen_urls = set()
-            for link in link_data:
-                if link["url"] not in seen_urls:
-                    unique_links.append(link)
-                    seen_urls.add(link["url"])
-                if len(unique_links) >= 75:  # Increased limit
-                    break
-            
-            logger.info(f"Found {len(unique_links)} unique links")
-            return unique_links
+            return self.extract_links()
             
         except Exception as e:
             logger.error(f"Error in smart link scraping: {e}")
             raise
     
+    def extract_links(self, limit=DEFAULT_LIMITS['links'], offset=0):
+        """Extract links from the loaded page in one in-page pass"""
+        unique_links = (self.driver.execute_script(page_scripts.LINKS_JS, 150, offset + limit) or [])[offset:]
+        logger.info(f"Found {len(unique_links)} unique links")
+        return unique_links
+    
     def scrape_images(self, url):
         """Smart image scraping"""
         try:
             logger.info(f"Smart scraping images from: {url}")
             self.smart_get_page(url)
-            time.sleep(3)
-            
-            images = self.driver.find_elements(By.TAG_NAME, "img")
-            image_urls = []
-            
-            for img in images:
-                try:
-                    src = img.get_attribute("src")
-                    if src:
-                        # Convert relative URLs to absolute
-                        if src.startswith('/'):
-                            current_url = self.driver.current_url
-                            base_url = f"{current_url.split('://')[0]}://{current_url.split('/')[2]}"
-                            src = base_url + src
-                        
-                        if src.startswith(('http://', 'https://', 'data:')):
-                            image_urls.append(src)
-                except Exception:
-                    continue
-            
-            unique_images = list(dict.fromkeys(image_urls))[:75]  # Increased limit
-            logger.info(f"Found {len(unique_images)} unique images")
-            return unique_images
+            return self.extract_images()
             
         except Exception as e:
             logger.error(f"Error in smart image scraping: {e}")
             raise
     
+    def extract_images(self, limit=DEFAULT_LIMITS['images'], offset=0):
+        """Extract image URLs from the loaded page in one in-page pass"""
+        unique_images = (self.driver.execute_script(page_scripts.IMAGES_JS, offset + limit) or [])[offset:]
+        logger.info(f"Found {len(unique_images)} unique images")
+        return unique_images
+    
     def scrape_titles(self, url):
         """Smart title scraping"""
         try:
             logger.info(f"Smart scraping titles from: {url}")
             self.smart_get_page(url)
-            time.sleep(2)
-            
-            # Get page title first
-            titles = []
-            try:
-                page_title = self.driver.title
-                if page_title:
-                    titles.append(f"Page Title: {page_title}")
-            except:
-                pass
-            
-            # Get all headings
-            headings = self.driver.find_elements(By.XPATH, "//h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //title")
-            
-            for heading in headings:
-                try:
-                    text = heading.text.strip()
-                    if text and text not in titles:
-                        titles.append(text)
-                except Exception:
-                    continue
-            
-            unique_titles = titles[:75]  # Increased limit
-            logger.info(f"Found {len(unique_titles)} unique titles")
-            return unique_titles
+            return self.extract_titles()
             
         except Exception as e:
             logger.error(f"Error in smart title scraping: {e}")
             raise
     
+    def extract_titles(self, limit=DEFAULT_LIMITS['titles'], offset=0):
+        """Extract the page title and headings in one in-page pass"""
+        unique_titles = (self.driver.execute_script(page_scripts.TITLES_JS, offset + limit) or [])[offset:]
+        logger.info(f"Found {len(unique_titles)} unique titles")
+        return unique_titles
+    
     def scrape_custom_selector(self, url, selector):
         """Smart custom selector scraping"""
         try:
             logger.info(f"Smart scraping with selector '{selector}' from: {url}")
             self.smart_get_page(url)
-            time.sleep(3)
-            
-            elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-            results = []
-            
-            for element in elements:
-                try:
-                    # Try multiple ways to get content
-                    text = element.text.strip()
-                    if not text:
-                        text = (element.get_attribute("value") or 
-                               element.get_attribute("alt") or 
-                               element.get_attribute("title") or
-                               element.get_attribute("href") or
-                               element.get_attribute("src"))
-                    
-                    if text:
-                        results.append(text)
-                    else:
-                        # Get limited HTML as fallback
-                        html = element.get_attribute("outerHTML")
-                        if html:
-                            results.append(html[:300] + "..." if len(html) > 300 else html)
-                except Exception:
-                    continue
-            
-            unique_results = list(dict.fromkeys(results))[:75]  # Increased limit
-            logger.info(f"Found {len(unique_results)} elements with selector '{selector}'")
-            return unique_results
+            return self.extract_custom_selector(selector)
             
         except Exception as e:
             logger.error(f"Error in smart custom selector scraping: {e}")
             raise
     
+    def extract_custom_selector(self, selector, limit=DEFAULT_LIMITS['custom'], offset=0):
+        """Extract elements matching a CSS selector in one in-page pass"""
+        unique_results = (self.driver.execute_script(
+            page_scripts.CUSTOM_SELECTOR_JS, selector, 300, offset + limit
+        ) or [])[offset:]
+        logger.info(f"Found {len(unique_results)} elements with selector '{selector}'")
+        return unique_results
+    
+    def extract_recipe(self, recipe, limit=DEFAULT_LIMITS['recipe'], offset=0):
+        """Extract the records of a compiled recipe, every field in one in-page pass"""
+        raw_records = (self.driver.execute_script(
+            page_scripts.RECIPE_JS, recipe.browser_spec, offset + limit
+        ) or [])[offset:]
+        records = recipe.finish(raw_records, self.current_url)
+        logger.info(f"Extracted {len(records)} records with recipe '{recipe.name}'")
+        return records
+    
+    def extract(self, scraping_type, custom_selector=None, limit=None, offset=0):
+        """Run the extractor for a scraping type on the loaded page"""
+        limit = DEFAULT_LIMITS.get(scraping_type) if limit is None else limit
+        if scraping_type == 'text':
+            return self.extract_text_content(limit, offset)
+        if scraping_type == 'blocks':
+            return self.extract_text_blocks(limit, offset)
+        if scraping_type == 'main_content':
+            return self.extract_text_blocks(limit, offset, main_only=True)
+        if scraping_type == 'links':
+            return self.extract_links(limit, offset)
+        if scraping_type == 'images':
+            return self.extract_images(limit, offset)
+        if scraping_type == 'titles':
+            return self.extract_titles(limit, offset)
+        if scraping_type == 'custom':
+            return self.extract_custom_selector(custom_selector, limit, offset)
+        if scraping_type == 'recipe':
+            return self.extract_recipe(custom_selector, limit, offset)
+        raise ValueError(f"Invalid scraping type: {scraping_type}")
+    
+    def iterate(self, scraping_type, custom_selector=None, limit=None, offset=0, chunk_size=500):
+        """Yield the results of a scraping type, fetched from the page chunk_size at a time
+        
+        The full list stays in the page; only one chunk at a time crosses
+        the WebDriver connection.
+        """
+        end = config.EXTRACT_MAX_LIMIT if limit is None else offset + limit
+        if scraping_type == 'text':
+            args = (page_scripts.TEXT_CONTENT_JS, page_scripts.TEXT_XPATH, 5, end)
+        elif scraping_type in ('blocks', 'main_content'):
+            args = self.text_blocks_args(scraping_type == 'main_content', end)
+        elif scraping_type == 'links':
+            args = (page_scripts.LINKS_JS, 150, end)
+        elif scraping_type == 'images':
+            args = (page_scripts.IMAGES_JS, end)
+        elif scraping_type == 'titles':
+            args = (page_scripts.TITLES_JS, end)
+        elif scraping_type == 'custom':
+            args = (page_scripts.CUSTOM_SELECTOR_JS, custom_selector, 300, end)
+        elif scraping_type == 'recipe':
+            args = (page_scripts.RECIPE_JS, custom_selector.browser_spec, end)
+        else:
+            raise ValueError(f"Invalid scraping type: {scraping_type}")
+        
+        total = self.driver.execute_script(page_scripts.stashed(args[0]), *args[1:]) or 0
+        try:
+            for start in range(offset, total, chunk_size):
+                chunk = self.driver.execute_script(page_scripts.SLICE_JS, start, start + chunk_size) or []
+                if scraping_type == 'recipe':
+                    chunk = custom_selector.finish(chunk, self.current_url)
+                yield from chunk
+        finally:
+            try:
+                self.driver.execute_script(page_scripts.CLEAR_JS)
+            except Exception:
+                pass
+    
+    def scrape(self, url, scraping_type, custom_selector=None, working_url=None, wait=None, humanize=False,
+               resources=None):
+        """Load a page once and run the extractor(s) for one or more scraping types"""
+        logger.info(f"Smart scraping {scraping_type} from: {url}")
+        self.smart_get_page(url, working_url=working_url, wait=wait, humanize=humanize, resources=resources)
+        return extract_results(self, scraping_type, custom_selector)
+    
     def cleanup_current_session(self):
         """Clean up current session data"""
         if self.user_data_dir and os.path.exists(self.user_data_dir):
@@ -507,19 +666,6 @@ class SmartWebScraper:
             except Exception as e:
                 logger.warning(f"Failed to cleanup {self.user_data_dir}: {e}")
     
-    def cleanup_temp_dirs(self):
-        """Clean up old temp directories"""
-        try:
-            temp_dirs = glob.glob("/tmp/chrome_smart_*")
-            for temp_dir in temp_dirs:
-                try:
-                    if os.path.getctime(temp_dir) < time.time() - 3600:
-                        shutil.rmtree(temp_dir)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-    
     def close(self):
         """Enhanced cleanup"""
         if self.driver:
@@ -530,12 +676,299 @@ class SmartWebScraper:
                 logger.warning(f"Error closing smart WebDriver: {e}")
             finally:
                 self.driver = None
+                self.blocked_urls = None
+                self.home_handle = None
+                self.context_id = None
         
         self.cleanup_current_session()
-        self.cleanup_temp_dirs()
 
-# Initialize smart scraper
-scraper = SmartWebScraper()
+class CdpScraper(SmartWebScraper):
+    """SmartWebScraper driving a tab of the shared asyncio CDP browser instead of its own Chrome
+    
+    Every page load gets a new tab in a fresh browser context; extraction
+    runs the same in-page scripts through a Selenium-shaped PageDriver.
+    """
+    
+    def __init__(self, browser):
+        super().__init__()
+        self.browser = browser
+    
+    def setup_smart_driver(self, headless=True):
+        """Tabs are opened per page load; only make sure Chrome is running"""
+        self.browser.start()
+        return True
+    
+    def open_context(self):
+        """Open a new tab in a fresh browser context of the shared browser"""
+        self.close_context()
+        self.driver = PageDriver(self.browser, self.browser.open_page(STEALTH_JS))
+        self.blocked_urls = None
+        BROWSER_CONTEXTS_OPENED.inc()
+        return True
+    
+    def close_context(self):
+        """Close the current tab and its context, freeing its slot"""
+        if self.driver is not None:
+            driver, self.driver = self.driver, None
+            driver.close()
+    
+    def close(self):
+        """Release the tab; the shared browser stays up"""
+        self.close_context()
+    
+    def smart_get_page(self, url, max_retries=None, working_url=None, wait=None, humanize=False, resources=None,
+                       deadline=None):
+        """Load a page in a fresh tab, retrying a failed attempt in a new one
+        
+        Same contract as SmartWebScraper.smart_get_page; navigation and the
+        wait strategy are awaited on the engine's event loop.
+        """
+        if working_url is None:
+            working_url, _ = preflight(url, probe_only=True, deadline=deadline)
+        
+        policy = page_load_policy(max_retries, deadline)
+        max_retries = policy.max_attempts
+        if wait is None:
+            wait = WaitStrategy(config.WAIT_STRATEGY, timeout=config.WAIT_TIMEOUT)
+        if resources is None:
+            resources = DEFAULT_RESOURCE_POLICY
+        
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"CDP attempt {attempt + 1}/{max_retries}: Loading {working_url}")
+                timings = {}
+                self.last_timings = timings
+                self.last_wait_timed_out = False
+                
+                if humanize:
+                    phase_start = time.time()
+                    time.sleep(random.uniform(1, 3))
+                    timings["jitter_before"] = round(time.time() - phase_start, 3)
+                
+                self.open_context()
+                self.apply_resource_policy(resources)
+                
+                phase_start = time.time()
+                with host_slot(working_url) as slot:
+                    self.driver.get(working_url)
+                    status = self.driver.document_status
+                    retry_after = self.driver.document_header('Retry-After')
+                    slot.record(status, retry_after)
+                timings["navigate"] = round(time.time() - phase_start, 3)
+                if status is not None and status >= 400:
+                    raise http_error(working_url, status, parse_retry_after(retry_after))
+                
+                phase_start = time.time()
+                self.last_wait_timed_out = not self.driver.wait_until_ready(wait, MUTATION_QUIESCENCE_JS)
+                timings[f"wait_{wait.kind}"] = round(time.time() - phase_start, 3)
+                
+                if humanize:
+                    phase_start = time.time()
+                    time.sleep(random.uniform(2, 4))
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/3);")
+                    time.sleep(1)
+                    self.driver.execute_script("window.scrollTo(0, 0);")
+                    timings["jitter_after"] = round(time.time() - phase_start, 3)
+                
+                phase_start = time.time()
+                page_length = self.driver.execute_script(
+                    "return document.documentElement ? document.documentElement.outerHTML.length : 0;"
+                )
+                timings["verify"] = round(time.time() - phase_start, 3)
+                if page_length < 200:
+                    raise Exception("Page appears to be empty or not fully loaded")
+                
+                logger.info(f"✅ Successfully loaded over CDP: {working_url} {timings}")
+                return True
+                
+            except Exception as e:
+                error = classify(e)
+                logger.warning(f"CDP attempt {attempt + 1}/{max_retries} failed [{error.code}]: {e}")
+                self.close_context()
+                if not policy.should_retry(error, attempt):
+                    raise
+                PAGE_LOAD_RETRIES.inc(reason=error.code)
+                policy.sleep()
+
+SCRAPING_TYPES = ('text', 'links', 'images', 'titles', 'custom', 'recipe', 'blocks', 'main_content')
+BROWSER_ENGINES = ('selenium', 'cdp')
+
+# Subresources browser scrapes skip unless a request says otherwise
+DEFAULT_RESOURCE_POLICY = ResourcePolicy(parse_list(config.BLOCK_RESOURCES), block_trackers=config.BLOCK_TRACKERS)
+
+# Pooled HTTP session shared by all preflight requests
+preflight_client = HttpClient(
+    pool_connections=config.HTTP_POOL_HOSTS,
+    per_host_connections=config.HTTP_PER_HOST_CONNECTIONS,
+    resolution_ttl=config.HTTP_RESOLUTION_TTL,
+)
+
+# Driver-less scraper used only for preflight requests
+preflight_scraper = SmartWebScraper()
+
+# Cache of scrape responses (memory LRU, optionally backed by SQLite)
+response_cache = ResponseCache(
+    ttl=config.CACHE_TTL,
+    max_entries=config.CACHE_MAX_ENTRIES,
+    sqlite_path=config.CACHE_SQLITE_PATH or None,
+    stale_ttl=config.CACHE_STALE_TTL,
+) if config.CACHE_ENABLED else None
+
+# Named extraction recipes, compiled once at registration
+recipe_registry = RecipeRegistry(config.RECIPES_PATH or None)
+
+# Snapshots of scrape results for change detection and diff mode
+result_store = ResultStore(
+    config.RESULT_STORE_PATH,
+    max_snapshots=config.RESULT_STORE_MAX_SNAPSHOTS,
+) if config.RESULT_STORE_PATH else None
+
+# Per-host token buckets and adaptive concurrency windows for every outgoing page request
+host_limiter = HostLimiter(
+    rate=config.HOST_RATE,
+    burst=config.HOST_BURST,
+    initial_window=config.HOST_INITIAL_WINDOW,
+    max_window=config.HOST_MAX_WINDOW,
+    latency_target=config.HOST_LATENCY_TARGET,
+    max_retry_after=config.HOST_MAX_RETRY_AFTER,
+    acquire_timeout=config.HOST_ACQUIRE_TIMEOUT,
+) if config.HOST_LIMITS_ENABLED else None
+
+@contextmanager
+def host_slot(url):
+    """A rate-limited request slot for the URL's host; a no-op one when limiting is off"""
+    if host_limiter is None:
+        yield RequestSlot(None, url)
+        return
+    with host_limiter.slot(url) as slot:
+        yield slot
+
+# Per-host circuit breakers that fail fast for hosts known to be down
+circuit_breakers = CircuitBreakers(
+    failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+    cooldown=config.CIRCUIT_COOLDOWN,
+) if config.CIRCUIT_BREAKER_ENABLED else None
+
+@contextmanager
+def host_circuit(url):
+    """Raise CIRCUIT_OPEN for a host known to be down, and record how the block went for the host"""
+    if circuit_breakers is None:
+        yield
+        return
+    circuit_breakers.check(url)
+    try:
+        yield
+    except Exception as e:
+        circuit_breakers.record_failure(url, classify(e))
+        raise
+    circuit_breakers.record_success(url)
+
+def page_load_policy(max_attempts=None, deadline=None):
+    """The retry policy for loading a page, bounded by an absolute deadline"""
+    return RetryPolicy(
+        max_attempts=max_attempts or config.RETRY_MAX_ATTEMPTS,
+        base_delay=config.RETRY_BASE_DELAY,
+        max_delay=config.RETRY_MAX_DELAY,
+        deadline=deadline,
+    )
+
+def preflight(url, extra_headers=None, probe_only=False, deadline=None):
+    """Preflight a URL through its host's circuit breaker, retrying transient failures
+    
+    Returns (working_url, response) like fetch_url_smart, but raises a
+    ScrapeError instead of returning no response.
+    """
+    policy = page_load_policy(config.PREFLIGHT_MAX_ATTEMPTS, deadline)
+    with host_circuit(url):
+        for attempt in range(policy.max_attempts):
+            errors = []
+            working_url, response = preflight_scraper.fetch_url_smart(
+                url, extra_headers=extra_headers, probe_only=probe_only, errors=errors
+            )
+            if response is not None:
+                return working_url, response
+            error = unreachable_error(url, errors)
+            if not policy.should_retry(error, attempt):
+                raise error
+            PREFLIGHT_RETRIES.inc(reason=error.code)
+            policy.sleep()
+
+# Shared Chrome of the cdp engine, started on first use
+_cdp_browser = None
+_cdp_browser_lock = threading.Lock()
+
+def cdp_browser():
+    """The CDP engine's browser, created on first use"""
+    global _cdp_browser
+    with _cdp_browser_lock:
+        if _cdp_browser is None:
+            _cdp_browser = CdpBrowser(
+                binary=config.CHROME_BINARY or None,
+                max_tabs=config.CDP_MAX_TABS,
+                tab_timeout=config.CDP_TAB_TIMEOUT,
+                extra_args=[f"--user-agent={preflight_scraper.get_random_user_agent()}"],
+            )
+        return _cdp_browser
+
+# Pool of warm smart scrapers shared by concurrent requests
+driver_pool = DriverPool(
+    SmartWebScraper,
+    min_size=config.POOL_MIN_SIZE,
+    max_size=config.POOL_MAX_SIZE,
+    checkout_timeout=config.POOL_CHECKOUT_TIMEOUT,
+    max_pages=config.POOL_MAX_PAGES_PER_DRIVER,
+)
+
+def _cdp_browser_pid():
+    if _cdp_browser is None or _cdp_browser.process is None or _cdp_browser.process.poll() is not None:
+        return {}
+    return {"cdp": _cdp_browser.process.pid}
+
+# Samples the pooled drivers' Chrome processes, recycles oversized ones and reaps leftovers
+watchdog = Watchdog(
+    driver_pool,
+    interval=config.WATCHDOG_INTERVAL,
+    max_rss_mb=config.WATCHDOG_MAX_RSS_MB,
+    reap_interval=config.WATCHDOG_REAP_INTERVAL,
+    profile_grace=config.WATCHDOG_PROFILE_GRACE,
+    extra_roots=_cdp_browser_pid,
+    live_scrapers=lambda: list(live_scrapers),
+) if config.WATCHDOG_ENABLED else None
+
+def preload_selenium():
+    """Import the WebDriver client ahead of the first driver start"""
+    from selenium.webdriver.chrome.webdriver import WebDriver  # noqa: F401
+    from selenium.webdriver.support.ui import WebDriverWait  # noqa: F401
+
+def warm_browsers(count):
+    """Launch the default engine's browser(s), timing each launch"""
+    if config.BROWSER_ENGINE == 'cdp':
+        with STARTUP.phase("browser_cdp"):
+            cdp_browser().start()
+        return
+    for index in range(count):
+        with STARTUP.phase(f"browser_{index + 1}"):
+            if not driver_pool.warm(index + 1) and driver_pool.stats()["size"] <= index:
+                raise DriverStartError(f"Started {index} of {count} browser(s)")
+    logger.info(f"✅ Warmed {count} browser(s)")
+
+def start_warmup():
+    """Warm this worker in the background; it reports ready on /api/health once done"""
+    if watchdog is not None:
+        watchdog.ensure_started()
+    steps = []
+    if config.PRELOAD_IMPORTS:
+        steps.append(("import_selenium", preload_selenium))
+        steps.append(("import_parsers", preload_parsers))
+    if config.WARM_BROWSERS > 0:
+        steps.append(("warm_browsers", lambda: warm_browsers(config.WARM_BROWSERS)))
+    STARTUP.warm_in_background(steps)
+
+@app.before_request
+def start_watchdog():
+    """Start the watchdog in the worker process that serves requests"""
+    if watchdog is not None:
+        watchdog.ensure_started()
 
 @app.route('/')
 def index():
@@ -579,111 +1012,1135 @@ def static_files(filename):
     except FileNotFoundError:
         return "Static file not found", 404
 
+def extraction_targets(scraping_type, custom_selector=None):
+    """(type, selector) pairs to extract for a single- or multi-type request"""
+    if isinstance(scraping_type, str):
+        if isinstance(custom_selector, list):
+            custom_selector = custom_selector[0]
+        if scraping_type == 'recipe':
+            # The selector names the recipe; extractors take it compiled
+            return [(scraping_type, recipe_registry.get(custom_selector))]
+        return [(scraping_type, custom_selector)]
+    
+    targets = []
+    for kind in scraping_type:
+        if kind == 'custom':
+            selectors = custom_selector if isinstance(custom_selector, list) else [custom_selector]
+            targets.extend(('custom', selector) for selector in selectors)
+        elif kind == 'recipe':
+            # Only crawls combine a recipe with other types (links to follow)
+            targets.append(('recipe', recipe_registry.get(custom_selector)))
+        else:
+            targets.append((kind, None))
+    return targets
+
+def extract_results(extractor, scraping_type, custom_selector=None, limit=None, offset=0):
+    """Run one or several extractors against an already loaded page
+    
+    A single type returns that extractor's list. A list of types returns a
+    dict keyed by type, with custom results keyed by selector. limit and
+    offset select a page of every result list; the default limit depends on
+    the type.
+    """
+    if isinstance(scraping_type, str):
+        kind, selector = extraction_targets(scraping_type, custom_selector)[0]
+        return extractor.extract(kind, selector, limit, offset)
+    
+    results = {}
+    for kind, selector in extraction_targets(scraping_type, custom_selector):
+        if kind == 'custom':
+            results.setdefault('custom', {})[selector] = extractor.extract('custom', selector, limit, offset)
+        else:
+            results[kind] = extractor.extract(kind, selector, limit, offset)
+    return results
+
+def extract_follow_links(extractor):
+    """URLs of every link on the loaded page, for a crawl to follow; never paged like the results"""
+    return [link["url"] for link in extractor.extract('links', None, config.EXTRACT_MAX_LIMIT, 0)]
+
+def next_cursor(results, scraping_type, limit, offset):
+    """Cursor of the next result page, or None once every list came back short
+    
+    Multi-type results only page with an explicit limit, since the default
+    limits differ per type.
+    """
+    if isinstance(results, list):
+        page_size = DEFAULT_LIMITS[scraping_type] if limit is None else limit
+        return str(offset + page_size) if len(results) >= page_size else None
+    if limit is None:
+        return None
+    lists = [items for kind, value in results.items()
+             for items in (value.values() if kind == 'custom' else [value])]
+    return str(offset + limit) if any(len(items) >= limit for items in lists) else None
+
+def count_results(results):
+    """Number of items in single- or multi-type results"""
+    if isinstance(results, dict):
+        return sum(count_results(value) for value in results.values())
+    return len(results)
+
+def parse_bool(value):
+    """Interpret JSON booleans and their common string spellings; None stays None"""
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def parse_page(data):
+    """The limit and cursor request fields as (limit, offset); limit None means the per-type default"""
+    limit, cursor = data.get('limit'), data.get('cursor')
+    try:
+        limit = None if limit in (None, '') else int(limit)
+        offset = 0 if cursor in (None, '') else int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError("limit and cursor must be integers")
+    if limit is not None and not 1 <= limit <= config.EXTRACT_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {config.EXTRACT_MAX_LIMIT}")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return limit, offset
+
+def parse_scrape_request(data):
+    """Validate an /api/scrape payload into run_scrape keyword arguments
+    
+    Raises ValueError with a client-facing message for bad input.
+    """
+    if not data:
+        raise ValueError("No data provided")
+    
+    url = data.get('url')
+    scraping_type = data.get('scrapingType')
+    custom_selector = data.get('customSelectors') or data.get('customSelector')
+    
+    if not url or not scraping_type:
+        raise ValueError("URL and scraping type are required")
+    if not isinstance(url, str):
+        raise ValueError("Invalid URL format")
+    
+    # Basic URL validation (allow URLs without protocol)
+    if not any(url.startswith(proto) for proto in ['http://', 'https://']):
+        if '.' in url:  # Looks like a domain
+            url = f"https://{url}"  # Default to HTTPS, will fallback to HTTP if needed
+        else:
+            raise ValueError("Invalid URL format")
+    
+    # Several types and/or selectors are extracted from a single page load
+    if isinstance(custom_selector, list):
+        custom_selector = list(dict.fromkeys(sel for sel in custom_selector if isinstance(sel, str) and sel))
+        if isinstance(scraping_type, str):
+            scraping_type = [scraping_type]
+    if isinstance(scraping_type, list):
+        scraping_type = list(dict.fromkeys(scraping_type))
+        if not scraping_type or any(kind not in SCRAPING_TYPES for kind in scraping_type):
+            raise ValueError("Invalid scraping type")
+        if 'custom' in scraping_type and not custom_selector:
+            raise ValueError("Custom selector is required")
+    else:
+        if scraping_type == 'custom' and not custom_selector:
+            raise ValueError("Custom selector is required")
+        if scraping_type not in SCRAPING_TYPES:
+            raise ValueError("Invalid scraping type")
+    
+    # Reject bad selectors and unknown recipes before any page is loaded
+    if scraping_type == 'recipe':
+        try:
+            custom_selector = recipe_registry.get(str(data.get('recipe') or '')).ref
+        except KeyError:
+            raise ValueError(f"Unknown recipe: {data.get('recipe')}")
+    elif 'recipe' in scraping_type:
+        raise ValueError("The recipe type cannot be combined with other types")
+    elif custom_selector:
+        try:
+            for selector in (custom_selector if isinstance(custom_selector, list) else [custom_selector]):
+                validate_css(selector)
+        except RecipeError as e:
+            raise ValueError(str(e))
+    
+    try:
+        wait = WaitStrategy.from_request(data, config.WAIT_STRATEGY, config.WAIT_TIMEOUT)
+    except TypeError as e:
+        raise ValueError(str(e))
+    
+    limit, offset = parse_page(data)
+    browser_engine = data.get('engine') or None
+    if browser_engine is not None and browser_engine not in BROWSER_ENGINES:
+        raise ValueError(f"Invalid engine: expected one of {', '.join(BROWSER_ENGINES)}")
+    resources = ResourcePolicy.from_request(data, DEFAULT_RESOURCE_POLICY.block_types, config.BLOCK_TRACKERS)
+    
+    diff = bool(parse_bool(data.get('diff')))
+    store = bool(parse_bool(data.get('store'))) or diff
+    if store and result_store is None:
+        raise ValueError("store and diff need the result store (set SCRAPER_RESULT_STORE_PATH)")
+    
+    return {
+        "url": url,
+        "scraping_type": scraping_type,
+        "custom_selector": custom_selector,
+        "render": parse_bool(data.get('render')),
+        "wait": wait,
+        "resources": resources,
+        "humanize": bool(parse_bool(data.get('humanize'))),
+        # A snapshot of cached data would hide changes from store and diff
+        "use_cache": not store and parse_bool(data.get('cache')) is not False,
+        "limit": limit,
+        "offset": offset,
+        "browser_engine": browser_engine,
+        "store": store,
+        "diff": diff,
+    }
+
+def scrape_error_response(e):
+    """Map a scraping failure to (payload, HTTP status)
+    
+    Every payload carries a stable error "code" and whether retrying the
+    request later may succeed ("retryable").
+    """
+    if isinstance(e, PoolTimeout):
+        SCRAPES_TOTAL.inc(engine="none", outcome="POOL_EXHAUSTED")
+        logger.warning(f"Driver pool exhausted: {e}")
+        return {"error": f"All smart web drivers are busy: {e}", "code": "POOL_EXHAUSTED", "retryable": True}, 503
+    if isinstance(e, TabsBusy):
+        SCRAPES_TOTAL.inc(engine="none", outcome="TABS_BUSY")
+        logger.warning(f"CDP engine saturated: {e}")
+        return {"error": f"All browser tabs are busy: {e}", "code": "TABS_BUSY", "retryable": True}, 503
+    if isinstance(e, DriverStartError):
+        SCRAPES_TOTAL.inc(engine="none", outcome="DRIVER_START_FAILED")
+        return {"error": str(e), "code": "DRIVER_START_FAILED", "retryable": True}, 500
+    
+    error = classify(e)
+    SCRAPES_TOTAL.inc(engine="none", outcome=error.code)
+    error_msg = str(e)
+    payload = error.to_dict()
+    if "not accessible via HTTP or HTTPS" in error_msg:
+        payload["error"] = f"Website is not accessible via HTTP or HTTPS: {error_msg}"
+        payload["suggestion"] = "Check if the website URL is correct and the site is online"
+    elif error.code == UNKNOWN:
+        logger.error(f"Smart scraping error: {e}")
+        payload["error"] = f"Smart scraping failed: {error_msg}"
+    else:
+        logger.warning(f"Smart scraping failed [{error.code}]: {e}")
+        payload["error"] = error_msg
+    return payload, error.status
+
+@contextmanager
+def browser_session(scraper=None, browser_engine=None):
+    """Yield a scraper with a live driver: the caller's own, one leased from the pool, or a CDP tab
+    
+    The cdp engine always uses a tab of the shared CDP browser.
+    """
+    if (browser_engine or config.BROWSER_ENGINE) == 'cdp':
+        cdp_scraper = CdpScraper(cdp_browser())
+        try:
+            yield cdp_scraper
+        finally:
+            cdp_scraper.close_context()
+        return
+    
+    if scraper is None:
+        with driver_pool.lease() as pooled:
+            try:
+                yield pooled
+            finally:
+                pooled.close_context()
+        return
+    
+    # A job or task worker's own driver: replaced between tasks, like pooled ones are
+    if scraper.driver is not None and scraper.recycle_reason is not None:
+        recycle_dedicated_driver(scraper)
+    if scraper.driver is None and not scraper.setup_smart_driver():
+        raise DriverStartError("Failed to initialize smart web driver")
+    scraper.busy = True
+    try:
+        yield scraper
+    finally:
+        scraper.busy = False
+        scraper.close_context()
+        scraper.pages_served += 1
+        if config.POOL_MAX_PAGES_PER_DRIVER and scraper.pages_served >= config.POOL_MAX_PAGES_PER_DRIVER:
+            scraper.recycle_reason = scraper.recycle_reason or "page limit reached"
+        if scraper.recycle_reason is not None:
+            recycle_dedicated_driver(scraper)
+
+def recycle_dedicated_driver(scraper):
+    """Close a worker's own driver; its next task starts a fresh one"""
+    logger.info(f"♻️ Recycling worker driver ({scraper.recycle_reason}) after {scraper.pages_served} page(s)")
+    scraper.close()
+    scraper.recycle_reason = None
+
+def cached_response(entry, status, start_time):
+    """Build a response payload from a cache entry"""
+    response_cache.record(status)
+    SCRAPES_TOTAL.inc(engine="cache", outcome="success")
+    response_data = dict(entry.payload)
+    response_data["cache"] = status
+    response_data["cache_age"] = round(entry.age(), 2)
+    response_data["timings"] = {}
+    response_data["execution_time"] = round(time.time() - start_time, 2)
+    logger.info(f"⚡ Cache {status} for {entry.url}")
+    return response_data
+
+def choose_static_scraper(response, render, timer):
+    """Parse a preflight response for the static engine when it can serve the request
+    
+    Returns (StaticScraper or None, reason for the engine choice).
+    """
+    if render is True:
+        return None, "render requested"
+    if not config.STATIC_ENGINE_ENABLED or not is_html_response(response):
+        return None, "static engine unavailable"
+    
+    with timer.phase("extract"):
+        candidate = StaticScraper.from_response(response, min_text_length=config.STATIC_MIN_TEXT_LENGTH)
+    if render is False:
+        return candidate, "static requested"
+    return (None if candidate.needs_js else candidate), candidate.needs_js_reason
+
+def load_in_browser(browser, url, working_url, wait, humanize, resources, timer, deadline=None):
+    """Navigate a browser to a page; returns its wait timings and whether the wait timed out"""
+    with host_circuit(url):
+        browser.smart_get_page(url, working_url=working_url, wait=wait, humanize=humanize, resources=resources,
+                               deadline=deadline)
+    wait_timings = dict(browser.last_timings)
+    timer.add("navigate", wait_timings.get("navigate", 0.0))
+    timer.add("wait", sum(seconds for phase, seconds in wait_timings.items() if phase != "navigate"))
+    return wait_timings, browser.last_wait_timed_out
+
+def scrape_url(url, scraping_type, custom_selector=None, render=None, wait=None, humanize=False,
+               scraper=None, use_cache=True, resources=None, limit=None, offset=0, browser_engine=None,
+               deadline=None, browser_slots=None, follow_links=False):
+    """Preflight a URL, then scrape it with the static engine or a browser
+    
+    render=True forces the browser, render=False forces the static engine and
+    None lets the JavaScript heuristic decide. wait and humanize control how
+    the browser decides a page is ready, and resources which subresources it
+    does not download. limit and offset select a page of results. The browser
+    comes from the pool unless a scraper is passed in; browser_engine='cdp'
+    uses a tab of the shared CDP browser instead. browser_slots (a
+    BrowserSlots) makes a batch wait its turn for a browser. follow_links adds
+    the URLs of every link on the page as "follow_links", regardless of the
+    requested types, limit and offset. Fresh cached results
+    are returned without any network traffic, and stale ones are revalidated
+    with a conditional preflight. Transient failures are retried until
+    deadline (a time.time() value, by default SCRAPE_DEADLINE from now);
+    other failures raise a ScrapeError or the pool/engine error. Returns the
+    response payload, including per-phase timings.
+    """
+    start_time = time.time()
+    timer = PhaseTimer(PHASE_SECONDS)
+    if deadline is None and config.SCRAPE_DEADLINE > 0:
+        deadline = start_time + config.SCRAPE_DEADLINE
+    
+    key = entry = None
+    conditional_headers = None
+    if response_cache is not None and use_cache:
+        page = (limit, offset) if limit is not None or offset else None
+        key = cache_key(url, scraping_type, custom_selector, render, page, follow_links)
+        entry = response_cache.get(key)
+        if entry is not None and response_cache.is_fresh(entry):
+            return cached_response(entry, CACHE_HIT, start_time)
+        if entry is not None and entry.has_validators:
+            conditional_headers = entry.conditional_headers()
+    
+    # A forced browser render never reads the preflight body
+    with timer.phase("preflight"):
+        working_url, response = preflight(
+            url, extra_headers=conditional_headers, probe_only=render is True, deadline=deadline
+        )
+    
+    if response.status_code == 304 and entry is not None:
+        # Unchanged since it was cached: skip the browser entirely
+        response_data = cached_response(entry, CACHE_REVALIDATED, start_time)
+        response_data["timings"] = timer.as_dict()
+        timer.publish()
+        response_cache.refresh(entry)
+        return response_data
+    
+    static_scraper, engine_reason = choose_static_scraper(response, render, timer)
+    
+    if static_scraper is not None:
+        engine = "static"
+        with timer.phase("extract"):
+            results = extract_results(static_scraper, scraping_type, custom_selector, limit, offset)
+            links_to_follow = extract_follow_links(static_scraper) if follow_links else None
+        actual_url = response.url
+    else:
+        engine = browser_engine or config.BROWSER_ENGINE
+        turn = browser_slots.hold(engine, deadline) if browser_slots is not None else nullcontext()
+        with turn, browser_session(scraper, engine) as browser:
+            wait_timings, wait_timed_out = load_in_browser(
+                browser, url, working_url, wait, humanize, resources, timer, deadline
+            )
+            with timer.phase("extract"):
+                results = extract_results(browser, scraping_type, custom_selector, limit, offset)
+                links_to_follow = extract_follow_links(browser) if follow_links else None
+            actual_url = browser.current_url or url
+    
+    end_time = time.time()
+    
+    response_data = {
+        "success": True,
+        "url": url,
+        "type": scraping_type,
+        "count": count_results(results),
+        "data": results,
+        "next_cursor": next_cursor(results, scraping_type, limit, offset),
+        "timestamp": datetime.now().isoformat(),
+        "execution_time": round(end_time - start_time, 2),
+        "smart_mode": True,
+        "actual_url": actual_url,
+        "engine": engine,
+        "engine_reason": engine_reason,
+        "timings": timer.as_dict()
+    }
+    
+    if isinstance(results, dict):
+        response_data["counts"] = {kind: count_results(value) for kind, value in results.items()}
+    
+    if scraping_type == 'custom' or 'custom' in scraping_type:
+        response_data["selector"] = custom_selector
+    elif scraping_type == 'recipe':
+        response_data["recipe"] = custom_selector
+    
+    if follow_links:
+        response_data["follow_links"] = links_to_follow
+    
+    if engine != "static":
+        response_data["wait_timings"] = wait_timings
+        response_data["wait_timed_out"] = wait_timed_out
+        response_data["blocked_resources"] = (resources or DEFAULT_RESOURCE_POLICY).to_dict()
+    
+    if key is not None:
+        response_cache.put(key, url, dict(response_data),
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'))
+        response_cache.record(CACHE_MISS)
+        response_data["cache"] = CACHE_MISS
+    else:
+        response_data["cache"] = CACHE_BYPASS
+    
+    timer.publish()
+    SCRAPES_TOTAL.inc(engine=engine, outcome="success")
+    logger.info(f"✅ Smart scraping successful ({engine}): {response_data['count']} items from {url} "
+                f"timings={response_data['timings']}")
+    return response_data
+
+def record_results(payload, url, scraping_type, custom_selector=None, limit=None, offset=0, diff=False):
+    """Snapshot a scrape's items in the result store and add a "changes" summary to its payload
+    
+    In diff mode the data only holds the items added since the previous
+    scrape of the same URL, type and result page, and "removed" the items
+    that disappeared.
+    """
+    page = (limit, offset) if limit is not None or offset else None
+    series = cache_key(url, scraping_type, custom_selector, None, page)
+    change = result_store.record(series, url, scraping_type, payload["data"])
+    
+    payload = dict(payload)
+    payload["changes"] = change.summary()
+    if diff:
+        template = payload["data"]
+        payload["data"] = nest(change.added, template)
+        payload["removed"] = nest(change.removed, template)
+        payload["count"] = count_results(payload["data"])
+        if isinstance(template, dict):
+            payload["counts"] = {kind: count_results(value) for kind, value in payload["data"].items()}
+        payload["diff"] = True
+    logger.info(f"🗄️ {url}: {'changed' if change.changed else 'unchanged'} "
+                f"(+{len(change.added)} -{len(change.removed)})")
+    return payload
+
+def run_scrape(url, scraping_type, custom_selector=None, store=False, diff=False, **options):
+    """Scrape a page (see scrape_url), recording its results in the result store when asked
+    
+    store snapshots the items; diff also reduces the response to what was
+    added and removed since the previous snapshot.
+    """
+    payload = scrape_url(url, scraping_type, custom_selector, **options)
+    if store or diff:
+        payload = record_results(payload, url, scraping_type, custom_selector,
+                                 options.get("limit"), options.get("offset", 0), diff)
+    return payload
+
+def negotiate_format(data, streaming=False):
+    """The response format, compression and projection a scrape request asked for
+    
+    Raises ValueError for an unknown format or bad field paths.
+    """
+    return ResponseFormat.negotiate(
+        data or {}, request.accept_mimetypes, request.accept_encodings, streaming=streaming,
+        compression=config.RESPONSE_COMPRESSION, min_compress_bytes=config.RESPONSE_COMPRESS_MIN_BYTES
+    )
+
+def payload_records(payload):
+    """A scrape payload as NDJSON records: one per result, then the rest of the payload as a summary
+    
+    Single-type results are emitted bare; multi-type ones as {"type", "item"}
+    (plus "selector" for custom results), like /api/scrape/stream.
+    """
+    data = payload.get("data")
+    if not isinstance(data, (list, dict)):
+        return [payload]
+    
+    records = []
+    if isinstance(data, list):
+        records.extend(data)
+    else:
+        for kind, value in data.items():
+            if kind == 'custom' and isinstance(value, dict):
+                for selector, items in value.items():
+                    records.extend({"type": kind, "selector": selector, "item": item} for item in items)
+            elif isinstance(value, list):
+                records.extend({"type": kind, "item": item} for item in value)
+    records.append({"summary": {key: value for key, value in payload.items() if key != "data"}})
+    return records
+
+def project_stream_record(projection, record, multi):
+    """Project one streamed record the way its part of an /api/scrape payload would be
+    
+    Returns None for a result whose data the projection drops entirely.
+    """
+    if not projection or record.get("success") is False:
+        return record
+    if "meta" in record:
+        return {"meta": projection.apply(record["meta"])}
+    if "summary" in record:
+        return {"summary": projection.apply(record["summary"])}
+    
+    # Wrapped in a list, the item sits where it would in the full payload
+    kind, selector = record["type"], record.get("selector")
+    if not multi:
+        items = projection.apply({"data": [record["item"]]}).get("data")
+    elif kind == 'custom':
+        projected = projection.apply({"data": {kind: {selector: [record["item"]]}}})
+        items = projected.get("data", {}).get(kind, {}).get(selector)
+    else:
+        items = projection.apply({"data": {kind: [record["item"]]}}).get("data", {}).get(kind)
+    return dict(record, item=items[0]) if items else None
+
+def encoded_response(payload, fmt=None, status=200):
+    """Encode a scrape payload in the negotiated format, timing serialization into the metrics
+    
+    The projection is applied first; compression kicks in above the size
+    threshold when the client accepts zstd or gzip.
+    """
+    fmt = fmt or ResponseFormat()
+    timings = dict(payload.get("timings") or {})
+    start = time.perf_counter()
+    projected = fmt.projection.apply(payload) if fmt.projection else payload
+    records = payload_records(projected) if fmt.name == NDJSON else [projected]
+    body, encoding = fmt.body(records)
+    serialize = time.perf_counter() - start
+    PHASE_SECONDS.observe(serialize, phase="serialize")
+    RESPONSE_BYTES.inc(len(body), format=fmt.name, encoding=encoding or "identity")
+    
+    response = Response(body, status=status, mimetype=fmt.content_type)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.update(("Accept", "Accept-Encoding"))
+    timings["serialize"] = serialize
+    response.headers["Server-Timing"] = server_timing(timings)
+    # The payload was encoded before serialize was known, so only this line and the header carry it
+    timings = {phase: round(seconds, 4) for phase, seconds in timings.items()}
+    logger.info(f"⏱️ {payload.get('url')} timings={timings} "
+                f"({fmt.name}, {len(body)} bytes{f' {encoding}' if encoding else ''})")
+    return response
+
+def encoded_stream(fmt, records):
+    """A streamed response of records in the negotiated format"""
+    response = Response(stream_with_context(fmt.stream(records)), mimetype=fmt.content_type)
+    if fmt.encoding:
+        response.headers["Content-Encoding"] = fmt.encoding
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response
+
 @app.route('/api/scrape', methods=['POST'])
 def scrape_endpoint():
-    """Smart scraping endpoint with HTTP/HTTPS auto-detection"""
+    """Smart scraping endpoint with HTTP/HTTPS auto-detection
+    
+    format (json, msgpack or ndjson; else the Accept header) picks the
+    encoding, fields/omit project the payload, and Accept-Encoding enables
+    zstd or gzip compression.
+    """
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        url = data.get('url')
-        scraping_type = data.get('scrapingType')
-        custom_selector = data.get('customSelector')
-        
-        if not url or not scraping_type:
-            return jsonify({"error": "URL and scraping type are required"}), 400
-        
-        # Basic URL validation (allow URLs without protocol)
-        if not any(url.startswith(proto) for proto in ['http://', 'https://']):
-            if '.' in url:  # Looks like a domain
-                url = f"https://{url}"  # Default to HTTPS, will fallback to HTTP if needed
-            else:
-                return jsonify({"error": "Invalid URL format"}), 400
+        try:
+            params = parse_scrape_request(request.get_json())
+            fmt = negotiate_format(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Setup smart driver if needed
-        if not scraper.driver:
-            logger.info("Smart WebDriver not initialized, setting up...")
-            if not scraper.setup_smart_driver():
-                return jsonify({"error": "Failed to initialize smart web driver"}), 500
-        
-        start_time = time.time()
+        if task_queue is not None and config.SCRAPE_VIA_QUEUE:
+            return scrape_via_queue(request.get_json(), params, fmt)
         
         try:
-            if scraping_type == 'text':
-                results = scraper.scrape_text_content(url)
-            elif scraping_type == 'links':
-                results = scraper.scrape_links(url)
-            elif scraping_type == 'images':
-                results = scraper.scrape_images(url)
-            elif scraping_type == 'titles':
-                results = scraper.scrape_titles(url)
-            elif scraping_type == 'custom':
-                if not custom_selector:
-                    return jsonify({"error": "Custom selector is required"}), 400
-                results = scraper.scrape_custom_selector(url, custom_selector)
-            else:
-                return jsonify({"error": "Invalid scraping type"}), 400
-            
-            end_time = time.time()
-            
-            response_data = {
-                "success": True,
-                "url": url,
-                "type": scraping_type,
-                "count": len(results),
-                "data": results,
-                "timestamp": datetime.now().isoformat(),
-                "execution_time": round(end_time - start_time, 2),
-                "smart_mode": True,
-                "actual_url": scraper.driver.current_url if scraper.driver else url
-            }
-            
-            if scraping_type == 'custom':
-                response_data["selector"] = custom_selector
-            
-            logger.info(f"✅ Smart scraping successful: {len(results)} items from {url}")
-            return jsonify(response_data)
-            
+            return encoded_response(run_scrape(**params), fmt)
         except Exception as e:
-            error_msg = str(e)
-            if "not accessible via HTTP or HTTPS" in error_msg:
-                return jsonify({
-                    "error": f"Website is not accessible via HTTP or HTTPS: {error_msg}",
-                    "suggestion": "Check if the website URL is correct and the site is online"
-                }), 502
-            else:
-                logger.error(f"Smart scraping error: {e}")
-                return jsonify({"error": f"Smart scraping failed: {error_msg}"}), 500
+            payload, status = scrape_error_response(e)
+            return jsonify(payload), status
             
     except Exception as e:
         logger.error(f"Request processing error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+def stream_scrape(url, scraping_type, custom_selector=None, render=None, wait=None, humanize=False,
+                  resources=None, limit=None, offset=0, chunk_size=None, scraper=None, browser_engine=None,
+                  deadline=None):
+    """Scrape a page and yield its results one record at a time while they are extracted
+    
+    Yields a meta record, then {"type", "item"} per result (custom results
+    also carry their selector), then a summary with the counts and the next
+    cursor. Without a limit every result is returned. Streams bypass the
+    response cache.
+    """
+    start_time = time.time()
+    timer = PhaseTimer(PHASE_SECONDS)
+    chunk_size = chunk_size or config.STREAM_CHUNK_SIZE
+    if deadline is None and config.SCRAPE_DEADLINE > 0:
+        deadline = start_time + config.SCRAPE_DEADLINE
+    
+    with timer.phase("preflight"):
+        working_url, response = preflight(url, probe_only=render is True, deadline=deadline)
+    static_scraper, engine_reason = choose_static_scraper(response, render, timer)
+    
+    def records(extractor, engine, actual_url):
+        yield {"meta": {"url": url, "actual_url": actual_url, "type": scraping_type,
+                        "engine": engine, "engine_reason": engine_reason}}
+        counts = {}
+        total = 0
+        more = False
+        for kind, selector in extraction_targets(scraping_type, custom_selector):
+            count = 0
+            for item in extractor.iterate(kind, selector, limit, offset, chunk_size):
+                count += 1
+                record = {"type": kind, "item": item}
+                if kind == 'custom':
+                    record["selector"] = selector
+                yield record
+            if kind == 'custom':
+                counts.setdefault('custom', {})[selector] = count
+            else:
+                counts[kind] = count
+            total += count
+            more = more or (limit is not None and count >= limit)
+        
+        timer.add("stream", time.time() - start_time - sum(timer.timings.values()))
+        timer.publish()
+        SCRAPES_TOTAL.inc(engine=engine, outcome="success")
+        logger.info(f"✅ Streamed {total} items ({engine}) from {url} timings={timer.as_dict()}")
+        yield {"summary": {
+            "count": total,
+            "counts": counts,
+            "next_cursor": str(offset + limit) if more else None,
+            "engine": engine,
+            "timings": timer.as_dict(),
+            "execution_time": round(time.time() - start_time, 2),
+        }}
+    
+    if static_scraper is not None:
+        yield from records(static_scraper, "static", response.url)
+        return
+    
+    engine = browser_engine or config.BROWSER_ENGINE
+    with browser_session(scraper, engine) as browser:
+        load_in_browser(browser, url, working_url, wait, humanize, resources, timer, deadline)
+        yield from records(browser, engine, browser.current_url or url)
+
+@app.route('/api/scrape/stream', methods=['POST'])
+def stream_scrape_endpoint():
+    """Stream scrape results as NDJSON while the page is being extracted
+    
+    Takes the /api/scrape fields plus chunkSize (results fetched from the
+    browser per round trip). Results are uncapped unless limit is set;
+    pass the summary's next_cursor back as cursor for the next page.
+    format=msgpack streams MessagePack records instead of NDJSON lines.
+    """
+    data = request.get_json(silent=True)
+    try:
+        params = parse_scrape_request(data)
+        chunk_size = int(data.get('chunkSize') or config.STREAM_CHUNK_SIZE)
+        if chunk_size < 1:
+            raise ValueError("chunkSize must be positive")
+        fmt = negotiate_format(data, streaming=True)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    params.pop("use_cache")
+    if params.pop("store") | params.pop("diff"):
+        return jsonify({"error": "Streamed results are not stored; use /api/scrape for store and diff"}), 400
+    
+    # Run up to the first record here so failures still get a proper status code
+    records = stream_scrape(chunk_size=chunk_size, **params)
+    try:
+        first = next(records)
+    except Exception as e:
+        payload, status = scrape_error_response(e)
+        return jsonify(payload), status
+    
+    multi = not isinstance(params["scraping_type"], str)
+    
+    def generate():
+        try:
+            for record in itertools.chain([first], records):
+                record = project_stream_record(fmt.projection, record, multi)
+                if record is not None:
+                    yield record
+        except Exception as e:
+            payload, status = scrape_error_response(e)
+            yield dict(payload, success=False, status_code=status)
+        finally:
+            records.close()
+    
+    return encoded_stream(fmt, generate())
+
+BATCH_FIELDS = ('urls', 'parallelism', 'perHostLimit', 'format', 'fields', 'omit')
+
+def batch_browser_slots():
+    """Browser sessions one batch or crawl may hold at once: the pool size, or the CDP tab limit"""
+    return BrowserSlots({'selenium': driver_pool.max_size, 'cdp': config.CDP_MAX_TABS})
+
+@app.route('/api/scrape/batch', methods=['POST'])
+def batch_scrape_endpoint():
+    """Scrape many URLs concurrently, streaming one NDJSON line per URL as it finishes
+    
+    urls holds URL strings or /api/scrape style objects; every other field
+    is shared by all items. A final line carries the batch summary.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('urls'), list) or not data['urls']:
+        return jsonify({"error": "A non-empty urls list is required"}), 400
+    try:
+        fmt = negotiate_format(data, streaming=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(data['urls']) > config.BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {config.BATCH_MAX_URLS} URLs per batch"}), 400
+    
+    shared = {key: value for key, value in data.items() if key not in BATCH_FIELDS}
+    items = []
+    for index, entry in enumerate(data['urls']):
+        fields = dict(shared, **entry) if isinstance(entry, dict) else dict(shared, url=entry)
+        try:
+            items.append(parse_scrape_request(fields))
+        except ValueError as e:
+            return jsonify({"error": f"urls[{index}]: {e}"}), 400
+    
+    try:
+        parallelism = min(int(data.get('parallelism') or config.BATCH_PARALLELISM), config.BATCH_MAX_PARALLELISM)
+        per_host_limit = int(data.get('perHostLimit') or config.BATCH_PER_HOST_LIMIT)
+    except (TypeError, ValueError):
+        return jsonify({"error": "parallelism and perHostLimit must be integers"}), 400
+    
+    # Never more browser items in flight than there are browsers to render them
+    browser_slots = batch_browser_slots()
+    runner = BatchRunner(lambda params: run_scrape(**params, browser_slots=browser_slots), parallelism, per_host_limit)
+    logger.info(f"📦 Batch of {len(items)} URL(s), parallelism {parallelism}, {per_host_limit} per host")
+    
+    def generate():
+        start_time = time.time()
+        succeeded = failed = 0
+        for index, params, result, error in runner.run(items):
+            if error is None:
+                succeeded += 1
+                line = dict(fmt.projection.apply(result), index=index)
+            else:
+                failed += 1
+                payload, status = scrape_error_response(error)
+                line = dict(payload, index=index, url=params["url"], type=params["scraping_type"],
+                            success=False, status_code=status)
+            yield line
+        
+        yield {"summary": {
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "execution_time": round(time.time() - start_time, 2)
+        }}
+    
+    return encoded_stream(fmt, generate())
+
+CRAWL_FIELDS = ('seeds', 'maxDepth', 'maxPages', 'scope', 'include', 'exclude', 'priority',
+                'parallelism', 'perHostLimit', 'delay', 'respectRobots', 'format', 'fields', 'omit')
+
+def fetch_robots(url):
+    """Fetch a robots.txt over the pooled preflight session"""
+    response = preflight_client.session.get(
+        url, headers={'User-Agent': preflight_scraper.get_random_user_agent()}, timeout=10, verify=False
+    )
+    return response.status_code, response.text
+
+def crawl_page(params, url):
+    """Scrape one crawled page; returns the record and the links to follow"""
+    result = dict(run_scrape(**dict(params, url=url, follow_links=True)))
+    return result, result.pop("follow_links")
+
+@app.route('/api/crawl', methods=['POST'])
+def crawl_endpoint():
+    """Crawl outward from seed URLs, streaming one NDJSON record per page as it finishes
+    
+    Takes the /api/scrape fields (applied to every page) plus seeds, maxDepth,
+    maxPages, scope (host, domain or any), include/exclude/priority regexes,
+    parallelism, perHostLimit, delay (seconds between requests to a host)
+    and respectRobots. A final line carries the crawl summary.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    seeds = data.get('seeds') or ([data['url']] if data.get('url') else [])
+    if not isinstance(seeds, list) or not seeds:
+        return jsonify({"error": "A non-empty seeds list is required"}), 400
+    
+    shared = {key: value for key, value in data.items() if key not in CRAWL_FIELDS}
+    shared.setdefault('scrapingType', 'links')
+    try:
+        seed_params = [parse_scrape_request(dict(shared, url=seed)) for seed in seeds]
+        params = dict(seed_params[0], browser_slots=batch_browser_slots())
+        params.pop("url")
+        scope = CrawlScope(
+            [item["url"] for item in seed_params],
+            mode=data.get('scope') or 'domain',
+            include=parse_list(data.get('include')),
+            exclude=parse_list(data.get('exclude')),
+        )
+        max_depth = int(data.get('maxDepth', config.CRAWL_MAX_DEPTH))
+        max_pages = min(int(data.get('maxPages') or config.CRAWL_MAX_PAGES), config.CRAWL_MAX_PAGES_LIMIT)
+        parallelism = min(int(data.get('parallelism') or config.CRAWL_PARALLELISM), config.BATCH_MAX_PARALLELISM)
+        per_host_limit = int(data.get('perHostLimit') or config.CRAWL_PER_HOST_LIMIT)
+        host_delay = float(data.get('delay', config.CRAWL_HOST_DELAY))
+        respect_robots = parse_bool(data.get('respectRobots'))
+        priority = parse_list(data.get('priority'))
+        fmt = negotiate_format(data, streaming=True)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if respect_robots is None:
+        respect_robots = config.CRAWL_RESPECT_ROBOTS
+    try:
+        crawler = Crawler(
+            lambda url: crawl_page(params, url),
+            [item["url"] for item in seed_params],
+            scope,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            parallelism=parallelism,
+            per_host_limit=per_host_limit,
+            host_delay=host_delay,
+            robots=RobotsCache(fetch_robots, config.CRAWL_ROBOTS_AGENT) if respect_robots else None,
+            seen=make_seen_set(config.CRAWL_DEDUP, config.CRAWL_BLOOM_CAPACITY, config.CRAWL_BLOOM_ERROR_RATE),
+            priority=priority,
+            max_frontier=config.CRAWL_MAX_FRONTIER,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info(f"🕸️ Crawl of {len(seeds)} seed(s), depth {max_depth}, up to {max_pages} pages, "
+                f"parallelism {parallelism}, {per_host_limit} per host")
+    
+    def generate():
+        start_time = time.time()
+        for record, error in crawler.run():
+            if error is not None:
+                payload, status = scrape_error_response(error)
+                record = dict(payload, **record, success=False, status_code=status)
+            else:
+                record = fmt.projection.apply(record)
+            yield record
+        
+        yield {"summary": dict(
+            crawler.summary(),
+            execution_time=round(time.time() - start_time, 2)
+        )}
+    
+    return encoded_stream(fmt, generate())
+
+def run_job(params, scraper, job):
+    """Run a queued scrape on the job worker's own browser"""
+    params = dict(params)
+    wait = params.get("wait")
+    if wait is not None:
+        params["wait"] = copy.copy(wait)
+        params["wait"].timeout = max(1.0, min(wait.timeout, job.remaining()))
+    try:
+        return run_scrape(scraper=scraper, deadline=time.time() + job.remaining(), **params)
+    except Exception as e:
+        payload, status = scrape_error_response(e)
+        payload["status_code"] = status
+        # A crashed browser is rebuilt on the worker's next job
+        if scraper.driver is not None:
+            try:
+                scraper.driver.execute_script("return 1")
+            except Exception:
+                scraper.close()
+        raise JobFailed(payload)
+
+job_manager = JobManager(
+    run_job,
+    worker_factory=SmartWebScraper,
+    worker_cleanup=lambda scraper: scraper.close(),
+    workers=config.JOB_WORKERS,
+    queue_size=config.JOB_QUEUE_SIZE,
+    default_deadline=config.JOB_DEFAULT_DEADLINE,
+    result_ttl=config.JOB_RESULT_TTL,
+)
+
+# Shared queue served by scrape_worker.py processes on any node; without one, jobs run in-process
+task_queue = open_task_queue(config.TASK_QUEUE, config.TASK_QUEUE_CAPACITY, config.JOB_RESULT_TTL) \
+    if config.TASK_QUEUE else None
+if task_queue is not None and not config.RECIPES_PATH:
+    # Tasks carry their recipe, but front ends only resolve names registered with themselves
+    logger.warning("⚠️ The task queue is on but recipes are kept per process; "
+                   "set SCRAPER_RECIPES_PATH so every front end sees every recipe")
+
+def job_backend():
+    """Where jobs are queued and looked up: the shared task queue when configured"""
+    return task_queue if task_queue is not None else job_manager
+
+def job_summary(params):
+    summary = {"url": params["url"], "type": params["scraping_type"]}
+    if params["custom_selector"]:
+        summary["selector"] = params["custom_selector"]
+    return summary
+
+def task_payload(data, params):
+    """The request body to queue, with a recipe pinned to the version resolved at submission
+    
+    The recipe's spec travels with the task, so workers run exactly that
+    version even if it is replaced meanwhile or their registry never saw it.
+    """
+    payload = dict(data)
+    if params["scraping_type"] == 'recipe':
+        recipe = recipe_registry.get(params["custom_selector"])
+        payload["recipe"] = recipe.ref
+        payload["recipeSpec"] = dict(recipe.spec, name=recipe.name)
+    return payload
+
+def run_task(task, scraper):
+    """Run a task leased from the shared queue on the worker thread's own browser"""
+    try:
+        if task.payload.get('recipeSpec'):
+            recipe_registry.pin(task.payload['recipeSpec'])
+        params = parse_scrape_request(task.payload)
+    except ValueError as e:
+        raise JobFailed({"error": str(e), "code": "INVALID_REQUEST", "retryable": False, "status_code": 400})
+    return run_job(params, scraper, task)
+
+def scrape_via_queue(data, params, fmt=None):
+    """Hand a synchronous scrape to the worker fleet and wait for its result"""
+    timeout = config.SCRAPE_DEADLINE if config.SCRAPE_DEADLINE > 0 else config.JOB_DEFAULT_DEADLINE
+    try:
+        task = task_queue.submit(task_payload(data, params), summary=job_summary(params), deadline=timeout,
+                                 max_attempts=config.TASK_MAX_ATTEMPTS)
+    except QueueFull as e:
+        return jsonify({"error": str(e), "code": "QUEUE_FULL", "retryable": True}), 429, {"Retry-After": "5"}
+    
+    task_id = task.id
+    task = wait_for(task_queue, task_id, timeout)
+    if task is not None and task.status == SUCCEEDED:
+        return encoded_response(task.result, fmt)
+    if task is None or not task.finished:
+        task_queue.cancel(task_id)
+        return jsonify({"error": f"No worker finished the scrape within {timeout:.0f}s", "code": "TIMEOUT",
+                        "retryable": True, "task": task_id}), 504
+    payload = dict(task.error or {"error": f"Scrape task {task.status}"})
+    status = payload.pop("status_code", 502)
+    return jsonify(payload), status
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a scrape and return its job id straight away"""
+    data = request.get_json(silent=True)
+    try:
+        params = parse_scrape_request(data)
+        deadline = float(data.get('deadline') or config.JOB_DEFAULT_DEADLINE)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if task_queue is not None:
+            job = task_queue.submit(task_payload(data, params), summary=job_summary(params), deadline=deadline,
+                                    max_attempts=config.TASK_MAX_ATTEMPTS)
+        else:
+            job = job_manager.submit(params, deadline=deadline, summary=job_summary(params))
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    
+    return jsonify(job.to_dict()), 202, {"Location": f"/api/jobs/{job.id}"}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, plus the scrape result once it succeeded"""
+    job = job_backend().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = job_backend().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.finished:
+        return jsonify({"error": f"Job already {job.status}", "job": job.to_dict()}), 409
+    return jsonify(job_backend().cancel(job_id).to_dict())
+
+def task_queue_stats():
+    """Task queue figures for /api/health; a queue server that is down must not fail the health check"""
+    if task_queue is None:
+        return None
+    try:
+        return task_queue.stats()
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; ?probe=ready answers 503 until the worker has warmed up"""
+    ready = STARTUP.ready
+    status = 503 if request.args.get('probe') == 'ready' and not ready else 200
     return jsonify({
         "status": "healthy",
+        "live": True,
+        "ready": ready,
+        "startup": STARTUP.stats(),
         "timestamp": datetime.now().isoformat(),
-        "driver_active": scraper.driver is not None,
-        "user_data_dir": scraper.user_data_dir,
+        "driver_active": driver_pool.stats()["size"] > 0,
+        "driver_pool": driver_pool.stats(),
+        "jobs": job_manager.stats(),
+        "task_queue": task_queue_stats(),
+        "cache": response_cache.stats() if response_cache is not None else None,
+        "preflight": preflight_client.stats(),
+        "cdp": _cdp_browser.stats() if _cdp_browser is not None else None,
+        "host_limits": host_limiter.stats() if host_limiter is not None else None,
+        "result_store": result_store.stats() if result_store is not None else None,
+        "watchdog": watchdog.stats() if watchdog is not None else None,
+        "circuit_breakers": circuit_breakers.stats() if circuit_breakers is not None else None,
         "smart_mode": True,
-        "features": ["HTTP/HTTPS auto-fallback", "SSL tolerance", "Anti-detection", "Enhanced scraping"]
-    })
+        "features": ["HTTP/HTTPS auto-fallback", "SSL tolerance", "Anti-detection", "Enhanced scraping", "Static HTML fast path"]
+    }), status
+
+@app.route('/api/cache', methods=['DELETE'])
+def purge_cache():
+    """Purge cached responses, for one URL (?url=...) or all of them"""
+    if response_cache is None:
+        return jsonify({"error": "Response cache is disabled"}), 404
+    
+    data = request.get_json(silent=True) or {}
+    url = request.args.get('url') or data.get('url')
+    removed = response_cache.purge(url)
+    logger.info(f"🧹 Purged {removed} cache entr{'y' if removed == 1 else 'ies'}" + (f" for {url}" if url else ""))
+    return jsonify({"success": True, "purged": removed, "url": url})
+
+@app.route('/api/recipes', methods=['POST'])
+def register_recipe():
+    """Validate, compile and register (or replace) a named extraction recipe"""
+    try:
+        recipe = recipe_registry.register(request.get_json(silent=True))
+    except RecipeError as e:
+        return jsonify({"error": f"Invalid recipe: {e}"}), 400
+    return jsonify(recipe.to_dict()), 201, {"Location": f"/api/recipes/{recipe.name}"}
+
+@app.route('/api/recipes', methods=['GET'])
+def list_recipes():
+    """Names of the registered recipes"""
+    return jsonify({"recipes": recipe_registry.names()})
+
+@app.route('/api/recipes/<name>', methods=['GET'])
+def get_recipe(name):
+    """A registered recipe's definition and version"""
+    try:
+        return jsonify(recipe_registry.get(name).to_dict())
+    except KeyError:
+        return jsonify({"error": "Recipe not found"}), 404
+
+@app.route('/api/recipes/<name>', methods=['DELETE'])
+def delete_recipe(name):
+    """Remove a registered recipe"""
+    if not recipe_registry.delete(name):
+        return jsonify({"error": "Recipe not found"}), 404
+    return jsonify({"success": True, "deleted": name})
+
+@app.route('/api/results', methods=['GET'])
+def result_history():
+    """Snapshots the result store holds for a URL (?url=..., newest first)"""
+    if result_store is None:
+        return jsonify({"error": "Result store is disabled"}), 404
+    
+    url = request.args.get('url')
+    if not url:
+        return jsonify({"error": "url is required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"url": url, "snapshots": result_store.history(url, limit)})
+
+@app.route('/api/results', methods=['DELETE'])
+def purge_results():
+    """Forget stored results, for one URL (?url=...) or all of them"""
+    if result_store is None:
+        return jsonify({"error": "Result store is disabled"}), 404
+    
+    data = request.get_json(silent=True) or {}
+    url = request.args.get('url') or data.get('url')
+    removed = result_store.purge(url)
+    logger.info(f"🧹 Purged {removed} stored snapshot(s)" + (f" for {url}" if url else ""))
+    return jsonify({"success": True, "purged": removed, "url": url})
+
+def _pool_stat(name):
+    return lambda: driver_pool.stats()[name]
+
+metrics.REGISTRY.callback('scraper_task_queue_tasks', 'Tasks in the shared task queue by status',
+                          lambda: (task_queue_stats() or {}).get('tasks'), labelnames=['status'])
+metrics.REGISTRY.callback('scraper_worker_ready', 'Whether this worker has finished warming up',
+                          lambda: 1 if STARTUP.ready else 0)
+metrics.REGISTRY.callback('scraper_startup_phase_seconds', 'Duration of each start-up step of this worker',
+                          lambda: STARTUP.stats()["phases"], labelnames=['phase'])
+metrics.REGISTRY.callback('scraper_startup_milestone_seconds', 'Seconds from worker start to each start-up milestone',
+                          lambda: STARTUP.stats()["milestones"], labelnames=['milestone'])
+metrics.REGISTRY.callback('scraper_pool_drivers', 'Pooled drivers by state',
+                          lambda: {state: driver_pool.stats()[state] for state in ('idle', 'in_use', 'starting')},
+                          labelnames=['state'])
+metrics.REGISTRY.callback('scraper_pool_max_drivers', 'Maximum pool size', _pool_stat('max_size'))
+metrics.REGISTRY.callback('scraper_pool_retired_total', 'Drivers retired by the pool',
+                          _pool_stat('retired_total'), kind='counter')
+metrics.REGISTRY.callback('scraper_pool_checkouts_total', 'Driver checkouts',
+                          _pool_stat('checkouts_total'), kind='counter')
+metrics.REGISTRY.callback('scraper_cache_lookups_total', 'Response cache lookups by result',
+                          lambda: {result: response_cache.stats()[result]
+                                   for result in ('hits', 'misses', 'revalidated')} if response_cache else None,
+                          kind='counter', labelnames=['result'])
+metrics.REGISTRY.callback('scraper_job_queue_depth', 'Jobs waiting in the queue',
+                          lambda: job_manager.stats()['queue_size'])
+metrics.REGISTRY.callback('scraper_host_limiter_backoffs_total', 'Host window reductions after errors or throttling',
+                          lambda: host_limiter.stats()['backoffs_total'] if host_limiter else None, kind='counter')
+metrics.REGISTRY.callback('scraper_host_limiter_paused_hosts', 'Hosts paused by Retry-After',
+                          lambda: host_limiter.stats()['paused_hosts'] if host_limiter else None)
+metrics.REGISTRY.callback('scraper_browser_rss_bytes', 'Resident memory of the pooled drivers\' Chrome processes',
+                          lambda: sum(d["rss_bytes"] for d in watchdog.drivers) if watchdog else None)
+metrics.REGISTRY.callback('scraper_watchdog_recycled_total', 'Drivers recycled by the watchdog for memory',
+                          lambda: watchdog.recycled_total if watchdog else None, kind='counter')
+metrics.REGISTRY.callback('scraper_watchdog_orphans_killed_total', 'Orphaned Chrome/chromedriver processes killed',
+                          lambda: watchdog.orphans_killed_total if watchdog else None, kind='counter')
+metrics.REGISTRY.callback('scraper_circuit_open_hosts', 'Hosts whose circuit breaker is open',
+                          lambda: circuit_breakers.stats()['open'] if circuit_breakers else None)
+metrics.REGISTRY.callback('scraper_circuit_rejections_total', 'Requests failed fast by an open circuit',
+                          lambda: circuit_breakers.stats()['rejected_total'] if circuit_breakers else None,
+                          kind='counter')
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/restart-driver', methods=['POST'])
 def restart_driver():
-    """Restart the smart WebDriver"""
+    """Restart every smart WebDriver in the pool"""
     try:
-        logger.info("Restarting smart WebDriver...")
-        scraper.close()
+        logger.info("Restarting smart WebDriver pool...")
+        started = driver_pool.restart()
         
-        if scraper.setup_smart_driver():
+        if started or driver_pool.min_size == 0:
             return jsonify({
                 "success": True, 
-                "message": "Smart driver restarted successfully"
+                "message": "Smart driver restarted successfully",
+                "driver_pool": driver_pool.stats()
             })
         else:
             return jsonify({
@@ -709,23 +2166,28 @@ def internal_error(error):
 def cleanup():
     """Clean up resources on shutdown"""
     logger.info("Shutting down smart application...")
-    scraper.close()
+    job_manager.shutdown()
+    if task_queue is not None:
+        task_queue.close()
+    if watchdog is not None:
+        watchdog.stop()
+    driver_pool.close()
+    if _cdp_browser is not None:
+        _cdp_browser.close()
 
 import atexit
 atexit.register(cleanup)
 
+STARTUP.mark("app_loaded")
+
 if __name__ == '__main__':
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
     
     logger.info("🧠 Starting Smart Web Scraper Pro...")
     logger.info("Features: HTTP/HTTPS auto-fallback, SSL tolerance, Anti-detection")
-    logger.info("Initializing smart WebDriver...")
-    
-    if scraper.setup_smart_driver():
-        logger.info("✅ Smart WebDriver initialized successfully")
-    else:
-        logger.warning("⚠️ Smart WebDriver initialization failed - will retry on first request")
+    logger.info(f"Warming {config.WARM_BROWSERS} smart WebDriver(s) in the background...")
+    start_warmup()
     
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"🌐 Starting smart server on port {port}")
@@ -0,0 +1,93 @@
+"""Concurrent fan-out of many scrapes with global and per-host limits"""
+import collections
+import contextlib
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def host_of(url):
+    """Host part of a URL, used as the concurrency key"""
+    return (urlsplit(url).hostname or url).lower()
+
+
+class BrowserSlots:
+    """Caps how many browser sessions one batch or crawl holds at once, per engine.
+
+    Items past the cap wait here, up to their deadline, instead of timing
+    out on a pool or tab checkout their own siblings are holding.
+    """
+
+    def __init__(self, limits):
+        self._slots = {engine: threading.BoundedSemaphore(max(1, limit)) for engine, limit in limits.items()}
+
+    @contextlib.contextmanager
+    def hold(self, engine, deadline=None):
+        slot = self._slots.get(engine)
+        if slot is None:
+            yield
+            return
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        if not slot.acquire(timeout=timeout):
+            raise TimeoutError(f"Timed out waiting for a free {engine} browser")
+        try:
+            yield
+        finally:
+            slot.release()
+
+
+class BatchRunner:
+    """Runs ``run_one(item)`` for many items and yields results as they finish.
+
+    At most ``parallelism`` items run at once and at most ``per_host_limit``
+    of them target the same host; items for a busy host wait without holding
+    a worker slot, so other hosts keep flowing.
+    """
+
+    def __init__(self, run_one, parallelism=8, per_host_limit=2):
+        self.run_one = run_one
+        self.parallelism = max(1, parallelism)
+        self.per_host_limit = max(1, per_host_limit)
+
+    def run(self, items):
+        """Yield ``(index, item, result, error)`` in completion order"""
+        pending = collections.OrderedDict()
+        for index, item in enumerate(items):
+            pending.setdefault(host_of(item["url"]), collections.deque()).append((index, item))
+
+        active_per_host = collections.Counter()
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="batch")
+
+        def fill():
+            for host in list(pending):
+                queue = pending[host]
+                while queue and len(running) < self.parallelism and active_per_host[host] < self.per_host_limit:
+                    index, item = queue.popleft()
+                    future = executor.submit(self.run_one, item)
+                    running[future] = (index, item, host)
+                    active_per_host[host] += 1
+                if not queue:
+                    del pending[host]
+                if len(running) >= self.parallelism:
+                    return
+
+        try:
+            fill()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, item, host = running.pop(future)
+                    active_per_host[host] -= 1
+                    try:
+                        yield index, item, future.result(), None
+                    except Exception as e:
+                        yield index, item, None, e
+                fill()
+        finally:
+            # Also reached when the client goes away mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
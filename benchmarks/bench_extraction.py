@@ -0,0 +1,173 @@
+"""Benchmark in-page extraction against the old per-element WebDriver path.
+
+Serves large fixture pages (see fixtures.py) from a local HTTP server, loads each one
+once in Chrome and times both extraction paths on the same DOM.
+
+    python benchmarks/bench_extraction.py [--repeat 3] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By  # noqa: E402
+
+from app import SmartWebScraper  # noqa: E402
+from fixtures import STATIC_PAGES, FixtureServer  # noqa: E402
+
+EXTRACTION_FIXTURES = {
+    "/nested-text": ("text", None),
+    "/links": ("links", None),
+    "/images": ("images", None),
+    "/titles": ("titles", None),
+    "/catalog": ("custom", ".product .name, .product .more"),
+}
+
+
+# Reference copies of the original per-element extractors
+def legacy_text_content(driver):
+    elements = driver.find_elements(By.XPATH, "//p | //h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //span | //div[not(script) and not(style)] | //li | //td | //th")
+    text_content = []
+    for element in elements:
+        try:
+            text = element.text.strip()
+            if text and len(text) > 5:
+                text_content.append(text)
+        except Exception:
+            continue
+    return list(dict.fromkeys(text_content))[:100]
+
+
+def legacy_links(driver):
+    link_data = []
+    for link in driver.find_elements(By.TAG_NAME, "a"):
+        try:
+            href = link.get_attribute("href")
+            text = link.text.strip()
+            if href and href.startswith(('http://', 'https://', '/')):
+                link_data.append({"text": (text or href)[:150], "url": href})
+        except Exception:
+            continue
+    unique_links = []
+    seen_urls = set()
+    for link in link_data:
+        if link["url"] not in seen_urls:
+            unique_links.append(link)
+            seen_urls.add(link["url"])
+        if len(unique_links) >= 75:
+            break
+    return unique_links
+
+
+def legacy_images(driver):
+    image_urls = []
+    for img in driver.find_elements(By.TAG_NAME, "img"):
+        try:
+            src = img.get_attribute("src")
+            if src and src.startswith(('http://', 'https://', 'data:')):
+                image_urls.append(src)
+        except Exception:
+            continue
+    return list(dict.fromkeys(image_urls))[:75]
+
+
+def legacy_titles(driver):
+    titles = []
+    if driver.title:
+        titles.append(f"Page Title: {driver.title}")
+    for heading in driver.find_elements(By.XPATH, "//h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //title"):
+        try:
+            text = heading.text.strip()
+            if text and text not in titles:
+                titles.append(text)
+        except Exception:
+            continue
+    return titles[:75]
+
+
+def legacy_custom_selector(driver, selector):
+    results = []
+    for element in driver.find_elements(By.CSS_SELECTOR, selector):
+        try:
+            text = element.text.strip()
+            if not text:
+                text = (element.get_attribute("value") or element.get_attribute("alt") or
+                        element.get_attribute("title") or element.get_attribute("href") or
+                        element.get_attribute("src"))
+            if text:
+                results.append(text)
+            else:
+                html = element.get_attribute("outerHTML")
+                if html:
+                    results.append(html[:300] + "..." if len(html) > 300 else html)
+        except Exception:
+            continue
+    return list(dict.fromkeys(results))[:75]
+
+
+LEGACY = {
+    "text": lambda driver, selector: legacy_text_content(driver),
+    "links": lambda driver, selector: legacy_links(driver),
+    "images": lambda driver, selector: legacy_images(driver),
+    "titles": lambda driver, selector: legacy_titles(driver),
+    "custom": legacy_custom_selector,
+}
+
+
+def timed(func, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    scraper = SmartWebScraper()
+    if not scraper.setup_smart_driver():
+        sys.exit("Could not start Chrome")
+    # Empty result sets would otherwise wait out the implicit wait
+    scraper.driver.implicitly_wait(0)
+
+    results = []
+    try:
+        with FixtureServer() as server:
+            for path, (scraping_type, selector) in EXTRACTION_FIXTURES.items():
+                scraper.driver.get(server.base_url + path)
+                legacy_time, legacy_result = timed(
+                    lambda: LEGACY[scraping_type](scraper.driver, selector), args.repeat)
+                in_page_time, in_page_result = timed(
+                    lambda: scraper.extract(scraping_type, selector), args.repeat)
+                row = {
+                    "fixture": path,
+                    "type": scraping_type,
+                    "dom_bytes": len(STATIC_PAGES[path]),
+                    "per_element_s": round(legacy_time, 4),
+                    "in_page_s": round(in_page_time, 4),
+                    "speedup": round(legacy_time / in_page_time, 1) if in_page_time else None,
+                    "same_output": legacy_result == in_page_result,
+                }
+                results.append(row)
+                print(f"{path:14} {scraping_type:7} per-element {row['per_element_s']:8.3f}s  "
+                      f"in-page {row['in_page_s']:7.3f}s  x{row['speedup']}  same={row['same_output']}")
+    finally:
+        scraper.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Fixture corpus and local HTTP server for the benchmarks.
+
+Routes:
+
+- ``/static/small/<n>``: small server-rendered article pages
+- ``/static/large``: a ~10k-node DOM with text, links and images
+- ``/nested-text``, ``/links``, ``/images``, ``/catalog``: large pages aimed
+  at one extractor each
+- ``/spa/<n>``: an empty mount point filled in by JavaScript
+- ``/redirect/<hops>``: a redirect chain ending at ``/static/small/0``
+- ``/slow/<ms>``: a small page served after a delay
+"""
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def small_page(n):
+    paragraphs = "".join(
+        f"<p>Paragraph {i} of article {n}. Server-rendered text that is long enough to be content.</p>"
+        for i in range(8)
+    )
+    links = "".join(f'<li><a href="/static/small/{(n + i) % 50}">Related article {i}</a></li>' for i in range(1, 6))
+    return (f"<html><head><title>Article {n}</title></head><body><main><h1>Article {n}</h1>"
+            f"{paragraphs}<ul>{links}</ul><img src=\"/img/{n}.png\" alt=\"cover\"></main></body></html>")
+
+
+def large_page(nodes=10000):
+    """Roughly ``nodes`` elements spread over sections, lists, links and images"""
+    parts = ["<html><head><title>Large DOM fixture</title></head><body>"]
+    sections = nodes // 10
+    for i in range(sections):
+        parts.append(f'<section><h2>Section {i}</h2><div><p>Body text for section {i} with '
+                     f'<span>inline detail {i}</span>.</p><ul><li>Entry {i}-a</li><li>Entry {i}-b</li></ul>'
+                     f'<a href="/static/small/{i % 50}">Read {i}</a><img src="/img/{i}.png"></div></section>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def nested_text_page(sections=400, depth=4):
+    """Deeply nested divs/spans, the worst case for the text XPath"""
+    parts = ["<html><head><title>Nested text fixture</title></head><body>"]
+    for i in range(sections):
+        parts.append("<div>" * depth)
+        parts.append(f"<h2>Section {i}</h2><p>Paragraph {i} with <span>inline text {i}</span> inside.</p>")
+        parts.append(f"<ul><li>Item {i}-a of the list</li><li>Item {i}-b of the list</li></ul>")
+        parts.append("</div>" * depth)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def links_page(count=3000):
+    parts = ["<html><head><title>Links fixture</title></head><body>"]
+    parts.extend(f'<a href="/page/{i % 2000}">Link number {i}</a> ' for i in range(count))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def images_page(count=2000):
+    parts = ["<html><head><title>Images fixture</title></head><body>"]
+    parts.extend(f'<img src="/img/{i}.png" alt="image {i}">' for i in range(count))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def catalog_page(count=2000):
+    parts = ["<html><head><title>Catalog fixture</title></head><body>"]
+    for i in range(count):
+        parts.append(f'<div class="product"><h3 class="name">Product {i}</h3>'
+                     f'<span class="price">{i}.99</span><a class="more" href="/p/{i}"></a></div>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def spa_page(n, delay_ms=150):
+    """Client-rendered page: nothing to scrape until the script runs"""
+    return f"""<html><head><title>SPA {n}</title></head><body>
+<div id="root"></div>
+<noscript>You need to enable JavaScript to run this app.</noscript>
+<script>
+setTimeout(function () {{
+    var root = document.getElementById('root');
+    var html = '<h1>Rendered app {n}</h1>';
+    for (var i = 0; i < 50; i++) {{
+        html += '<p>Client-rendered paragraph ' + i + ' of app {n}.</p><a href="/static/small/' + i + '">Item ' + i + '</a>';
+    }}
+    root.innerHTML = html;
+}}, {delay_ms});
+</script></body></html>"""
+
+
+STATIC_PAGES = {
+    "/static/large": large_page(),
+    "/nested-text": nested_text_page(),
+    "/links": links_page(),
+    "/images": images_page(),
+    "/titles": nested_text_page(sections=1000, depth=1),
+    "/catalog": catalog_page(),
+}
+
+IMAGE_BYTES = (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f"
+               b"\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00"
+               b"\x00IEND\xaeB`\x82")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in STATIC_PAGES:
+            return self._send(200, STATIC_PAGES[path].encode())
+
+        match = re.fullmatch(r"/static/small/(\d+)", path)
+        if match:
+            return self._send(200, small_page(int(match.group(1))).encode())
+
+        match = re.fullmatch(r"/spa/(\d+)", path)
+        if match:
+            return self._send(200, spa_page(int(match.group(1))).encode())
+
+        match = re.fullmatch(r"/redirect/(\d+)", path)
+        if match:
+            hops = int(match.group(1))
+            target = f"/redirect/{hops - 1}" if hops > 1 else "/static/small/0"
+            return self._send(302, headers={"Location": target})
+
+        match = re.fullmatch(r"/slow/(\d+)", path)
+        if match:
+            time.sleep(int(match.group(1)) / 1000)
+            return self._send(200, small_page(0).encode())
+
+        if path.startswith("/img/"):
+            return self._send(200, IMAGE_BYTES, content_type="image/png")
+
+        return self._send(200, b"<html><body>ok</body></html>")
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serves the fixture corpus on a free local port in a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
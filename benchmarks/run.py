@@ -0,0 +1,255 @@
+"""Latency/throughput benchmark of the scraper against a local fixture site.
+
+Drives SmartWebScraper directly (``scraper`` target) and the Flask
+/api/scrape endpoint in-process (``endpoint`` target) over the fixture corpus
+in fixtures.py, and reports p50/p95/p99 latency, pages per second and peak
+RSS of the Python process and its Chrome/chromedriver children. Results are
+written as JSON and can be compared against an earlier run:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import procinfo  # noqa: E402
+from fixtures import FixtureServer  # noqa: E402
+
+# (name, path template, scraping type); {i} varies per iteration
+SCENARIOS = [
+    ("small-static", "/static/small/{i}", "text"),
+    ("large-dom-links", "/static/large", "links"),
+    ("large-dom-text", "/static/large", "text"),
+    ("spa", "/spa/{i}", "text"),
+    ("redirect-chain", "/redirect/3", "titles"),
+    ("slow-response", "/slow/500", "titles"),
+]
+
+TARGETS = ("endpoint", "scraper")
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED = {"p50_s": False, "p95_s": False, "pages_per_second": True}
+
+
+class RssSampler:
+    """Tracks peak RSS of this process and of its child process tree"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_python = 0
+        self.peak_children = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        pid = os.getpid()
+        self.peak_python = max(self.peak_python, procinfo.rss_bytes(pid))
+        children = procinfo.descendants(pid)
+        self.peak_children = max(self.peak_children, sum(procinfo.rss_bytes(child) for child in children))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def endpoint_runner(app):
+    def run(url, scraping_type):
+        client = app.test_client()
+        response = client.post('/api/scrape', json={"url": url, "scrapingType": scraping_type, "cache": False})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_json()}")
+        return response.get_json()["count"]
+    return run
+
+
+def scraper_runner(scraper):
+    lock = threading.Lock()  # One driver: scrapes are serialized
+
+    def run(url, scraping_type):
+        with lock:
+            return len(scraper.scrape(url, scraping_type))
+    return run
+
+
+def run_scenario(run, base_url, path, scraping_type, iterations, concurrency, warmup):
+    for i in range(warmup):
+        try:
+            run(base_url + path.format(i=i), scraping_type)
+        except Exception:
+            pass
+
+    latencies = []
+    errors = []
+
+    def one(i):
+        url = base_url + path.format(i=warmup + i)
+        start = time.perf_counter()
+        try:
+            run(url, scraping_type)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e)[:200])
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one, range(iterations)))
+        wall = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "p50_s": round(percentile(latencies, 50), 4) if latencies else None,
+        "p95_s": round(percentile(latencies, 95), 4) if latencies else None,
+        "p99_s": round(percentile(latencies, 99), 4) if latencies else None,
+        "mean_s": round(sum(latencies) / len(latencies), 4) if latencies else None,
+        "pages_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "peak_python_rss_mb": round(sampler.peak_python / 2 ** 20, 1),
+        "peak_chrome_rss_mb": round(sampler.peak_children / 2 ** 20, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions beyond the tolerance relative to a baseline run"""
+    previous = {(row["target"], row["scenario"]): row for row in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        before = previous.get((row["target"], row["scenario"]))
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            row.setdefault("vs_baseline", {})[metric] = round(change, 3)
+            if worse:
+                regressions.append({"target": row["target"], "scenario": row["scenario"],
+                                    "metric": metric, "baseline": old, "current": new,
+                                    "change": round(change, 3)})
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated: endpoint,scraper")
+    parser.add_argument("--scenarios", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel requests for the endpoint target")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(",") if t]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        sys.exit(f"Unknown targets: {', '.join(sorted(unknown))}")
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s[0] in args.scenarios.split(",")]
+
+    # Every fixture lives on one host; per-host pacing would cap the measured throughput
+    os.environ.setdefault('SCRAPER_HOST_LIMITS', '0')
+    import app as scraper_app
+
+    results = []
+    scraper = None
+    try:
+        with FixtureServer() as server:
+            for target in targets:
+                if target == "endpoint":
+                    run, concurrency = endpoint_runner(scraper_app.app), args.concurrency
+                else:
+                    scraper = scraper_app.SmartWebScraper()
+                    if not scraper.setup_smart_driver():
+                        print("⚠️ Could not start Chrome, skipping the scraper target")
+                        continue
+                    run, concurrency = scraper_runner(scraper), 1
+
+                for name, path, scraping_type in scenarios:
+                    row = {"target": target, "scenario": name, "type": scraping_type, "concurrency": concurrency}
+                    row.update(run_scenario(run, server.base_url, path, scraping_type,
+                                            args.iterations, concurrency, args.warmup))
+                    results.append(row)
+                    print(f"{target:9} {name:16} p50 {row['p50_s']}s  p95 {row['p95_s']}s  p99 {row['p99_s']}s  "
+                          f"{row['pages_per_second']} pages/s  errors {row['errors']}  "
+                          f"rss py {row['peak_python_rss_mb']}MB chrome {row['peak_chrome_rss_mb']}MB")
+    finally:
+        if scraper is not None:
+            scraper.close()
+        scraper_app.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+        for item in regressions:
+            print(f"❌ {item['target']}/{item['scenario']} {item['metric']}: "
+                  f"{item['baseline']} -> {item['current']} ({item['change']:+.0%})")
+        if not regressions:
+            print("✅ No regressions against the baseline")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
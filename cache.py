@@ -0,0 +1,228 @@
+"""Response cache for scrape results.
+
+A size-bounded in-memory LRU sits in front of an optional SQLite tier that
+survives restarts and is shared by every gunicorn worker on the host. Entries
+keep the ``ETag``/``Last-Modified`` validators of the page they came from, so
+stale entries can be revalidated with a conditional preflight instead of
+re-rendering the page.
+"""
+import collections
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+HIT = 'hit'
+MISS = 'miss'
+REVALIDATED = 'revalidated'
+BYPASS = 'bypass'
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form of a URL for cache keys and comparisons"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def cache_key(url, scraping_type, custom_selector=None, render=None, page=None, follow_links=False):
+    """Stable key for a scrape request; page is the (limit, offset) of a non-default result page"""
+    parts = [normalize_url(url), scraping_type, custom_selector, render]
+    if page is not None:
+        parts.append(list(page))
+    if follow_links:
+        parts.append('follow_links')
+    raw = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    """A cached response payload plus the validators of its source page"""
+
+    def __init__(self, key, url, payload, etag=None, last_modified=None, stored_at=None):
+        self.key = key
+        self.url = url
+        self.payload = payload
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at or time.time()
+
+    def age(self):
+        return time.time() - self.stored_at
+
+    @property
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional SQLite) cache of scrape responses"""
+
+    def __init__(self, ttl=300.0, max_entries=500, sqlite_path=None, stale_ttl=86400.0,
+                 max_disk_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_disk_entries = max_disk_entries
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_entries_url ON cache_entries (url)")
+            self._db.commit()
+            logger.info(f"💾 Response cache persisted to {sqlite_path}")
+
+    def is_fresh(self, entry):
+        return entry.age() < self.ttl
+
+    def _remember(self, entry):
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[entry.key] = entry
+        self._memory.move_to_end(entry.key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the entry for a key (fresh or stale), or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT url, payload, etag, last_modified, stored_at FROM cache_entries WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = CacheEntry(key, row[0], json.loads(row[1]), row[2], row[3], row[4])
+                    self._remember(entry)
+
+            if entry is not None and entry.age() > self.stale_ttl:
+                self._delete(key)
+                entry = None
+            return entry
+
+    def put(self, key, url, payload, etag=None, last_modified=None):
+        """Store a response payload"""
+        entry = CacheEntry(key, normalize_url(url), payload, etag, last_modified)
+        with self._lock:
+            self._remember(entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, entry.url, json.dumps(payload), etag, last_modified, entry.stored_at, entry.stored_at)
+                )
+                self._trim_disk()
+                self._db.commit()
+        return entry
+
+    def refresh(self, entry):
+        """Mark an entry as fresh again after a successful revalidation"""
+        entry.stored_at = time.time()
+        with self._lock:
+            self._remember(entry)
+            if self._db is not None:
+                self._db.execute(
+                    "UPDATE cache_entries SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                    (entry.stored_at, entry.stored_at, entry.key)
+                )
+                self._db.commit()
+
+    def _trim_disk(self):
+        cutoff = time.time() - self.stale_ttl
+        self._db.execute("DELETE FROM cache_entries WHERE stored_at < ?", (cutoff,))
+        self._db.execute("""
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_disk_entries,))
+
+    def _delete(self, key):
+        self._memory.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def purge(self, url=None):
+        """Drop every entry, or only the entries for one URL; returns the count"""
+        with self._lock:
+            if url is None:
+                removed = len(self._memory)
+                self._memory.clear()
+                if self._db is not None:
+                    removed = max(removed, self._db.execute("DELETE FROM cache_entries").rowcount)
+                    self._db.commit()
+                return removed
+
+            target = normalize_url(url)
+            keys = [key for key, entry in self._memory.items() if entry.url == target]
+            for key in keys:
+                del self._memory[key]
+            removed = len(keys)
+            if self._db is not None:
+                removed = max(removed, self._db.execute(
+                    "DELETE FROM cache_entries WHERE url = ?", (target,)
+                ).rowcount)
+                self._db.commit()
+            return removed
+
+    def record(self, status):
+        """Count a lookup outcome"""
+        with self._lock:
+            if status == HIT:
+                self.hits += 1
+            elif status == REVALIDATED:
+                self.revalidated += 1
+            elif status == MISS:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.revalidated
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,461 @@
+"""Asynchronous Chrome engine over the raw DevTools protocol.
+
+Instead of one Chrome and one blocking WebDriver HTTP call per action, a
+single Chrome is driven over its DevTools websocket from an asyncio loop
+running in a background thread. Every page gets its own browser context and
+tab, attached as a flattened session on the same connection, so many pages
+load, wait and run extraction scripts concurrently. Request threads submit
+coroutines to the loop and block only on their own page.
+
+``PageDriver`` exposes the small part of the Selenium driver API the
+extractors use (``execute_script``, ``execute_cdp_cmd``, ``current_url``),
+so the in-page extraction scripts run unchanged. The ``websockets`` package
+is only imported once the engine is used.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHROME_BINARIES = (
+    "/usr/bin/chromium-browser",
+    "/usr/bin/google-chrome",
+    "/usr/bin/chrome",
+    "/usr/bin/chromium",
+    "/snap/bin/chromium",
+)
+
+CHROME_ARGS = (
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-blink-features=AutomationControlled",
+    "--ignore-certificate-errors",
+    "--mute-audio",
+    "--window-size=1366,768",
+)
+
+NETWORK_START_EVENTS = ('Network.requestWillBeSent',)
+NETWORK_END_EVENTS = ('Network.loadingFinished', 'Network.loadingFailed')
+
+
+class CdpError(Exception):
+    """A DevTools command failed or the browser went away"""
+
+
+class CdpTimeout(CdpError):
+    """A navigation or command did not finish in time"""
+
+
+class TabsBusy(CdpError):
+    """Every tab slot of the browser is in use"""
+
+
+def find_chrome_binary(preferred=None):
+    """Path of a Chrome/Chromium executable, or None"""
+    for candidate in ((preferred,) if preferred else ()) + CHROME_BINARIES:
+        if os.path.exists(candidate):
+            return candidate
+    for name in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome'):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+class CdpConnection:
+    """One DevTools websocket carrying the browser session and every attached tab session"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._reader = asyncio.get_running_loop().create_task(self._read())
+
+    @classmethod
+    async def connect(cls, url):
+        try:
+            import websockets
+        except ImportError:
+            raise CdpError("The cdp engine needs the websockets package (pip install websockets)")
+        ws = await websockets.connect(url, max_size=None, ping_interval=None)
+        return cls(ws)
+
+    async def send(self, method, params=None, session_id=None, timeout=30.0):
+        if self.closed:
+            raise CdpError("DevTools connection is closed")
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self.ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise CdpTimeout(f"{method} timed out after {timeout}s")
+        finally:
+            self._pending.pop(message_id, None)
+
+    def listen(self, session_id, callback):
+        self._listeners[session_id] = callback
+
+    def unlisten(self, session_id):
+        self._listeners.pop(session_id, None)
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CdpError(message["error"].get("message", "CDP error")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+
+                callback = self._listeners.get(message.get("sessionId"))
+                if callback is not None:
+                    callback(message.get("method"), message.get("params", {}))
+        except Exception as e:
+            logger.warning(f"DevTools connection lost: {e}")
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CdpError("DevTools connection closed"))
+
+    async def close(self):
+        self.closed = True
+        await self.ws.close()
+
+
+class CdpPage:
+    """One tab in its own browser context, driven through a flattened session"""
+
+    def __init__(self, connection, context_id, target_id, session_id):
+        self.connection = connection
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+        self.url = 'about:blank'
+        self.document_status = None
+        self.document_headers = {}
+        self.inflight = set()
+        self.last_network_activity = time.monotonic()
+        self._events = {}
+        connection.listen(session_id, self._on_event)
+
+    @classmethod
+    async def open(cls, connection, init_script=None):
+        """Create a context and a blank tab in it, ready for navigation"""
+        context_id = (await connection.send('Target.createBrowserContext', {}))['browserContextId']
+        try:
+            target_id = (await connection.send('Target.createTarget', {
+                'url': 'about:blank',
+                'browserContextId': context_id,
+            }))['targetId']
+            session_id = (await connection.send('Target.attachToTarget', {
+                'targetId': target_id,
+                'flatten': True,
+            }))['sessionId']
+        except Exception:
+            await connection.send('Target.disposeBrowserContext', {'browserContextId': context_id})
+            raise
+
+        page = cls(connection, context_id, target_id, session_id)
+        try:
+            await asyncio.gather(page.send('Page.enable'), page.send('Network.enable'))
+            if init_script:
+                await page.send('Page.addScriptToEvaluateOnNewDocument', {'source': init_script})
+        except Exception:
+            await page.close()
+            raise
+        return page
+
+    def _on_event(self, method, params):
+        if method in NETWORK_START_EVENTS:
+            self.inflight.add(params.get('requestId'))
+            self.last_network_activity = time.monotonic()
+        elif method in NETWORK_END_EVENTS:
+            self.inflight.discard(params.get('requestId'))
+            self.last_network_activity = time.monotonic()
+        elif method == 'Network.responseReceived' and params.get('type') == 'Document':
+            if self.document_status is None:
+                response = params.get('response', {})
+                self.document_status = response.get('status')
+                self.document_headers = {name.lower(): value for name, value in response.get('headers', {}).items()}
+        elif method == 'Page.frameNavigated' and not params.get('frame', {}).get('parentId'):
+            self.url = params['frame'].get('url', self.url)
+
+        event = self._events.get(method)
+        if event is not None:
+            event.set()
+
+    def _expect(self, method):
+        """Start listening for an event before triggering it"""
+        event = self._events[method] = asyncio.Event()
+        return event
+
+    async def send(self, method, params=None, timeout=30.0):
+        return await self.connection.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def goto(self, url, timeout=45.0):
+        """Navigate and return once the document has been parsed (DOMContentLoaded)"""
+        dom_ready = self._expect('Page.domContentEventFired')
+        self._expect('Page.loadEventFired')
+        self.inflight.clear()
+        self.document_status = None
+        self.document_headers = {}
+        result = await self.send('Page.navigate', {'url': url}, timeout=timeout)
+        if result.get('errorText'):
+            raise CdpError(f"{result['errorText']} loading {url}")
+        try:
+            await asyncio.wait_for(dom_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise CdpTimeout(f"DOMContentLoaded not reached for {url} after {timeout}s")
+
+    async def evaluate(self, script, *args, timeout=30.0):
+        """Run a function body with ``arguments`` bound to args and return its JSON value"""
+        expression = f"(function () {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+        return await self._evaluate(expression, timeout)
+
+    async def evaluate_async(self, script, *args, timeout=30.0):
+        """Like evaluate, for scripts that report through a callback passed as the last argument"""
+        expression = (f"new Promise((resolve) => {{ (function () {{\n{script}\n}})"
+                      f".apply(null, {json.dumps(list(args))}.concat([resolve])); }})")
+        return await self._evaluate(expression, timeout)
+
+    async def _evaluate(self, expression, timeout):
+        result = await self.send('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': True,
+        }, timeout=timeout)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            description = details.get('exception', {}).get('description') or details.get('text')
+            raise CdpError(f"Script error: {description}")
+        return result.get('result', {}).get('value')
+
+    async def wait_until_ready(self, kind, timeout, selector=None, idle_time=0.5, max_inflight=0,
+                               quiet_window=0.5, mutation_script=None):
+        """Apply a wait strategy; returns False if it ran out of time"""
+        try:
+            await asyncio.wait_for(
+                self._ready(kind, timeout, selector, idle_time, max_inflight, quiet_window, mutation_script),
+                timeout,
+            )
+            return True
+        except (asyncio.TimeoutError, CdpTimeout):
+            return False
+
+    async def _ready(self, kind, timeout, selector, idle_time, max_inflight, quiet_window, mutation_script):
+        if kind == 'domcontentloaded':
+            return
+        if kind == 'load':
+            state = await self.evaluate("return document.readyState;")
+            if state != 'complete':
+                await self._events['Page.loadEventFired'].wait()
+        elif kind == 'networkidle':
+            while True:
+                quiet_for = time.monotonic() - self.last_network_activity
+                if len(self.inflight) <= max_inflight and quiet_for >= idle_time:
+                    return
+                await asyncio.sleep(min(0.1, idle_time))
+        elif kind == 'selector':
+            while not await self.evaluate("return document.querySelector(arguments[0]) !== null;", selector):
+                await asyncio.sleep(0.1)
+        elif kind == 'mutations':
+            await self.evaluate_async(mutation_script, quiet_window * 1000, timeout * 1000, timeout=timeout + 1)
+
+    async def close(self):
+        """Dispose of the context, which also closes its tab"""
+        self.connection.unlisten(self.session_id)
+        if not self.connection.closed:
+            await self.connection.send('Target.disposeBrowserContext', {'browserContextId': self.context_id})
+
+
+class CdpBrowser:
+    """One Chrome process plus the event loop thread that drives all of its tabs"""
+
+    def __init__(self, binary=None, max_tabs=16, tab_timeout=30.0, extra_args=()):
+        self.binary = binary
+        self.max_tabs = max_tabs
+        self.tab_timeout = tab_timeout
+        self.extra_args = tuple(extra_args)
+        self.process = None
+        self.connection = None
+        self.user_data_dir = None
+        self.pages_opened = 0
+        self.launches = 0
+        self._in_use = 0
+        self._tabs = threading.BoundedSemaphore(max_tabs)
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="cdp-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the engine loop from any thread and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    @property
+    def running(self):
+        return (self.process is not None and self.process.poll() is None and
+                self.connection is not None and not self.connection.closed)
+
+    def start(self):
+        """Launch Chrome and connect to it, unless it is already running"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop_process()
+
+            binary = find_chrome_binary(self.binary)
+            if binary is None:
+                raise CdpError("No Chrome/Chromium binary found for the cdp engine")
+            self.user_data_dir = tempfile.mkdtemp(prefix="chrome_cdp_")
+            args = [binary, *CHROME_ARGS, *self.extra_args, f"--user-data-dir={self.user_data_dir}",
+                    "--remote-debugging-port=0", "about:blank"]
+            started = time.time()
+            self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            url = self._wait_for_endpoint()
+            self.connection = self.run(CdpConnection.connect(url), timeout=20)
+            self.launches += 1
+            logger.info(f"✅ CDP engine connected to Chrome pid {self.process.pid} in {time.time() - started:.2f}s")
+
+    def _wait_for_endpoint(self, timeout=20.0):
+        """The browser websocket URL, read from the DevToolsActivePort file Chrome writes"""
+        path = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise CdpError(f"Chrome exited with code {self.process.returncode} during startup")
+            try:
+                with open(path) as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    return f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+            except OSError:
+                pass
+            time.sleep(0.05)
+        raise CdpError("Chrome did not open its DevTools port in time")
+
+    def open_page(self, init_script=None):
+        """Reserve a tab slot and open a fresh page; release it with close_page"""
+        if not self._tabs.acquire(timeout=self.tab_timeout):
+            raise TabsBusy(f"All {self.max_tabs} CDP tabs are busy")
+        try:
+            self.start()
+            page = self.run(CdpPage.open(self.connection, init_script), timeout=30)
+        except Exception:
+            self._tabs.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self.pages_opened += 1
+        return page
+
+    def close_page(self, page):
+        try:
+            self.run(page.close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Could not close CDP page: {e}")
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._tabs.release()
+
+    def _stop_process(self):
+        if self.connection is not None:
+            try:
+                self.run(self.connection.close(), timeout=5)
+            except Exception:
+                pass
+            self.connection = None
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "pid": self.process.pid if self.process is not None else None,
+                "tabs_in_use": self._in_use,
+                "max_tabs": self.max_tabs,
+                "pages_opened": self.pages_opened,
+                "launches": self.launches,
+            }
+
+    def close(self):
+        with self._lock:
+            self._stop_process()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class PageDriver:
+    """Synchronous, Selenium-shaped handle on one CdpPage"""
+
+    def __init__(self, browser, page):
+        self.browser = browser
+        self.page = page
+
+    @property
+    def current_url(self):
+        return self.page.url
+
+    @property
+    def document_status(self):
+        """HTTP status of the last navigation's main document, if seen"""
+        return self.page.document_status
+
+    def document_header(self, name):
+        return self.page.document_headers.get(name.lower())
+
+    def get(self, url, timeout=45.0):
+        self.browser.run(self.page.goto(url, timeout), timeout=timeout + 5)
+
+    def execute_script(self, script, *args):
+        return self.browser.run(self.page.evaluate(script, *args), timeout=60)
+
+    def execute_cdp_cmd(self, method, params):
+        return self.browser.run(self.page.send(method, params), timeout=35)
+
+    def wait_until_ready(self, strategy, mutation_script=None):
+        return self.browser.run(self.page.wait_until_ready(
+            strategy.kind, strategy.timeout, selector=strategy.selector, idle_time=strategy.idle_time,
+            max_inflight=strategy.max_inflight, quiet_window=strategy.quiet_window,
+            mutation_script=mutation_script,
+        ), timeout=strategy.timeout + 5)
+
+    def close(self):
+        self.browser.close_page(self.page)
@@ -0,0 +1,246 @@
+"""Background watchdog for the Chrome processes behind the scrapers.
+
+Every ``interval`` seconds it samples the RSS and CPU of each driver's
+process tree (chromedriver, Chrome and its renderers) and recycles drivers
+above the memory cap: pooled ones through the pool, the job and task
+workers' own ones by flagging them for their worker to replace between
+tasks. A busy driver finishes its request first. Every ``reap_interval`` seconds it kills Chrome/chromedriver
+processes orphaned by crashed drivers and removes profile directories no
+running Chrome uses any more, so neither happens on the request path.
+"""
+import glob
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+import procinfo
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PATTERNS = ('/tmp/chrome_smart_*', os.path.join(tempfile.gettempdir(), 'chrome_cdp_*'))
+PROFILE_PREFIXES = ('chrome_smart_', 'chrome_cdp_')
+MB = 1024 * 1024
+
+
+def driver_pid(scraper):
+    """pid of a scraper's chromedriver process, or None"""
+    try:
+        return scraper.driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def profile_dir(args):
+    """The --user-data-dir of a Chrome command line, if it is one of ours"""
+    for arg in args:
+        if arg.startswith('--user-data-dir='):
+            path = arg.split('=', 1)[1]
+            if os.path.basename(path.rstrip('/')).startswith(PROFILE_PREFIXES):
+                return path
+    return None
+
+
+class Watchdog:
+    """Samples, recycles and reaps the browser processes of a DriverPool"""
+
+    def __init__(self, pool, interval=15.0, max_rss_mb=1500, reap_interval=300.0, profile_grace=300.0,
+                 extra_roots=None, live_scrapers=None):
+        self.pool = pool
+        self.interval = interval
+        self.max_rss_bytes = max_rss_mb * MB if max_rss_mb else None
+        self.reap_interval = reap_interval
+        self.profile_grace = profile_grace
+        self.extra_roots = extra_roots  # Callable returning {name: pid} of other browsers to watch
+        self.live_scrapers = live_scrapers  # Callable returning every live scraper, pooled or not
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._owner_pid = None
+        self._cpu = {}  # root pid -> (cpu seconds, sampled at)
+        self._last_reap = 0.0
+        self.drivers = []
+        self.others = {}
+        self.sampled_at = None
+        self.recycled_total = 0
+        self.orphans_killed_total = 0
+        self.profiles_removed_total = 0
+
+    def ensure_started(self):
+        """Start the background thread once per process (again after a fork)"""
+        if self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._owner_pid == os.getpid():
+                return
+            self._owner_pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="chrome-watchdog", daemon=True)
+            self._thread.start()
+        logger.info(f"🐕 Chrome watchdog started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Watchdog pass failed: {e}")
+
+    def _usage(self, pid, parents, now):
+        """Tree usage of a root process, plus CPU percent since its previous sample"""
+        usage = procinfo.tree_usage(pid, parents)
+        previous = self._cpu.get(pid)
+        self._cpu[pid] = (usage["cpu_seconds"], now)
+        if previous is not None and now > previous[1]:
+            usage["cpu_percent"] = round(100 * (usage["cpu_seconds"] - previous[0]) / (now - previous[1]), 1)
+        else:
+            usage["cpu_percent"] = None
+        return usage
+
+    def _over_limit(self, usage):
+        """Why a driver should be recycled for its memory use, or None"""
+        if self.max_rss_bytes and usage["rss_bytes"] > self.max_rss_bytes:
+            return f"RSS {usage['rss_bytes'] // MB} MB over {self.max_rss_bytes // MB} MB"
+        return None
+
+    def run_once(self):
+        """One sampling pass; reaps as well when reap_interval has passed"""
+        now = time.time()
+        parents = procinfo.parent_map()
+        protected = {os.getpid()}
+        drivers = []
+
+        members = self.pool.members()
+        for pooled, in_use in members:
+            pid = driver_pid(pooled.scraper)
+            if pid is None:
+                continue
+            usage = self._usage(pid, parents, now)
+            protected.add(pid)
+            protected.update(procinfo.descendants(pid, parents))
+            drivers.append(dict(usage, pid=pid, in_use=in_use, pooled=True, pages_served=pooled.pages_served,
+                                age=round(now - pooled.created_at, 1)))
+
+            reason = self._over_limit(usage)
+            if reason and pooled.recycle_reason is None and self.pool.recycle(pooled, reason):
+                self.recycled_total += 1
+
+        # Job and task workers own their scrapers outside the pool; they close a
+        # flagged driver once its current task is done and start a fresh one
+        pooled_scrapers = {id(pooled.scraper) for pooled, _ in members}
+        for scraper in (self.live_scrapers() if self.live_scrapers else ()):
+            pid = driver_pid(scraper)
+            if pid is None or id(scraper) in pooled_scrapers:
+                continue
+            usage = self._usage(pid, parents, now)
+            protected.add(pid)
+            protected.update(procinfo.descendants(pid, parents))
+            started_at = scraper.driver_started_at or now
+            drivers.append(dict(usage, pid=pid, in_use=scraper.busy, pooled=False,
+                                pages_served=scraper.pages_served, age=round(now - started_at, 1)))
+
+            reason = self._over_limit(usage)
+            if reason and scraper.recycle_reason is None:
+                scraper.recycle_reason = reason
+                self.recycled_total += 1
+
+        others = {}
+        for name, pid in (self.extra_roots() if self.extra_roots else {}).items():
+            if pid is not None:
+                others[name] = dict(self._usage(pid, parents, now), pid=pid)
+                protected.add(pid)
+                protected.update(procinfo.descendants(pid, parents))
+
+        live_roots = {driver["pid"] for driver in drivers} | {other["pid"] for other in others.values()}
+        self._cpu = {pid: sample for pid, sample in self._cpu.items() if pid in live_roots}
+        self.drivers, self.others, self.sampled_at = drivers, others, now
+
+        if now - self._last_reap >= self.reap_interval:
+            self._last_reap = now
+            self.reap(parents, protected)
+
+    def reap(self, parents=None, protected=()):
+        """Kill orphaned Chrome/chromedriver processes and remove unused profiles
+
+        Only process trees running a Chrome on one of this app's profiles
+        are touched: chromedrivers of other services on the host are left
+        alone, as are the live browsers in ``protected``.
+        """
+        parents = procinfo.parent_map() if parents is None else parents
+        commands = {pid: args for pid, args in ((pid, procinfo.cmdline(pid)) for pid in parents) if args}
+        ours = set()
+        profiles_in_use = set()
+        for pid, args in commands.items():
+            profile = profile_dir(args)
+            if profile:
+                ours.add(pid)
+                profiles_in_use.add(os.path.realpath(profile))
+
+        killed = set()
+        for pid, args in commands.items():
+            # Orphans were re-parented to init when the process that started them died
+            if parents.get(pid) != 1 or pid in protected or pid in killed:
+                continue
+            is_driver = os.path.basename(args[0]).startswith('chromedriver')
+            if not (is_driver or pid in ours):
+                continue
+            tree = [pid] + procinfo.descendants(pid, parents)
+            if not ours.intersection(tree):
+                continue
+            for victim in tree:
+                if victim in protected or victim in killed:
+                    continue
+                try:
+                    os.kill(victim, signal.SIGKILL)
+                    killed.add(victim)
+                    self.orphans_killed_total += 1
+                    logger.info(f"🪓 Killed orphaned {'chromedriver' if victim == pid and is_driver else 'Chrome'} "
+                                f"process {victim}")
+                except OSError as e:
+                    logger.warning(f"Could not kill orphaned process {victim}: {e}")
+
+        cutoff = time.time() - self.profile_grace
+        for pattern in PROFILE_PATTERNS:
+            for path in glob.glob(pattern):
+                try:
+                    # A profile is created just before its Chrome starts; leave young ones alone
+                    if os.path.realpath(path) in profiles_in_use or os.path.getmtime(path) > cutoff:
+                        continue
+                    shutil.rmtree(path)
+                    self.profiles_removed_total += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove stale profile {path}: {e}")
+
+    def stats(self):
+        drivers = list(self.drivers)
+        return {
+            "running": self._owner_pid == os.getpid() and not self._stop.is_set(),
+            "sampled_at": self.sampled_at,
+            "max_rss_mb": self.max_rss_bytes // MB if self.max_rss_bytes else None,
+            "total_rss_mb": round(sum(driver["rss_bytes"] for driver in drivers) / MB, 1),
+            "drivers": [{
+                "pid": driver["pid"],
+                "rss_mb": round(driver["rss_bytes"] / MB, 1),
+                "cpu_percent": driver["cpu_percent"],
+                "processes": driver["processes"],
+                "pages_served": driver["pages_served"],
+                "age": driver["age"],
+                "in_use": driver["in_use"],
+                "pooled": driver["pooled"],
+            } for driver in drivers],
+            "browsers": {name: {
+                "pid": usage["pid"],
+                "rss_mb": round(usage["rss_bytes"] / MB, 1),
+                "cpu_percent": usage["cpu_percent"],
+                "processes": usage["processes"],
+            } for name, usage in self.others.items()},
+            "recycled_total": self.recycled_total,
+            "orphans_killed_total": self.orphans_killed_total,
+            "profiles_removed_total": self.profiles_removed_total,
+        }
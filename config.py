@@ -0,0 +1,154 @@
+"""Runtime configuration, read from the environment (and an optional .env file)"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name, default):
+    """Read an integer setting, falling back to the default on bad values"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name, default):
+    """Read a float setting, falling back to the default on bad values"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_bool(name, default):
+    """Read a boolean setting (1/true/yes/on)"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Driver pool
+POOL_MIN_SIZE = env_int('SCRAPER_POOL_MIN_SIZE', 1)
+POOL_MAX_SIZE = env_int('SCRAPER_POOL_MAX_SIZE', 4)
+POOL_CHECKOUT_TIMEOUT = env_float('SCRAPER_POOL_CHECKOUT_TIMEOUT', 30.0)
+POOL_MAX_PAGES_PER_DRIVER = env_int('SCRAPER_POOL_MAX_PAGES', 200)
+
+# Static-HTML engine
+STATIC_ENGINE_ENABLED = env_bool('SCRAPER_STATIC_ENGINE', True)
+STATIC_MIN_TEXT_LENGTH = env_int('SCRAPER_STATIC_MIN_TEXT_LENGTH', 250)
+
+# Browser readiness
+WAIT_STRATEGY = os.environ.get('SCRAPER_WAIT_STRATEGY', 'networkidle')
+WAIT_TIMEOUT = env_float('SCRAPER_WAIT_TIMEOUT', 15.0)
+
+# Asynchronous jobs
+JOB_WORKERS = env_int('SCRAPER_JOB_WORKERS', 2)
+JOB_QUEUE_SIZE = env_int('SCRAPER_JOB_QUEUE_SIZE', 50)
+JOB_DEFAULT_DEADLINE = env_float('SCRAPER_JOB_DEADLINE', 300.0)
+JOB_RESULT_TTL = env_float('SCRAPER_JOB_RESULT_TTL', 900.0)
+
+# Batch scraping
+BATCH_PARALLELISM = env_int('SCRAPER_BATCH_PARALLELISM', 8)
+BATCH_MAX_PARALLELISM = env_int('SCRAPER_BATCH_MAX_PARALLELISM', 32)
+BATCH_PER_HOST_LIMIT = env_int('SCRAPER_BATCH_PER_HOST_LIMIT', 2)
+BATCH_MAX_URLS = env_int('SCRAPER_BATCH_MAX_URLS', 1000)
+
+# Response cache
+CACHE_ENABLED = env_bool('SCRAPER_CACHE', True)
+CACHE_TTL = env_float('SCRAPER_CACHE_TTL', 300.0)
+CACHE_STALE_TTL = env_float('SCRAPER_CACHE_STALE_TTL', 86400.0)
+CACHE_MAX_ENTRIES = env_int('SCRAPER_CACHE_MAX_ENTRIES', 500)
+CACHE_SQLITE_PATH = os.environ.get('SCRAPER_CACHE_SQLITE_PATH', '')
+
+# Preflight HTTP client
+HTTP_POOL_HOSTS = env_int('SCRAPER_HTTP_POOL_HOSTS', 100)
+HTTP_PER_HOST_CONNECTIONS = env_int('SCRAPER_HTTP_PER_HOST_CONNECTIONS', 10)
+HTTP_RESOLUTION_TTL = env_float('SCRAPER_HTTP_RESOLUTION_TTL', 3600.0)
+
+# Browser subresource blocking
+BLOCK_RESOURCES = os.environ.get('SCRAPER_BLOCK_RESOURCES', 'image,font,media')
+BLOCK_TRACKERS = env_bool('SCRAPER_BLOCK_TRACKERS', True)
+
+# Crawling
+CRAWL_MAX_DEPTH = env_int('SCRAPER_CRAWL_MAX_DEPTH', 2)
+CRAWL_MAX_PAGES = env_int('SCRAPER_CRAWL_MAX_PAGES', 100)
+CRAWL_MAX_PAGES_LIMIT = env_int('SCRAPER_CRAWL_MAX_PAGES_LIMIT', 100000)
+CRAWL_PARALLELISM = env_int('SCRAPER_CRAWL_PARALLELISM', 4)
+CRAWL_PER_HOST_LIMIT = env_int('SCRAPER_CRAWL_PER_HOST_LIMIT', 2)
+CRAWL_HOST_DELAY = env_float('SCRAPER_CRAWL_HOST_DELAY', 1.0)
+CRAWL_RESPECT_ROBOTS = env_bool('SCRAPER_CRAWL_RESPECT_ROBOTS', True)
+CRAWL_ROBOTS_AGENT = os.environ.get('SCRAPER_CRAWL_ROBOTS_AGENT', '*')
+CRAWL_DEDUP = os.environ.get('SCRAPER_CRAWL_DEDUP', 'bloom')  # bloom or sqlite
+CRAWL_BLOOM_CAPACITY = env_int('SCRAPER_CRAWL_BLOOM_CAPACITY', 1000000)
+CRAWL_BLOOM_ERROR_RATE = env_float('SCRAPER_CRAWL_BLOOM_ERROR_RATE', 0.001)
+CRAWL_MAX_FRONTIER = env_int('SCRAPER_CRAWL_MAX_FRONTIER', 100000)
+
+# Extraction limits and streaming
+EXTRACT_MAX_LIMIT = env_int('SCRAPER_EXTRACT_MAX_LIMIT', 1000000)
+STREAM_CHUNK_SIZE = env_int('SCRAPER_STREAM_CHUNK_SIZE', 500)
+
+# Isolate every browser scrape in a fresh CDP browser context and tab
+BROWSER_CONTEXTS = env_bool('SCRAPER_BROWSER_CONTEXTS', True)
+
+# Browser engine: selenium (pooled WebDriver) or cdp (asyncio DevTools, many tabs per Chrome)
+BROWSER_ENGINE = os.environ.get('SCRAPER_BROWSER_ENGINE', 'selenium')
+CDP_MAX_TABS = env_int('SCRAPER_CDP_MAX_TABS', 16)
+CDP_TAB_TIMEOUT = env_float('SCRAPER_CDP_TAB_TIMEOUT', 30.0)
+CHROME_BINARY = os.environ.get('SCRAPER_CHROME_BINARY', '')
+
+# Per-host rate limiting shared by preflight, static and browser requests
+HOST_LIMITS_ENABLED = env_bool('SCRAPER_HOST_LIMITS', True)
+HOST_RATE = env_float('SCRAPER_HOST_RATE', 5.0)
+HOST_BURST = env_int('SCRAPER_HOST_BURST', 10)
+HOST_INITIAL_WINDOW = env_int('SCRAPER_HOST_INITIAL_WINDOW', 4)
+HOST_MAX_WINDOW = env_int('SCRAPER_HOST_MAX_WINDOW', 32)
+HOST_LATENCY_TARGET = env_float('SCRAPER_HOST_LATENCY_TARGET', 5.0)
+HOST_ACQUIRE_TIMEOUT = env_float('SCRAPER_HOST_ACQUIRE_TIMEOUT', 60.0)
+HOST_MAX_RETRY_AFTER = env_float('SCRAPER_HOST_MAX_RETRY_AFTER', 300.0)
+
+# Retries of transient failures (exponential back-off with full jitter) within a per-scrape deadline
+RETRY_MAX_ATTEMPTS = env_int('SCRAPER_RETRY_MAX_ATTEMPTS', 3)
+PREFLIGHT_MAX_ATTEMPTS = env_int('SCRAPER_PREFLIGHT_MAX_ATTEMPTS', 2)
+RETRY_BASE_DELAY = env_float('SCRAPER_RETRY_BASE_DELAY', 0.5)
+RETRY_MAX_DELAY = env_float('SCRAPER_RETRY_MAX_DELAY', 8.0)
+SCRAPE_DEADLINE = env_float('SCRAPER_SCRAPE_DEADLINE', 120.0)  # 0 disables the budget
+
+# Per-host circuit breakers for hosts that keep failing at the network level
+CIRCUIT_BREAKER_ENABLED = env_bool('SCRAPER_CIRCUIT_BREAKER', True)
+CIRCUIT_FAILURE_THRESHOLD = env_int('SCRAPER_CIRCUIT_FAILURE_THRESHOLD', 5)
+CIRCUIT_COOLDOWN = env_float('SCRAPER_CIRCUIT_COOLDOWN', 60.0)
+
+# Result store for change detection and diff mode (SQLite file; empty disables it)
+RESULT_STORE_PATH = os.environ.get('SCRAPER_RESULT_STORE_PATH', '')
+RESULT_STORE_MAX_SNAPSHOTS = env_int('SCRAPER_RESULT_STORE_MAX_SNAPSHOTS', 20)
+
+# Named extraction recipes (SQLite file shared by the workers; empty keeps them per worker, in memory).
+# Set it whenever several front ends share a task queue: queued tasks carry their recipe, name lookups do not.
+RECIPES_PATH = os.environ.get('SCRAPER_RECIPES_PATH', '')
+
+# Chrome watchdog: process-tree sampling, memory-based driver recycling, orphan and profile reaping
+WATCHDOG_ENABLED = env_bool('SCRAPER_WATCHDOG', True)
+WATCHDOG_INTERVAL = env_float('SCRAPER_WATCHDOG_INTERVAL', 15.0)
+WATCHDOG_MAX_RSS_MB = env_int('SCRAPER_WATCHDOG_MAX_RSS_MB', 1500)  # 0 disables memory recycling
+WATCHDOG_REAP_INTERVAL = env_float('SCRAPER_WATCHDOG_REAP_INTERVAL', 300.0)
+WATCHDOG_PROFILE_GRACE = env_float('SCRAPER_WATCHDOG_PROFILE_GRACE', 300.0)
+
+# Worker start-up: deferred imports and browsers launched in the background after fork
+PRELOAD_IMPORTS = env_bool('SCRAPER_PRELOAD_IMPORTS', True)
+WARM_BROWSERS = env_int('SCRAPER_WARM_BROWSERS', POOL_MIN_SIZE)
+
+# Distributed task queue (sqlite:///path or redis://host:port/db) served by scrape_worker.py
+TASK_QUEUE = os.environ.get('SCRAPER_TASK_QUEUE', '')
+TASK_QUEUE_CAPACITY = env_int('SCRAPER_TASK_QUEUE_CAPACITY', 1000)
+TASK_MAX_ATTEMPTS = env_int('SCRAPER_TASK_MAX_ATTEMPTS', 3)
+TASK_VISIBILITY_TIMEOUT = env_float('SCRAPER_TASK_VISIBILITY_TIMEOUT', 60.0)
+TASK_POLL_INTERVAL = env_float('SCRAPER_TASK_POLL_INTERVAL', 1.0)
+TASK_WORKER_THREADS = env_int('SCRAPER_TASK_WORKER_THREADS', 2)
+SCRAPE_VIA_QUEUE = env_bool('SCRAPER_SCRAPE_VIA_QUEUE', False)  # /api/scrape waits on the workers instead of scraping
+
+# Response encoding: zstd/gzip compression of bodies at least this large, when the client accepts it
+RESPONSE_COMPRESSION = env_bool('SCRAPER_RESPONSE_COMPRESSION', True)
+RESPONSE_COMPRESS_MIN_BYTES = env_int('SCRAPER_RESPONSE_COMPRESS_MIN_BYTES', 1024)
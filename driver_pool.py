@@ -0,0 +1,285 @@
+"""Pool of warm Chrome drivers shared by concurrent scrape requests"""
+import collections
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No driver became available within the checkout timeout"""
+
+
+class DriverStartError(Exception):
+    """A new driver could not be started"""
+
+
+class PooledDriver:
+    """A scraper owned by the pool plus its bookkeeping"""
+
+    def __init__(self, scraper, generation):
+        self.scraper = scraper
+        self.generation = generation
+        self.pages_served = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.recycle_reason = None
+
+
+class DriverPool:
+    """Thread-safe pool of SmartWebScraper instances with live drivers.
+
+    Drivers are created on demand up to ``max_size``, probed before being
+    handed out, and replaced when they crash or have served ``max_pages``.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=4, checkout_timeout=30.0, max_pages=200):
+        self.factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.checkout_timeout = checkout_timeout
+        self.max_pages = max_pages
+
+        self._cond = threading.Condition()
+        self._idle = collections.deque()
+        self._members = set()
+        self._pending = 0
+        self._generation = 0
+        self._closed = False
+
+        self.created_total = 0
+        self.retired_total = 0
+        self.checkouts_total = 0
+
+    def _size(self):
+        return len(self._members) + self._pending
+
+    def _spawn(self):
+        """Start a new driver outside the pool lock"""
+        scraper = self.factory()
+        if not scraper.setup_smart_driver():
+            scraper.close()
+            raise DriverStartError("Failed to initialize smart web driver")
+        return scraper
+
+    def _create_member(self):
+        """Reserve a slot, start a driver and register it with the pool"""
+        try:
+            scraper = self._spawn()
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._pending -= 1
+            pooled = PooledDriver(scraper, self._generation)
+            self._members.add(pooled)
+            self.created_total += 1
+        logger.info(f"🏊 Driver pool grew to {len(self._members)} driver(s)")
+        return pooled
+
+    def _is_healthy(self, pooled):
+        """Cheap probe that the driver still answers commands"""
+        driver = pooled.scraper.driver
+        if driver is None:
+            return False
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception as e:
+            logger.warning(f"Pooled driver failed health probe: {e}")
+            return False
+
+    def _should_retire(self, pooled):
+        return (pooled.generation != self._generation
+                or pooled.recycle_reason is not None
+                or (self.max_pages and pooled.pages_served >= self.max_pages))
+
+    def _retire(self, pooled, reason):
+        """Drop a driver from the pool and close it"""
+        with self._cond:
+            if pooled in self._members:
+                self._members.discard(pooled)
+                self.retired_total += 1
+            self._cond.notify()
+        logger.info(f"♻️ Retiring pooled driver ({reason}) after {pooled.pages_served} page(s)")
+        try:
+            pooled.scraper.close()
+        except Exception as e:
+            logger.warning(f"Error closing retired driver: {e}")
+        self._replenish_async()
+
+    def _replenish_async(self):
+        """Top the pool back up to min_size in the background"""
+        with self._cond:
+            missing = self.min_size - self._size()
+            if self._closed or missing <= 0:
+                return
+            self._pending += missing
+
+        def replenish():
+            for _ in range(missing):
+                try:
+                    pooled = self._create_member()
+                except Exception as e:
+                    logger.warning(f"Failed to replenish driver pool: {e}")
+                    continue
+                with self._cond:
+                    self._idle.append(pooled)
+                    self._cond.notify()
+
+        threading.Thread(target=replenish, name="driver-pool-replenish", daemon=True).start()
+
+    def warm(self, target=None):
+        """Start drivers until the pool holds min_size (or target, up to max_size) of them"""
+        target = self.min_size if target is None else min(target, self.max_size)
+        with self._cond:
+            missing = target - self._size()
+            self._pending += max(0, missing)
+
+        started = 0
+        for _ in range(max(0, missing)):
+            try:
+                pooled = self._create_member()
+            except Exception as e:
+                logger.warning(f"Driver pool warm-up failed: {e}")
+                continue
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+            started += 1
+        return started
+
+    def checkout(self, timeout=None):
+        """Hand out a healthy driver, waiting up to ``timeout`` seconds"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise DriverStartError("Driver pool is closed")
+                while not self._idle and self._size() >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No driver available within {timeout}s")
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    pooled = self._idle.pop()  # Most recently used is the warmest
+                    create = False
+                else:
+                    self._pending += 1
+                    create = True
+
+            if create:
+                pooled = self._create_member()
+            elif self._should_retire(pooled):
+                self._retire(pooled, "stale")
+                continue
+            elif not self._is_healthy(pooled):
+                self._retire(pooled, "failed health probe")
+                continue
+
+            with self._cond:
+                self.checkouts_total += 1
+            return pooled
+
+    def checkin(self, pooled, failed=False):
+        """Return a driver, replacing it if it crashed or is worn out"""
+        pooled.pages_served += 1
+        pooled.last_used = time.time()
+
+        if failed and not self._is_healthy(pooled):
+            self._retire(pooled, "crashed")
+            return
+
+        with self._cond:
+            retire = self._closed or self._should_retire(pooled)
+            if not retire:
+                self._idle.append(pooled)
+                self._cond.notify()
+        if retire:
+            if self._closed:
+                reason = "pool closed"
+            else:
+                reason = pooled.recycle_reason or "page limit reached"
+            self._retire(pooled, reason)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Context manager yielding a SmartWebScraper with a live driver"""
+        pooled = self.checkout(timeout)
+        failed = False
+        try:
+            yield pooled.scraper
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.checkin(pooled, failed=failed)
+
+    def members(self):
+        """(pooled driver, in use) for every live driver"""
+        with self._cond:
+            idle = set(self._idle)
+            return [(pooled, pooled not in idle) for pooled in self._members]
+
+    def recycle(self, pooled, reason):
+        """Replace a driver: now if it is idle, otherwise when its request checks it in"""
+        with self._cond:
+            if pooled not in self._members or self._closed:
+                return False
+            pooled.recycle_reason = reason
+            idle = pooled in self._idle
+            if idle:
+                self._idle.remove(pooled)
+        if idle:
+            self._retire(pooled, reason)
+        return True
+
+    def restart(self):
+        """Replace every driver; busy drivers are retired when checked in"""
+        with self._cond:
+            self._generation += 1
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            self._retire(pooled, "restart requested")
+        return self.warm()
+
+    def stats(self):
+        """Snapshot of pool utilisation"""
+        with self._cond:
+            size = len(self._members)
+            idle = len(self._idle)
+            return {
+                "size": size,
+                "idle": idle,
+                "in_use": size - idle,
+                "starting": self._pending,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "max_pages_per_driver": self.max_pages,
+                "created_total": self.created_total,
+                "retired_total": self.retired_total,
+                "checkouts_total": self.checkouts_total,
+            }
+
+    def close(self):
+        """Close every idle driver; busy ones close when checked in"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for pooled in idle:
+            with self._cond:
+                self._members.discard(pooled)
+            try:
+                pooled.scraper.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled driver: {e}")
@@ -0,0 +1,15 @@
+"""Gunicorn server hooks: each worker warms its browsers in the background once forked.
+
+The app is still imported per worker (not preloaded in the master), so no
+SQLite connection or thread is shared across a fork.
+"""
+
+
+def post_fork(server, worker):
+    # Start the worker's start-up clock before the app module is imported
+    import startup  # noqa: F401
+
+
+def post_worker_init(worker):
+    from app import start_warmup
+    start_warmup()
@@ -0,0 +1,242 @@
+"""Per-host request pacing shared by the preflight, static and browser paths.
+
+Every request to a host first takes a token from that host's bucket
+(``rate`` per second, up to ``burst`` saved up) and a slot in its
+concurrency window. The window adapts AIMD-style: each success widens it by
+``1/window`` (about one slot per window's worth of successes), while errors,
+429/503 responses and latency above the target shrink it multiplicatively.
+A ``Retry-After`` header pauses the host until the given time. Callers that
+cannot get a slot in time get ``HostBusy`` instead of hammering the host.
+"""
+import email.utils
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from batch import host_of
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class HostBusy(Exception):
+    """No request slot for a host became available in time"""
+
+    def __init__(self, host, retry_after):
+        super().__init__(f"Host {host} is rate limited; retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - (now or time.time()))
+
+
+class HostState:
+    """Token bucket, concurrency window and back-off of one host"""
+
+    def __init__(self, burst, window):
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.window = float(window)
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.last_used = time.monotonic()
+        self.successes = 0
+        self.backoffs = 0
+
+
+class RequestSlot:
+    """Handle for one admitted request; report its outcome before leaving the block"""
+
+    def __init__(self, limiter, host):
+        self.limiter = limiter
+        self.host = host
+        self.started = time.monotonic()
+        self.outcome = None
+        self.retry_after = None
+
+    def record(self, status=None, retry_after=None, error=False):
+        """Report the HTTP status (if known), a Retry-After header value, or a transport error"""
+        if error:
+            self.outcome = 'error'
+        elif status in THROTTLE_STATUSES:
+            self.outcome = 'throttled'
+        elif status is not None and status >= 500:
+            self.outcome = 'error'
+        else:
+            self.outcome = 'success'
+        self.retry_after = parse_retry_after(retry_after)
+
+
+class HostLimiter:
+    """Token buckets plus adaptive (AIMD) concurrency windows, one pair per host"""
+
+    def __init__(self, rate=5.0, burst=10, initial_window=4, min_window=1, max_window=32,
+                 latency_target=5.0, decrease_factor=0.5, max_retry_after=300.0,
+                 acquire_timeout=60.0, idle_ttl=600.0):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.initial_window = initial_window
+        self.min_window = max(1, min_window)
+        self.max_window = max(self.min_window, max_window)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.max_retry_after = max_retry_after
+        self.acquire_timeout = acquire_timeout
+        self.idle_ttl = idle_ttl
+        self._hosts = {}
+        self._condition = threading.Condition()
+        self._last_sweep = time.monotonic()
+        self.waits_total = 0
+        self.busy_total = 0
+        self.backoffs_total = 0
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self.burst, self.initial_window)
+        return state
+
+    def _sweep(self, now):
+        """Forget hosts that have been idle for a while"""
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for host, state in list(self._hosts.items()):
+            if state.inflight == 0 and now - state.last_used > self.idle_ttl:
+                del self._hosts[host]
+
+    def _refill(self, state, now):
+        if self.rate > 0:
+            state.tokens = min(self.burst, state.tokens + (now - state.refilled_at) * self.rate)
+        else:
+            state.tokens = self.burst
+        state.refilled_at = now
+
+    def _wait_time(self, state, now):
+        """Seconds until a request may start, 0 if it may start now"""
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        if state.inflight >= int(state.window):
+            return None  # Until a slot is released
+        if state.tokens < 1:
+            return (1 - state.tokens) / self.rate
+        return 0.0
+
+    def acquire(self, url, timeout=None):
+        """Block until a request to the URL's host may start; returns its RequestSlot"""
+        host = host_of(url)
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            waited = False
+            while True:
+                now = time.monotonic()
+                self._sweep(now)
+                state = self._state(host)
+                self._refill(state, now)
+                wait_for = self._wait_time(state, now)
+                if wait_for == 0.0:
+                    break
+                remaining = deadline - now
+                if remaining <= 0 or (wait_for is not None and state.blocked_until - now > remaining):
+                    self.busy_total += 1
+                    raise HostBusy(host, max(wait_for or 1.0, 0.1))
+                waited = True
+                self._condition.wait(min(remaining, wait_for) if wait_for is not None else remaining)
+
+            state.tokens -= 1
+            state.inflight += 1
+            state.last_used = now
+            if waited:
+                self.waits_total += 1
+        return RequestSlot(self, host)
+
+    def release(self, slot):
+        """Return a slot and adapt the host's window to its outcome"""
+        latency = time.monotonic() - slot.started
+        with self._condition:
+            state = self._state(slot.host)
+            state.inflight = max(0, state.inflight - 1)
+            state.last_used = time.monotonic()
+
+            if slot.outcome in ('error', 'throttled'):
+                self._back_off(slot.host, state, slot.outcome)
+            elif slot.outcome == 'success':
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                if self.latency_target and state.latency > self.latency_target:
+                    # Slow responses: ease off gently before the host starts failing
+                    state.window = max(self.min_window, state.window * 0.9)
+                else:
+                    state.window = min(self.max_window, state.window + 1 / state.window)
+                state.successes += 1
+
+            if slot.retry_after:
+                pause = min(slot.retry_after, self.max_retry_after)
+                state.blocked_until = max(state.blocked_until, time.monotonic() + pause)
+                logger.info(f"⏸️ Pausing {slot.host} for {pause:.1f}s (Retry-After)")
+            self._condition.notify_all()
+
+    def _back_off(self, host, state, reason):
+        previous = state.window
+        state.window = max(self.min_window, state.window * self.decrease_factor)
+        state.backoffs += 1
+        self.backoffs_total += 1
+        logger.info(f"🐢 Backing off {host} ({reason}): window {previous:.1f} -> {state.window:.1f}")
+
+    @contextmanager
+    def slot(self, url, timeout=None):
+        """Context manager around acquire/release; an exception counts as an error"""
+        slot = self.acquire(url, timeout)
+        try:
+            yield slot
+        except Exception:
+            if slot.outcome is None:
+                slot.outcome = 'error'
+            raise
+        finally:
+            self.release(slot)
+
+    def host_stats(self, host):
+        with self._condition:
+            state = self._hosts.get(host)
+            if state is None:
+                return None
+            return {
+                "window": round(state.window, 2),
+                "inflight": state.inflight,
+                "tokens": round(state.tokens, 2),
+                "latency": round(state.latency, 3) if state.latency is not None else None,
+                "paused_for": round(max(0.0, state.blocked_until - time.monotonic()), 1),
+                "successes": state.successes,
+                "backoffs": state.backoffs,
+            }
+
+    def stats(self):
+        with self._condition:
+            now = time.monotonic()
+            return {
+                "hosts": len(self._hosts),
+                "inflight": sum(state.inflight for state in self._hosts.values()),
+                "paused_hosts": sum(1 for state in self._hosts.values() if state.blocked_until > now),
+                "throttled_hosts": sum(1 for state in self._hosts.values() if state.window < self.initial_window),
+                "waits_total": self.waits_total,
+                "busy_total": self.busy_total,
+                "backoffs_total": self.backoffs_total,
+            }
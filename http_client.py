@@ -0,0 +1,125 @@
+"""Shared HTTP client for preflight requests.
+
+One pooled ``requests.Session`` gives keep-alive connection reuse with a
+per-host connection cap, and a TTL cache remembers which scheme worked for a
+host and where a URL redirected to, so repeat scrapes of a domain skip the
+HTTPS/HTTP fallback probing and the redirect hops.
+"""
+import http.cookiejar
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Servers that refuse HEAD get a streamed GET that is closed before the body
+HEAD_UNSUPPORTED = (403, 405, 501)
+
+
+class _RejectAllCookies(http.cookiejar.DefaultCookiePolicy):
+    """Keep the shared session stateless between unrelated scrapes"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def scheme_variants(url):
+    """The HTTPS/HTTP variants of a URL in the order they should be tried"""
+    if url.startswith('https://'):
+        return [url, url.replace('https://', 'http://', 1)]
+    if url.startswith('http://'):
+        return [url, url.replace('http://', 'https://', 1)]
+    return [f"https://{url}", f"http://{url}"]
+
+
+class HttpClient:
+    """Pooled session plus a cache of resolved schemes and redirect targets"""
+
+    def __init__(self, pool_connections=100, per_host_connections=10, resolution_ttl=3600.0):
+        self.resolution_ttl = resolution_ttl
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_RejectAllCookies())
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=per_host_connections,
+            pool_block=True,  # Wait for a free connection rather than open more per host
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._schemes = {}   # host -> (scheme, expires_at)
+        self._targets = {}   # requested URL -> (final URL, expires_at)
+        self.resolution_hits = 0
+        self.resolution_misses = 0
+
+    def _cached(self, table, key):
+        with self._lock:
+            value = table.get(key)
+            if value is None:
+                return None
+            if value[1] < time.time():
+                del table[key]
+                return None
+            return value[0]
+
+    def candidate_urls(self, url):
+        """URLs to try for a request, best known first"""
+        variants = scheme_variants(url)
+        host = urlsplit(variants[0]).hostname
+        scheme = self._cached(self._schemes, host)
+        if scheme is None:
+            with self._lock:
+                self.resolution_misses += 1
+            return variants
+
+        with self._lock:
+            self.resolution_hits += 1
+        preferred = [variant for variant in variants if variant.startswith(f"{scheme}://")]
+        return preferred + [variant for variant in variants if variant not in preferred]
+
+    def redirect_target(self, url):
+        """Where a URL last redirected to, if still cached"""
+        return self._cached(self._targets, url)
+
+    def remember(self, requested_url, final_url):
+        """Record the working scheme for a host and the redirect target of a URL"""
+        expires_at = time.time() + self.resolution_ttl
+        parts = urlsplit(requested_url)
+        with self._lock:
+            self._schemes[parts.hostname] = (parts.scheme, expires_at)
+            if final_url and final_url != requested_url:
+                self._targets[requested_url] = (final_url, expires_at)
+
+    def forget(self, requested_url):
+        """Drop cached resolution after a failure"""
+        with self._lock:
+            self._schemes.pop(urlsplit(requested_url).hostname, None)
+            self._targets.pop(requested_url, None)
+
+    def get(self, url, headers=None, timeout=15, probe=False):
+        """GET a URL (following redirects); probe=True avoids downloading the body"""
+        if probe:
+            response = self.session.head(url, headers=headers, timeout=timeout, verify=False,
+                                         allow_redirects=True)
+            if response.status_code not in HEAD_UNSUPPORTED:
+                return response
+            response = self.session.get(url, headers=headers, timeout=timeout, verify=False,
+                                        allow_redirects=True, stream=True)
+            response.close()
+            return response
+
+        return self.session.get(url, headers=headers, timeout=timeout, verify=False, allow_redirects=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resolved_hosts": len(self._schemes),
+                "cached_redirects": len(self._targets),
+                "resolution_hits": self.resolution_hits,
+                "resolution_misses": self.resolution_misses,
+            }
@@ -0,0 +1,223 @@
+"""Asynchronous scrape jobs run by a bounded pool of worker threads.
+
+Each worker thread owns its own browser, so long Selenium sessions never tie
+up the web workers that serve the API, health checks and the UI.
+"""
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+EXPIRED = 'expired'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, EXPIRED)
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity"""
+
+
+class JobFailed(Exception):
+    """Raised by a runner to record a structured error payload"""
+
+    def __init__(self, payload):
+        super().__init__(payload.get("error", "Job failed"))
+        self.payload = payload
+
+
+class Job:
+    """A queued scrape and its outcome"""
+
+    def __init__(self, params, deadline, summary=None):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.summary = summary or {}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.created_at + deadline
+        self.result = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def remaining(self):
+        """Seconds left before the job's deadline"""
+        return max(0.0, self.deadline - time.time())
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "request": self.summary,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "deadline": iso(self.deadline),
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Bounded job queue served by worker threads that each own a browser.
+
+    ``runner(params, worker_state, job)`` performs one job and returns its
+    result; ``worker_factory()`` builds the per-worker state (e.g. a
+    SmartWebScraper) and ``worker_cleanup(state)`` releases it on shutdown.
+    """
+
+    def __init__(self, runner, worker_factory=None, worker_cleanup=None, workers=2,
+                 queue_size=50, default_deadline=300.0, result_ttl=900.0):
+        self.runner = runner
+        self.worker_factory = worker_factory
+        self.worker_cleanup = worker_cleanup
+        self.workers = max(1, workers)
+        self.default_deadline = default_deadline
+        self.result_ttl = result_ttl
+
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads or self._stopping.is_set():
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"🧵 Started {self.workers} job worker(s)")
+
+    def submit(self, params, deadline=None, summary=None):
+        """Queue a job; raises QueueFull when the queue is at capacity"""
+        self._ensure_started()
+        self._purge_expired()
+
+        job = Job(params, deadline or self.default_deadline, summary)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+
+        logger.info(f"📥 Queued job {job.id} ({self._queue.qsize()} waiting)")
+        return job
+
+    def get(self, job_id):
+        """Look up a job; expired results are forgotten"""
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job. Returns the job, or None if it is unknown.
+
+        Queued jobs never start; a running job's result is discarded when its
+        worker finishes the current scrape.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        logger.info(f"🛑 Cancelled job {job_id}")
+        return job
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _worker_loop(self):
+        state = None
+        try:
+            while not self._stopping.is_set():
+                try:
+                    job = self._queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+
+                with self._lock:
+                    if job.status != QUEUED:
+                        continue
+                    if job.remaining() <= 0:
+                        job.status = EXPIRED
+                        job.error = {"error": "Job deadline passed before it started"}
+                        job.finished_at = time.time()
+                        continue
+                    job.status = RUNNING
+                    job.started_at = time.time()
+
+                if state is None and self.worker_factory is not None:
+                    state = self.worker_factory()
+
+                try:
+                    result, error = self.runner(job.params, state, job), None
+                except Exception as e:
+                    result, error = None, e
+
+                with self._lock:
+                    # A cancelled job finished when it was cancelled, not when its scrape returned
+                    if job.status == CANCELLED:
+                        continue
+                    job.finished_at = time.time()
+                    if error is not None:
+                        job.status = FAILED
+                        job.error = error.payload if isinstance(error, JobFailed) else {"error": str(error)}
+                    elif job.finished_at > job.deadline:
+                        job.status = FAILED
+                        job.error = {"error": "Job exceeded its deadline"}
+                    else:
+                        job.status = SUCCEEDED
+                        job.result = result
+                logger.info(f"📤 Job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+        finally:
+            if state is not None and self.worker_cleanup is not None:
+                self.worker_cleanup(state)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "started": bool(self._threads),
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "jobs": counts,
+        }
+
+    def shutdown(self, timeout=5.0):
+        """Stop the workers and release their browsers"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
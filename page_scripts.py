@@ -0,0 +1,359 @@
+"""In-page extraction scripts run with a single ``execute_script`` call.
+
+Each script collects, filters, dedupes and truncates inside the browser and
+returns one JSON payload, instead of paying a WebDriver round trip for every
+element. The output shapes match the original per-element extractors.
+"""
+
+# Shared helpers: rendered text the way WebDriver's element text reports it,
+# and attribute lookup that prefers the (resolved) DOM property
+HELPERS_JS = """
+const isVisible = (el) => {
+    if (el.checkVisibility) {
+        return el.checkVisibility({visibilityProperty: true, opacityProperty: false});
+    }
+    return el.getClientRects().length > 0;
+};
+const visibleText = (el) => {
+    if (!isVisible(el)) {
+        return '';
+    }
+    return (el.innerText || '').replace(/\\u00a0/g, ' ').trim();
+};
+const attr = (el, name) => {
+    const prop = el[name];
+    if (typeof prop === 'string' && prop) {
+        return prop;
+    }
+    return el.getAttribute(name);
+};
+"""
+
+TEXT_XPATH = ("//p | //h1 | //h2 | //h3 | //h4 | //h5 | //h6 | //span | "
+              "//div[not(script) and not(style)] | //li | //td | //th")
+
+TEXT_CONTENT_JS = HELPERS_JS + """
+const [xpath, minLength, limit] = arguments;
+const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const seen = new Set();
+const results = [];
+for (let i = 0; i < snapshot.snapshotLength && results.length < limit; i++) {
+    const text = visibleText(snapshot.snapshotItem(i));
+    if (text.length > minLength && !seen.has(text)) {
+        seen.add(text);
+        results.push(text);
+    }
+}
+return results;
+"""
+
+LINKS_JS = HELPERS_JS + """
+const [textLength, limit] = arguments;
+const seen = new Set();
+const results = [];
+for (const link of document.getElementsByTagName('a')) {
+    if (results.length >= limit) {
+        break;
+    }
+    const href = attr(link, 'href');
+    if (!href || !/^(https?:\\/\\/|\\/)/.test(href) || seen.has(href)) {
+        continue;
+    }
+    seen.add(href);
+    const text = visibleText(link) || href;
+    results.push({text: text.slice(0, textLength), url: href});
+}
+return results;
+"""
+
+IMAGES_JS = """
+const [limit] = arguments;
+const seen = new Set();
+const results = [];
+for (const img of document.getElementsByTagName('img')) {
+    if (results.length >= limit) {
+        break;
+    }
+    const src = img.src || img.getAttribute('src');
+    if (src && /^(https?:\\/\\/|data:)/.test(src) && !seen.has(src)) {
+        seen.add(src);
+        results.push(src);
+    }
+}
+return results;
+"""
+
+TITLES_JS = HELPERS_JS + """
+const [limit] = arguments;
+const seen = new Set();
+const results = [];
+if (document.title) {
+    seen.add('Page Title: ' + document.title);
+    results.push('Page Title: ' + document.title);
+}
+for (const heading of document.querySelectorAll('h1, h2, h3, h4, h5, h6')) {
+    if (results.length >= limit) {
+        break;
+    }
+    const text = visibleText(heading);
+    if (text && !seen.has(text)) {
+        seen.add(text);
+        results.push(text);
+    }
+}
+return results.slice(0, limit);
+"""
+
+CUSTOM_SELECTOR_JS = HELPERS_JS + """
+const [selector, htmlLength, limit] = arguments;
+const seen = new Set();
+const results = [];
+for (const el of document.querySelectorAll(selector)) {
+    if (results.length >= limit) {
+        break;
+    }
+    let value = visibleText(el) ||
+        attr(el, 'value') || attr(el, 'alt') || attr(el, 'title') ||
+        attr(el, 'href') || attr(el, 'src');
+    if (!value) {
+        const html = el.outerHTML || '';
+        value = html.length > htmlLength ? html.slice(0, htmlLength) + '...' : html;
+    }
+    if (value && !seen.has(value)) {
+        seen.add(value);
+        results.push(value);
+    }
+}
+return results;
+"""
+
+# Extraction recipes: one record per container match (or one for the whole
+# page), each field read from its first or all matches. Values come back raw;
+# transforms run in Python so both engines share them.
+RECIPE_JS = HELPERS_JS + """
+const [recipe, limit] = arguments;
+const select = (root, selector, all) => {
+    if (recipe.syntax === 'xpath') {
+        const result = document.evaluate(selector, root, null, XPathResult.ANY_TYPE, null);
+        switch (result.resultType) {
+            case XPathResult.NUMBER_TYPE:
+                return [result.numberValue];
+            case XPathResult.STRING_TYPE:
+                return [result.stringValue];
+            case XPathResult.BOOLEAN_TYPE:
+                return [result.booleanValue];
+        }
+        const nodes = [];
+        for (let node = result.iterateNext(); node && (all || !nodes.length); node = result.iterateNext()) {
+            nodes.push(node);
+        }
+        return nodes;
+    }
+    if (all) {
+        return Array.from(root.querySelectorAll(selector));
+    }
+    const node = root.querySelector(selector);
+    return node ? [node] : [];
+};
+const read = (node, name) => {
+    if (typeof node !== 'object') {
+        return node;
+    }
+    if (node.nodeType !== Node.ELEMENT_NODE) {
+        return node.nodeValue !== null ? node.nodeValue : node.textContent;
+    }
+    if (name === 'text') {
+        return node.innerText !== undefined ? node.innerText : node.textContent;
+    }
+    if (name === 'html') {
+        return node.outerHTML;
+    }
+    return attr(node, name);
+};
+const roots = recipe.container ? select(document, recipe.container, true) : [document.documentElement];
+const records = [];
+for (const root of roots) {
+    if (records.length >= limit) {
+        break;
+    }
+    const record = {};
+    for (const field of recipe.fields) {
+        const nodes = field.selector ? select(root, field.selector, field.all) : [root];
+        const values = nodes.map((node) => read(node, field.attr)).filter((value) => value !== null);
+        record[field.name] = field.all ? values : (values.length ? values[0] : null);
+    }
+    records.push(record);
+}
+return records;
+"""
+
+# Leaf text in one DOM walk: every text node once, in the run of text of its
+# nearest block ancestor, with optional readability-style main-content
+# selection. Mirrors static_engine.walk_text_blocks and main_content_blocks.
+TEXT_BLOCKS_JS = HELPERS_JS + """
+const [blockTags, tagWeights, positive, negative, minScoredLength, mainOnly, limit] = arguments;
+const BLOCKS = new Set(blockTags.map((tag) => tag.toUpperCase()));
+const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'HEAD']);
+const WORD = /[\\p{L}\\p{N}_]/u;
+const root = document.body || document.documentElement;
+const blocks = [];
+const stats = new Map();  // element -> [first index, last index, text length, link text length]
+const open = [];          // [element, text parts] of every enclosing block
+let counter = 0;
+let linkDepth = 0;
+
+const add = (element, value) => {
+    if (!value || !open.length) {
+        return;
+    }
+    open[open.length - 1][1].push(value);
+    const length = value.trim().length;
+    const stat = stats.get(element);
+    if (length && stat) {
+        stat[2] += length;
+        if (linkDepth) {
+            stat[3] += length;
+        }
+    }
+};
+const flush = () => {
+    const [element, parts] = open[open.length - 1];
+    const text = parts.join('').replace(/\\s+/g, ' ').trim();
+    parts.length = 0;
+    if (WORD.test(text)) {
+        blocks.push({text, element, index: stats.get(element)[0]});
+    }
+};
+
+const stack = [[root, false]];
+while (stack.length) {
+    const [node, leaving] = stack.pop();
+    if (leaving) {
+        const stat = stats.get(node);
+        stat[1] = counter;
+        if (node.tagName === 'A') {
+            linkDepth--;
+        }
+        if (BLOCKS.has(node.tagName) || node === root) {
+            flush();
+            open.pop();
+        }
+        const parent = stats.get(node.parentElement);
+        if (node !== root && parent) {
+            parent[2] += stat[2];
+            parent[3] += stat[3];
+        }
+        continue;
+    }
+    if (node.nodeType === Node.TEXT_NODE) {
+        add(node.parentElement, node.nodeValue);
+        continue;
+    }
+    if (node.nodeType !== Node.ELEMENT_NODE || SKIP.has(node.tagName) || !isVisible(node)) {
+        continue;
+    }
+    stats.set(node, [++counter, 0, 0, 0]);
+    if (node.tagName === 'A') {
+        linkDepth++;
+    }
+    if (node.tagName === 'BR') {
+        add(node, ' ');
+    }
+    if (BLOCKS.has(node.tagName) || node === root) {
+        if (open.length) {
+            flush();
+        }
+        open.push([node, []]);
+    }
+    stack.push([node, true]);
+    for (let child = node.lastChild; child; child = child.previousSibling) {
+        stack.push([child, false]);
+    }
+}
+
+let selected = blocks;
+if (mainOnly) {
+    const positiveHints = new RegExp(positive, 'i');
+    const negativeHints = new RegExp(negative, 'i');
+    const raw = new Map();
+    const credit = (element, score) => {
+        if (element && stats.has(element)) {
+            raw.set(element, (raw.get(element) || 0) + score);
+        }
+    };
+    for (const block of blocks) {
+        if (block.text.length < minScoredLength) {
+            continue;
+        }
+        const score = 1 + (block.text.match(/,/g) || []).length + Math.min(Math.floor(block.text.length / 100), 3);
+        const parent = block.element.parentElement;
+        credit(parent, score);
+        credit(parent && parent.parentElement, score / 2);
+    }
+    const finalScore = (element) => {
+        const [, , length, linkLength] = stats.get(element);
+        const className = typeof element.className === 'string' ? element.className : '';
+        const hints = `${className} ${element.id || ''}`;
+        let weight = tagWeights[element.tagName.toLowerCase()] || 1;
+        if (negativeHints.test(hints)) {
+            weight *= 0.5;
+        }
+        if (positiveHints.test(hints)) {
+            weight *= 1.25;
+        }
+        return raw.get(element) * (1 - (length ? linkLength / length : 0)) * weight;
+    };
+
+    let best = null;
+    let bestScore = 0;
+    for (const element of raw.keys()) {
+        const score = finalScore(element);
+        if (score > bestScore) {
+            best = element;
+            bestScore = score;
+        }
+    }
+    if (best) {
+        // Keep the headline of an article whose body won
+        const container = best.parentElement;
+        if (container && (container.tagName === 'ARTICLE' || container.tagName === 'MAIN') && stats.has(container)) {
+            best = container;
+        }
+        const kept = [best];
+        const threshold = Math.max(10, bestScore * 0.2);
+        if (best.parentElement) {
+            for (const sibling of best.parentElement.children) {
+                if (sibling !== best && raw.has(sibling) && finalScore(sibling) >= threshold) {
+                    kept.push(sibling);
+                }
+            }
+        }
+        const ranges = kept.map((element) => stats.get(element));
+        selected = blocks.filter((block) => ranges.some(([first, last]) => first <= block.index && block.index <= last));
+    }
+}
+return selected.slice(0, limit).map((block) => ({text: block.text, block: block.element.tagName.toLowerCase()}));
+"""
+
+# Streaming: keep the full result list of an extractor in the page and hand it
+# out in slices, so the worker never holds more than one chunk
+STASH_JS_PREFIX = "window.__scraperResults = (function () {\n"
+STASH_JS_SUFFIX = "\n}).apply(null, arguments) || [];\nreturn window.__scraperResults.length;"
+
+SLICE_JS = """
+const [start, end] = arguments;
+return (window.__scraperResults || []).slice(start, end);
+"""
+
+CLEAR_JS = "delete window.__scraperResults;"
+
+# HTTP status of the loaded document from Navigation Timing (Chrome 109+); null when unknown
+NAVIGATION_STATUS_JS = """
+const entry = performance.getEntriesByType('navigation')[0];
+return entry && entry.responseStatus ? entry.responseStatus : null;
+"""
+
+
+def stashed(script):
+    """Variant of an extraction script that stores its results in the page and returns their count"""
+    return STASH_JS_PREFIX + script + STASH_JS_SUFFIX
@@ -0,0 +1,86 @@
+"""Process-tree resource figures read from /proc (Linux only)"""
+import os
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def _read_stat(pid):
+    """Fields of /proc/<pid>/stat after the command name, or None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            data = f.read().decode('utf-8', 'replace')
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; it ends at the last ')'
+    return data[data.rfind(')') + 2:].split()
+
+
+def list_pids():
+    try:
+        return [int(name) for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return []
+
+
+def parent_map():
+    """pid -> parent pid for every visible process"""
+    parents = {}
+    for pid in list_pids():
+        fields = _read_stat(pid)
+        if fields:
+            parents[pid] = int(fields[1])
+    return parents
+
+
+def descendants(pid, parents=None):
+    """All descendant pids of a process"""
+    parents = parent_map() if parents is None else parents
+    children = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+
+    found = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def rss_bytes(pid):
+    """Resident set size of one process in bytes (0 if it is gone)"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def cpu_seconds(pid):
+    """User + system CPU time consumed by one process"""
+    fields = _read_stat(pid)
+    if not fields:
+        return 0.0
+    # utime and stime are fields 14 and 15 of stat; 12 and 13 after the name
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def cmdline(pid):
+    """Command line of a process as a list of arguments"""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [arg.decode('utf-8', 'replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return []
+
+
+def tree_usage(pid, parents=None):
+    """RSS bytes, CPU seconds and process count for a process and its descendants"""
+    pids = [pid] + descendants(pid, parents)
+    return {
+        "rss_bytes": sum(rss_bytes(p) for p in pids),
+        "cpu_seconds": round(sum(cpu_seconds(p) for p in pids), 2),
+        "processes": len([p for p in pids if os.path.exists(f'/proc/{p}')]),
+    }
@@ -0,0 +1,383 @@
+"""Named extraction recipes, validated and compiled once at registration.
+
+A recipe turns a page into structured records: an optional container
+selector yields one record per match (the whole page is one record without
+it), and each field reads the text, markup or an attribute of its first (or
+every) match inside the record. Selectors are all CSS or all XPath, per
+recipe. Values then run through the field's transforms.
+
+Compiling checks every selector, transform and regex up front, so a broken
+recipe is rejected when it is registered rather than after a page load.
+The static engine runs compiled soupsieve/lxml selectors; the browser
+engines run all fields of a recipe in a single in-page pass.
+"""
+import collections
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urljoin
+
+from static_engine import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SYNTAXES = ('css', 'xpath')
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+NUMBER_PATTERN = re.compile(r'-?\d[\d,]*(?:\.\d+)?|-?\.\d+')
+URL_ATTRIBUTES = ('href', 'src', 'action', 'poster')
+MAX_RETAINED_VERSIONS = 256
+
+
+class RecipeError(ValueError):
+    """A recipe failed validation"""
+
+
+def to_number(value, cast):
+    match = NUMBER_PATTERN.search(value)
+    if match is None:
+        return None
+    try:
+        return cast(float(match.group().replace(',', '')))
+    except ValueError:
+        return None
+
+
+# Transforms taking no argument, by name
+SIMPLE_TRANSFORMS = {
+    'strip': lambda value, base_url: normalize_text(value),
+    'lower': lambda value, base_url: value.lower(),
+    'upper': lambda value, base_url: value.upper(),
+    'int': lambda value, base_url: to_number(value, int),
+    'float': lambda value, base_url: to_number(value, float),
+    'absolute': lambda value, base_url: urljoin(base_url, value.strip()) if base_url else value,
+}
+
+
+def compile_transform(spec, where):
+    """A function (value, base_url) -> value for one transform spec"""
+    if isinstance(spec, str):
+        if spec not in SIMPLE_TRANSFORMS:
+            raise RecipeError(f"{where}: unknown transform '{spec}' "
+                              f"(expected one of {', '.join(SIMPLE_TRANSFORMS)}, regex or replace)")
+        return SIMPLE_TRANSFORMS[spec]
+
+    if not isinstance(spec, dict) or len(spec) != 1:
+        raise RecipeError(f"{where}: a transform is a name or a single-key object")
+    kind, argument = next(iter(spec.items()))
+    if kind == 'regex':
+        pattern = compile_regex(argument, where)
+
+        def regex(value, base_url):
+            match = pattern.search(value)
+            if match is None:
+                return None
+            return match.group(1) if pattern.groups else match.group()
+        return regex
+    if kind == 'replace':
+        if not isinstance(argument, list) or len(argument) != 2 or not isinstance(argument[1], str):
+            raise RecipeError(f"{where}: replace takes [pattern, replacement]")
+        pattern = compile_regex(argument[0], where)
+        return lambda value, base_url: pattern.sub(argument[1], value)
+    raise RecipeError(f"{where}: unknown transform '{kind}'")
+
+
+def compile_regex(pattern, where):
+    if not isinstance(pattern, str):
+        raise RecipeError(f"{where}: regex must be a string")
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise RecipeError(f"{where}: invalid regex {pattern!r}: {e}")
+
+
+def compile_selector(selector, syntax, where):
+    """Compiled matcher for a selector; raises RecipeError when it does not parse"""
+    if not isinstance(selector, str) or not selector.strip():
+        raise RecipeError(f"{where}: selector must be a non-empty string")
+    import soupsieve
+    from lxml import etree
+    try:
+        if syntax == 'xpath':
+            return etree.XPath(selector)
+        return soupsieve.compile(selector)
+    except (etree.XPathSyntaxError, soupsieve.SelectorSyntaxError) as e:
+        raise RecipeError(f"{where}: invalid {syntax} selector {selector!r}: {e}")
+
+
+def validate_css(selector):
+    """Raise ValueError for a CSS selector that does not parse"""
+    compile_selector(selector, 'css', 'customSelector')
+
+
+class Field:
+    """One compiled field of a recipe"""
+
+    def __init__(self, name, spec, syntax):
+        where = f"field '{name}'"
+        if isinstance(spec, str):
+            spec = {'selector': spec}
+        if not isinstance(spec, dict):
+            raise RecipeError(f"{where}: expected a selector string or an object")
+        unknown = set(spec) - {'selector', 'attr', 'all', 'transforms', 'default'}
+        if unknown:
+            raise RecipeError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.selector = spec.get('selector')
+        self.matcher = compile_selector(self.selector, syntax, where) if self.selector is not None else None
+        self.attr = spec.get('attr', 'text')
+        if not isinstance(self.attr, str) or not self.attr:
+            raise RecipeError(f"{where}: attr must be 'text', 'html' or an attribute name")
+        self.all = bool(spec.get('all', False))
+        self.default = spec.get('default')
+        transforms = spec.get('transforms', [])
+        if not isinstance(transforms, list):
+            raise RecipeError(f"{where}: transforms must be a list")
+        self.transforms = [compile_transform(transform, f"{where} transform {index}")
+                           for index, transform in enumerate(transforms)]
+
+    def finish(self, value, base_url):
+        """Normalize a raw value and run it through the transforms"""
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            return value  # XPath numbers and booleans
+        if self.attr == 'text':
+            value = normalize_text(value)
+        elif self.attr in URL_ATTRIBUTES and base_url:
+            value = urljoin(base_url, value.strip())
+        for transform in self.transforms:
+            value = transform(value, base_url)
+            if value is None:
+                break
+        return value
+
+
+class CompiledRecipe:
+    """A validated recipe, ready to run on either engine"""
+
+    def __init__(self, name, spec):
+        if not isinstance(name, str) or not NAME_PATTERN.match(name):
+            raise RecipeError("name must be 1-64 letters, digits, '_', '-' or '.'")
+        if not isinstance(spec, dict):
+            raise RecipeError("a recipe is a JSON object")
+        unknown = set(spec) - {'name', 'syntax', 'container', 'fields', 'description'}
+        if unknown:
+            raise RecipeError(f"unknown keys {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.spec = {key: value for key, value in spec.items() if key != 'name'}
+        self.syntax = spec.get('syntax', 'css')
+        if self.syntax not in SYNTAXES:
+            raise RecipeError(f"syntax must be one of {', '.join(SYNTAXES)}")
+        self.container = spec.get('container')
+        self.container_matcher = (compile_selector(self.container, self.syntax, 'container')
+                                  if self.container is not None else None)
+
+        fields = spec.get('fields')
+        if not isinstance(fields, dict) or not fields:
+            raise RecipeError("fields must be a non-empty object of name -> field")
+        self.fields = [Field(field_name, field_spec, self.syntax) for field_name, field_spec in fields.items()]
+
+        raw = json.dumps(self.spec, sort_keys=True, separators=(',', ':'))
+        self.fingerprint = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+        self.browser_spec = {
+            "syntax": self.syntax,
+            "container": self.container,
+            "fields": [{"name": field.name, "selector": field.selector, "attr": field.attr, "all": field.all}
+                       for field in self.fields],
+        }
+
+    @property
+    def ref(self):
+        """Name plus version; used as the selector in requests, cache keys and results"""
+        return f"{self.name}#{self.fingerprint}"
+
+    def finish(self, raw_records, base_url):
+        """Apply the field transforms and defaults to raw records"""
+        records = []
+        for raw in raw_records:
+            record = {}
+            for field in self.fields:
+                value = raw.get(field.name)
+                if field.all:
+                    values = [field.finish(item, base_url) for item in value or []]
+                    value = [item for item in values if item is not None]
+                else:
+                    value = field.finish(value, base_url)
+                if field.default is not None and value in (None, '', []):
+                    value = field.default
+                record[field.name] = value
+            records.append(record)
+        return records
+
+    def _read_soup(self, element, attr):
+        if attr == 'text':
+            return element.get_text()
+        if attr == 'html':
+            return str(element)
+        value = element.get(attr)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def _read_tree(self, node, attr):
+        from lxml import etree
+        if not isinstance(node, etree._Element):
+            return node if isinstance(node, (int, float, bool)) else str(node)
+        if attr == 'text':
+            return node.text_content()
+        if attr == 'html':
+            return etree.tostring(node, encoding='unicode', method='html', with_tail=False)
+        return node.get(attr)
+
+    def extract_soup(self, soup, limit=None):
+        """Raw records from a BeautifulSoup document (CSS recipes); limit None means all"""
+        roots = self.container_matcher.select(soup, limit=limit or 0) if self.container_matcher else [soup]
+        records = []
+        for root in roots[:limit]:
+            record = {}
+            for field in self.fields:
+                if field.matcher is None:
+                    nodes = [root]
+                elif field.all:
+                    nodes = field.matcher.select(root)
+                else:
+                    node = field.matcher.select_one(root)
+                    nodes = [node] if node is not None else []
+                values = [value for value in (self._read_soup(node, field.attr) for node in nodes)
+                          if value is not None]
+                record[field.name] = values if field.all else (values[0] if values else None)
+            records.append(record)
+        return records
+
+    def extract_tree(self, tree, limit=None):
+        """Raw records from an lxml document (XPath recipes); limit None means all"""
+        roots = self.container_matcher(tree) if self.container_matcher is not None else [tree]
+        if not isinstance(roots, list):
+            roots = [roots]
+        records = []
+        for root in roots[:limit]:
+            record = {}
+            for field in self.fields:
+                nodes = field.matcher(root) if field.matcher is not None else [root]
+                if not isinstance(nodes, list):
+                    nodes = [nodes]
+                if not field.all:
+                    nodes = nodes[:1]
+                values = [value for value in (self._read_tree(node, field.attr) for node in nodes)
+                          if value is not None]
+                record[field.name] = values if field.all else (values[0] if values else None)
+            records.append(record)
+        return records
+
+    def to_dict(self):
+        return dict(self.spec, name=self.name, version=self.fingerprint, ref=self.ref)
+
+
+class RecipeRegistry:
+    """Compiled recipes by name, optionally persisted to SQLite for every worker to see"""
+
+    def __init__(self, sqlite_path=None):
+        self._recipes = {}
+        # Superseded and pinned versions by ref, so name#version keeps meaning that spec
+        self._versions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS recipes (
+                    name TEXT PRIMARY KEY,
+                    spec TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._db.commit()
+            logger.info(f"📜 Recipes persisted to {sqlite_path}")
+
+    def register(self, spec):
+        """Validate, compile and store a recipe; raises RecipeError"""
+        if not isinstance(spec, dict):
+            raise RecipeError("a recipe is a JSON object")
+        recipe = CompiledRecipe(spec.get('name'), spec)
+        with self._lock:
+            previous = self._recipes.get(recipe.name)
+            if previous is not None:
+                self._retain(previous)
+            self._recipes[recipe.name] = recipe
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO recipes VALUES (?, ?, ?, ?)",
+                    (recipe.name, json.dumps(recipe.spec), recipe.fingerprint, time.time())
+                )
+                self._db.commit()
+        logger.info(f"📜 Registered recipe {recipe.ref} ({len(recipe.fields)} fields, {recipe.syntax})")
+        return recipe
+
+    def _retain(self, recipe):
+        self._versions[recipe.ref] = recipe
+        self._versions.move_to_end(recipe.ref)
+        while len(self._versions) > MAX_RETAINED_VERSIONS:
+            self._versions.popitem(last=False)
+
+    def pin(self, spec):
+        """Compile a specific recipe version so get() resolves its ref, without making it current"""
+        if not isinstance(spec, dict):
+            raise RecipeError("a recipe is a JSON object")
+        recipe = CompiledRecipe(spec.get('name'), spec)
+        with self._lock:
+            retained = self._versions.get(recipe.ref)
+            if retained is not None:
+                self._versions.move_to_end(recipe.ref)
+                return retained
+            self._retain(recipe)
+        return recipe
+
+    def get(self, ref):
+        """The compiled recipe for name#version, or the current one for a bare name; raises KeyError"""
+        name, _, version = ref.partition('#')
+        with self._lock:
+            if version and ref in self._versions:
+                self._versions.move_to_end(ref)
+                return self._versions[ref]
+            recipe = self._current(name)
+            if version and recipe.fingerprint != version:
+                raise KeyError(ref)
+            return recipe
+
+    def _current(self, name):
+        recipe = self._recipes.get(name)
+        if self._db is None:
+            if recipe is None:
+                raise KeyError(name)
+            return recipe
+
+        # Another worker may have replaced or deleted it: compare versions
+        row = self._db.execute("SELECT spec, fingerprint FROM recipes WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            self._recipes.pop(name, None)
+            raise KeyError(name)
+        if recipe is None or recipe.fingerprint != row[1]:
+            if recipe is not None:
+                self._retain(recipe)
+            recipe = self._recipes[name] = CompiledRecipe(name, json.loads(row[0]))
+        return recipe
+
+    def delete(self, name):
+        with self._lock:
+            removed = self._recipes.pop(name, None) is not None
+            if self._db is not None:
+                removed = self._db.execute("DELETE FROM recipes WHERE name = ?", (name,)).rowcount > 0 or removed
+                self._db.commit()
+            return removed
+
+    def names(self):
+        with self._lock:
+            if self._db is not None:
+                return [row[0] for row in self._db.execute("SELECT name FROM recipes ORDER BY name")]
+            return sorted(self._recipes)
@@ -0,0 +1,250 @@
+"""Negotiated response encodings, compression and field projection.
+
+Clients pick an encoding with the ``format`` request field or the Accept
+header: compact JSON (orjson when installed), MessagePack, or NDJSON with
+one line per result. Bodies above a size threshold are compressed with
+zstd or gzip, whichever Accept-Encoding prefers. Streams are compressed
+record by record, flushed so every record reaches the client as soon as it
+is produced. ``fields`` and ``omit`` keep or drop dotted payload paths;
+lists are projected item by item, so ``data.url`` reduces links to URLs.
+"""
+import functools
+import gzip
+import importlib
+import json
+import zlib
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+NDJSON = 'ndjson'
+
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    MSGPACK: 'application/msgpack',
+    NDJSON: 'application/x-ndjson',
+}
+
+# Media types a client may put in Accept for each format
+MEDIA_TYPES = {
+    'application/json': JSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/jsonl': NDJSON,
+}
+
+# Content codings in order of preference when the client rates them equally
+ENCODINGS = ('zstd', 'gzip')
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+@functools.lru_cache(maxsize=None)
+def optional_module(name):
+    """An optional dependency, or None when it is not installed"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def available(name):
+    """Whether a format or content coding can be produced in this process"""
+    if name == MSGPACK:
+        return optional_module('msgpack') is not None
+    if name == 'zstd':
+        return optional_module('zstandard') is not None
+    return name in CONTENT_TYPES or name == 'gzip'
+
+
+def dumps_json(value):
+    """Compact UTF-8 JSON, through orjson when it is installed"""
+    orjson = optional_module('orjson')
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # Integers beyond 64 bits and the like; the stdlib encoder copes
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_msgpack(value):
+    return optional_module('msgpack').packb(value, use_bin_type=True)
+
+
+def compress(body, encoding):
+    if encoding == 'zstd':
+        return optional_module('zstandard').ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, GZIP_LEVEL)
+
+
+class StreamCompressor:
+    """Incremental gzip or zstd whose output is flushed after every chunk"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'zstd':
+            zstandard = optional_module('zstandard')
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip framing
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(self._flush_mode)
+
+    def close(self):
+        return self._compressor.flush()
+
+
+def parse_paths(value, name):
+    """Dotted field paths from a JSON list or a comma-separated string"""
+    if value is None or value is False:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)) or not all(isinstance(path, str) for path in value):
+        raise ValueError(f"{name} must be a list or a comma-separated string of field paths")
+    paths = [path.strip() for path in value if path.strip()]
+    if any('' in path.split('.') for path in paths):
+        raise ValueError(f"{name} has an empty path segment")
+    return paths
+
+
+def path_tree(paths):
+    """Nested dict of path segments; True marks a whole subtree"""
+    tree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split('.')
+        for segment in parents:
+            child = node.setdefault(segment, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[leaf] = True
+    return tree
+
+
+class Projection:
+    """Keeps the ``fields`` paths of a payload, then drops the ``omit`` paths.
+
+    A path walks through dicts key by key and through lists item by item;
+    values that are neither (such as text results) are kept whole.
+    """
+
+    def __init__(self, fields=(), omit=()):
+        self.fields = path_tree(fields)
+        self.omit = path_tree(omit)
+
+    @classmethod
+    def from_request(cls, data):
+        return cls(parse_paths(data.get('fields'), 'fields'), parse_paths(data.get('omit'), 'omit'))
+
+    def __bool__(self):
+        return bool(self.fields or self.omit)
+
+    def apply(self, value):
+        if self.fields:
+            value = self._keep(value, self.fields)
+        if self.omit:
+            value = self._drop(value, self.omit)
+        return value
+
+    def _keep(self, value, tree):
+        if tree is True:
+            return value
+        if isinstance(value, list):
+            return [self._keep(item, tree) for item in value]
+        if isinstance(value, dict):
+            return {key: self._keep(value[key], sub) for key, sub in tree.items() if key in value}
+        return value
+
+    def _drop(self, value, tree):
+        if isinstance(value, list):
+            return [self._drop(item, tree) for item in value]
+        if isinstance(value, dict):
+            kept = {}
+            for key, item in value.items():
+                sub = tree.get(key)
+                if sub is True:
+                    continue
+                kept[key] = self._drop(item, sub) if sub else item
+            return kept
+        return value
+
+
+class ResponseFormat:
+    """How one response is encoded, compressed and projected"""
+
+    def __init__(self, name=JSON, encoding=None, projection=None, min_compress_bytes=1024):
+        self.name = name
+        self.encoding = encoding
+        self.projection = projection or Projection()
+        self.min_compress_bytes = min_compress_bytes
+
+    @classmethod
+    def negotiate(cls, data, accept=None, accept_encodings=None, streaming=False, compression=True,
+                  min_compress_bytes=1024):
+        """Pick the format from the request's format field, else its Accept header.
+
+        ``accept`` and ``accept_encodings`` are werkzeug Accept objects.
+        Streams are always record-per-line, so json means NDJSON there.
+        Raises ValueError for an unknown or unavailable requested format.
+        """
+        requested = data.get('format')
+        if requested:
+            name = str(requested).strip().lower()
+            if name not in CONTENT_TYPES:
+                raise ValueError(f"Invalid format: expected one of {', '.join(CONTENT_TYPES)}")
+            if not available(name):
+                raise ValueError(f"The {name} format needs the {name} package (pip install {name})")
+        else:
+            name = JSON
+            if accept:
+                offered = [media for media, fmt in MEDIA_TYPES.items() if available(fmt)]
+                name = MEDIA_TYPES.get(accept.best_match(offered, default='application/json'), JSON)
+        if streaming and name == JSON:
+            name = NDJSON
+
+        encoding = None
+        if compression and accept_encodings:
+            rated = [(accept_encodings.quality(coding), -rank, coding)
+                     for rank, coding in enumerate(ENCODINGS) if available(coding)]
+            quality, _, coding = max(rated)
+            encoding = coding if quality > 0 else None
+
+        return cls(name, encoding, Projection.from_request(data), min_compress_bytes)
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.name]
+
+    def dumps(self, value):
+        """One encoded document (or NDJSON line)"""
+        if self.name == MSGPACK:
+            return dumps_msgpack(value)
+        body = dumps_json(value)
+        return body + b'\n' if self.name == NDJSON else body
+
+    def body(self, records):
+        """A whole response of one or several records, with its content coding (or None)"""
+        body = b''.join(self.dumps(record) for record in records)
+        if self.encoding and len(body) >= self.min_compress_bytes:
+            return compress(body, self.encoding), self.encoding
+        return body, None
+
+    def stream(self, records):
+        """Encode records as they come, compressing and flushing each one"""
+        if not self.encoding:
+            for record in records:
+                yield self.dumps(record)
+            return
+        compressor = StreamCompressor(self.encoding)
+        for record in records:
+            yield compressor.compress(self.dumps(record))
+        yield compressor.close()
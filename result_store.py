@@ -0,0 +1,226 @@
+"""Persistent store of scrape results for change detection.
+
+Each scrape of a series (same URL, scraping type, selector and result page)
+is recorded as a snapshot of its items, each keyed by a content hash. A
+scrape whose items hash to the same digest as the latest snapshot only
+bumps that snapshot's ``checked_at``, so polling an unchanged page writes no
+items. Otherwise the new snapshot is stored and compared with the previous
+one, giving the items added and removed in between.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def flatten(results, path=()):
+    """(path, item) pairs of single- or multi-type results; path names the list an item came from"""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            yield from flatten(value, path + (key,))
+    else:
+        for item in results:
+            yield path, item
+
+
+def nest(entries, template):
+    """Arrange (path, item) pairs in the shape of template results"""
+    if not isinstance(template, dict):
+        return [item for _, item in entries]
+    return {
+        key: nest([(path[1:], item) for path, item in entries if path and path[0] == key], value)
+        for key, value in template.items()
+    }
+
+
+def item_hash(path, item):
+    raw = json.dumps([list(path), item], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def digest(hashes):
+    """Order-independent digest of a snapshot's item hashes"""
+    return hashlib.sha256('\n'.join(sorted(hashes)).encode('ascii')).hexdigest()
+
+
+class Change:
+    """Difference between a scrape and the previous snapshot of its series"""
+
+    def __init__(self, snapshot_id, previous, added, removed, unchanged):
+        self.snapshot_id = snapshot_id
+        self.previous = previous  # (snapshot id, scraped_at, checked_at), or None for the first scrape
+        self.added = added
+        self.removed = removed
+        self.unchanged = unchanged
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed)
+
+    def summary(self):
+        return {
+            "snapshot": self.snapshot_id,
+            "first_scrape": self.previous is None,
+            "changed": self.changed,
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "unchanged": self.unchanged,
+            "previous_scraped_at": self.previous[1] if self.previous else None,
+            "previous_checked_at": self.previous[2] if self.previous else None,
+        }
+
+
+class ResultStore:
+    """SQLite-backed snapshots of scrape results, keyed by series"""
+
+    def __init__(self, path, max_snapshots=20):
+        self.path = path
+        self.max_snapshots = max(2, max_snapshots)
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.unchanged = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                series TEXT NOT NULL,
+                url TEXT NOT NULL,
+                scraping_type TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                item_count INTEGER NOT NULL,
+                scraped_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_series ON snapshots (series, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot_items (
+                snapshot_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                item TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshot_items_snapshot ON snapshot_items (snapshot_id)")
+        self._db.commit()
+        logger.info(f"🗄️ Result store at {path}")
+
+    def _latest(self, series):
+        return self._db.execute(
+            "SELECT id, scraped_at, checked_at, digest, item_count FROM snapshots "
+            "WHERE series = ? ORDER BY id DESC LIMIT 1",
+            (series,)
+        ).fetchone()
+
+    def _items(self, snapshot_id):
+        """{hash: (path, item)} of a stored snapshot"""
+        rows = self._db.execute(
+            "SELECT hash, path, item FROM snapshot_items WHERE snapshot_id = ? ORDER BY position",
+            (snapshot_id,)
+        )
+        return {row[0]: (tuple(json.loads(row[1])), json.loads(row[2])) for row in rows}
+
+    def record(self, series, url, scraping_type, results):
+        """Store a scrape's results and return the Change since the previous snapshot of the series"""
+        entries = list(flatten(results))
+        hashes = [item_hash(path, item) for path, item in entries]
+        current_digest = digest(hashes)
+        now = time.time()
+
+        with self._lock:
+            latest = self._latest(series)
+            if latest is not None and latest[3] == current_digest:
+                # Same items as last time: nothing to write but the check time
+                self._db.execute("UPDATE snapshots SET checked_at = ? WHERE id = ?", (now, latest[0]))
+                self._db.commit()
+                self.unchanged += 1
+                return Change(latest[0], latest[:3], [], [], latest[4])
+
+            previous_items = self._items(latest[0]) if latest is not None else {}
+            cursor = self._db.execute(
+                "INSERT INTO snapshots (series, url, scraping_type, digest, item_count, scraped_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (series, normalize_url(url), json.dumps(scraping_type), current_digest, len(entries), now, now)
+            )
+            snapshot_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO snapshot_items VALUES (?, ?, ?, ?, ?)",
+                [(snapshot_id, position, json.dumps(list(path)), hashes[position], json.dumps(item))
+                 for position, (path, item) in enumerate(entries)]
+            )
+            self._prune(series)
+            self._db.commit()
+            self.recorded += 1
+
+        current = set(hashes)
+        added = [entry for entry, entry_hash in zip(entries, hashes) if entry_hash not in previous_items]
+        removed = [entry for entry_hash, entry in previous_items.items() if entry_hash not in current]
+        unchanged = sum(1 for entry_hash in current if entry_hash in previous_items)
+        return Change(snapshot_id, latest[:3] if latest is not None else None, added, removed, unchanged)
+
+    def _prune(self, series):
+        """Keep only the newest max_snapshots snapshots of a series"""
+        stale = [row[0] for row in self._db.execute(
+            "SELECT id FROM snapshots WHERE series = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (series, self.max_snapshots)
+        )]
+        if stale:
+            marks = ','.join('?' * len(stale))
+            self._db.execute(f"DELETE FROM snapshot_items WHERE snapshot_id IN ({marks})", stale)
+            self._db.execute(f"DELETE FROM snapshots WHERE id IN ({marks})", stale)
+
+    def history(self, url, limit=50):
+        """Newest snapshots recorded for a URL, across its series"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, series, scraping_type, digest, item_count, scraped_at, checked_at FROM snapshots "
+                "WHERE url = ? ORDER BY id DESC LIMIT ?",
+                (normalize_url(url), limit)
+            ).fetchall()
+        return [{
+            "snapshot": row[0],
+            "series": row[1],
+            "type": json.loads(row[2]),
+            "digest": row[3],
+            "count": row[4],
+            "scraped_at": row[5],
+            "checked_at": row[6],
+        } for row in rows]
+
+    def purge(self, url=None):
+        """Drop every snapshot, or only those of one URL; returns the number of snapshots removed"""
+        with self._lock:
+            if url is None:
+                self._db.execute("DELETE FROM snapshot_items")
+                removed = self._db.execute("DELETE FROM snapshots").rowcount
+            else:
+                target = normalize_url(url)
+                self._db.execute(
+                    "DELETE FROM snapshot_items WHERE snapshot_id IN (SELECT id FROM snapshots WHERE url = ?)",
+                    (target,)
+                )
+                removed = self._db.execute("DELETE FROM snapshots WHERE url = ?", (target,)).rowcount
+            self._db.commit()
+            return removed
+
+    def stats(self):
+        with self._lock:
+            snapshots, series = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT series) FROM snapshots"
+            ).fetchone()
+            return {
+                "path": self.path,
+                "snapshots": snapshots,
+                "series": series,
+                "recorded": self.recorded,
+                "unchanged": self.unchanged,
+            }
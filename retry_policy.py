@@ -0,0 +1,265 @@
+"""Failure classification, retry back-off and per-host circuit breakers.
+
+Every scraping failure is mapped to a ``ScrapeError`` with a stable code, a
+transient/permanent verdict and the HTTP status the API answers with.
+Only transient failures are retried, with exponential back-off and full
+jitter, and never past the request's deadline. Hosts that keep failing at
+the network level trip a circuit breaker, so further requests fail fast
+until a cooldown has passed and a single probe request succeeds.
+"""
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from host_limiter import HostBusy
+
+logger = logging.getLogger(__name__)
+
+# Error codes returned in API responses
+DNS_FAILURE = 'DNS_FAILURE'
+DNS_TEMPORARY_FAILURE = 'DNS_TEMPORARY_FAILURE'
+CONNECTION_REFUSED = 'CONNECTION_REFUSED'
+CONNECTION_RESET = 'CONNECTION_RESET'
+TIMEOUT = 'TIMEOUT'
+TLS_ERROR = 'TLS_ERROR'
+TOO_MANY_REDIRECTS = 'TOO_MANY_REDIRECTS'
+BLOCKED_BY_POLICY = 'BLOCKED_BY_POLICY'
+HTTP_NOT_FOUND = 'HTTP_NOT_FOUND'
+HTTP_FORBIDDEN = 'HTTP_FORBIDDEN'
+HTTP_CLIENT_ERROR = 'HTTP_CLIENT_ERROR'
+RATE_LIMITED = 'RATE_LIMITED'
+HTTP_SERVER_ERROR = 'HTTP_SERVER_ERROR'
+EMPTY_PAGE = 'EMPTY_PAGE'
+BROWSER_CRASHED = 'BROWSER_CRASHED'
+HOST_BUSY = 'HOST_BUSY'
+CIRCUIT_OPEN = 'CIRCUIT_OPEN'
+UNKNOWN = 'UNKNOWN'
+
+# code -> (transient, HTTP status of the API response)
+ERROR_CODES = {
+    DNS_FAILURE: (False, 502),
+    DNS_TEMPORARY_FAILURE: (True, 502),
+    CONNECTION_REFUSED: (True, 502),
+    CONNECTION_RESET: (True, 502),
+    TIMEOUT: (True, 504),
+    TLS_ERROR: (False, 502),
+    TOO_MANY_REDIRECTS: (False, 502),
+    BLOCKED_BY_POLICY: (False, 422),
+    HTTP_NOT_FOUND: (False, 502),
+    HTTP_FORBIDDEN: (False, 502),
+    HTTP_CLIENT_ERROR: (False, 502),
+    RATE_LIMITED: (True, 503),
+    HTTP_SERVER_ERROR: (True, 502),
+    EMPTY_PAGE: (True, 502),
+    BROWSER_CRASHED: (True, 500),
+    HOST_BUSY: (True, 503),
+    CIRCUIT_OPEN: (True, 503),
+    UNKNOWN: (False, 500),
+}
+
+# Transient, but retrying inside the same request would only wait again
+NOT_RETRIED_IN_PLACE = (HOST_BUSY, CIRCUIT_OPEN, RATE_LIMITED)
+
+# Failures that say something about the host rather than the page or our side
+HOST_FAILURES = (DNS_FAILURE, DNS_TEMPORARY_FAILURE, CONNECTION_REFUSED, CONNECTION_RESET, TIMEOUT, TLS_ERROR, HTTP_SERVER_ERROR)
+
+# Substrings of Chrome net:: errors and Python network errors, checked in order
+MESSAGE_PATTERNS = (
+    # A resolver that is down or timing out (EAI_AGAIN) says nothing about the name itself
+    (('Temporary failure in name resolution', 'EAI_AGAIN', 'ERR_NAME_RESOLUTION_FAILED'), DNS_TEMPORARY_FAILURE),
+    (('ERR_NAME_NOT_RESOLVED', 'Name or service not known', 'nodename nor servname', 'getaddrinfo failed',
+      'No address associated'), DNS_FAILURE),
+    (('ERR_CONNECTION_REFUSED', 'Connection refused'), CONNECTION_REFUSED),
+    (('ERR_TIMED_OUT', 'ERR_CONNECTION_TIMED_OUT', 'timed out', 'Timeout'), TIMEOUT),
+    (('ERR_SSL_', 'ERR_CERT_', 'SSLError', 'CERTIFICATE_VERIFY_FAILED'), TLS_ERROR),
+    (('ERR_TOO_MANY_REDIRECTS', 'TooManyRedirects', 'Exceeded 30 redirects'), TOO_MANY_REDIRECTS),
+    (('ERR_BLOCKED_BY_CLIENT',), BLOCKED_BY_POLICY),
+    (('ERR_CONNECTION_RESET', 'ERR_CONNECTION_CLOSED', 'ERR_CONNECTION_ABORTED', 'ERR_EMPTY_RESPONSE',
+      'ERR_ADDRESS_UNREACHABLE', 'ERR_INTERNET_DISCONNECTED', 'ERR_NETWORK_CHANGED', 'Connection reset',
+      'Connection aborted', 'RemoteDisconnected'), CONNECTION_RESET),
+    (('invalid session id', 'chrome not reachable', 'disconnected: not connected to DevTools',
+      'session deleted because of page crash', 'tab crashed', 'DevTools connection'), BROWSER_CRASHED),
+    (('Page appears to be empty',), EMPTY_PAGE),
+)
+
+
+class ScrapeError(Exception):
+    """A classified scraping failure"""
+
+    def __init__(self, code, message, upstream_status=None, retry_after=None):
+        super().__init__(message)
+        self.code = code
+        self.transient, self.status = ERROR_CODES.get(code, ERROR_CODES[UNKNOWN])
+        self.upstream_status = upstream_status
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        payload = {"code": self.code, "retryable": self.transient}
+        if self.upstream_status is not None:
+            payload["upstream_status"] = self.upstream_status
+        if self.retry_after is not None:
+            payload["retry_after"] = round(self.retry_after, 1)
+        return payload
+
+
+def code_for_status(status):
+    """Error code for an unsuccessful HTTP status of the scraped page"""
+    if status in (404, 410):
+        return HTTP_NOT_FOUND
+    if status in (401, 403):
+        return HTTP_FORBIDDEN
+    if status == 429:
+        return RATE_LIMITED
+    if status >= 500:
+        return HTTP_SERVER_ERROR
+    return HTTP_CLIENT_ERROR
+
+
+def http_error(url, status, retry_after=None):
+    return ScrapeError(code_for_status(status), f"{url} returned HTTP {status}",
+                       upstream_status=status, retry_after=retry_after)
+
+
+def unreachable_error(url, errors):
+    """The error for a URL none of whose HTTP/HTTPS variants could be fetched"""
+    # An HTTP status says more than the other scheme's connection failure
+    error = next((error for error in errors if error.upstream_status is not None), None)
+    if error is None:
+        error = errors[0] if errors else ScrapeError(UNKNOWN, "no URL variant to try")
+    return ScrapeError(error.code, f"URL {url} is not accessible via HTTP or HTTPS: {error}",
+                       upstream_status=error.upstream_status, retry_after=error.retry_after)
+
+
+def classify(error):
+    """The ScrapeError describing an exception"""
+    if isinstance(error, ScrapeError):
+        return error
+    if isinstance(error, HostBusy):
+        return ScrapeError(HOST_BUSY, str(error), retry_after=error.retry_after)
+    message = str(error)
+    for patterns, code in MESSAGE_PATTERNS:
+        if any(pattern in message for pattern in patterns):
+            return ScrapeError(code, message)
+    if isinstance(error, (TimeoutException, requests.exceptions.Timeout, TimeoutError)):
+        return ScrapeError(TIMEOUT, message or "Timed out")
+    if isinstance(error, requests.exceptions.SSLError):
+        return ScrapeError(TLS_ERROR, message)
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return ScrapeError(CONNECTION_RESET, message)
+    if isinstance(error, WebDriverException) and 'net::' in message:
+        return ScrapeError(CONNECTION_RESET, message)
+    return ScrapeError(UNKNOWN, message)
+
+
+class RetryPolicy:
+    """Retries transient failures with exponential back-off and full jitter inside a deadline"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, deadline=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline  # Absolute time.time(), or None for no budget
+
+    def backoff(self, attempt):
+        """Sleep before retry number attempt + 1 (attempt counts from 0)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def remaining(self):
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def should_retry(self, error, attempt):
+        """Whether a failed attempt is worth another try; sets the back-off to use"""
+        self.next_delay = None
+        if not error.transient or error.code in NOT_RETRIED_IN_PLACE:
+            return False
+        if attempt + 1 >= self.max_attempts:
+            return False
+        delay = self.backoff(attempt)
+        remaining = self.remaining()
+        if remaining is not None and remaining <= delay:
+            logger.info(f"⌛ No retry: {remaining:.1f}s left of the deadline")
+            return False
+        self.next_delay = delay
+        return True
+
+    def sleep(self):
+        if self.next_delay:
+            time.sleep(self.next_delay)
+
+
+def breaker_key(url):
+    """Host and port of a URL: a dead port says nothing about the rest of the host"""
+    return urlsplit(url).netloc.lower() or url
+
+
+class CircuitBreakers:
+    """Per-host breakers: open after repeated host-level failures, half-open after a cooldown"""
+
+    def __init__(self, failure_threshold=5, cooldown=60.0, max_hosts=10000):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> [consecutive failures, opened_at or None, probe in flight]
+        self.opened_total = 0
+        self.rejected_total = 0
+
+    def check(self, url):
+        """Raise CIRCUIT_OPEN for a host that is known to be down; lets one probe through after the cooldown"""
+        host = breaker_key(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return
+            waited = time.time() - state[1]
+            if waited >= self.cooldown and not state[2]:
+                state[2] = True  # Half-open: this request is the probe
+                return
+            self.rejected_total += 1
+        retry_after = max(1.0, self.cooldown - waited)
+        raise ScrapeError(CIRCUIT_OPEN, f"Host {host} is failing; not retrying for {retry_after:.0f}s",
+                          retry_after=retry_after)
+
+    def record_success(self, url):
+        with self._lock:
+            host = breaker_key(url)
+            if self._hosts.pop(host, None) is not None:
+                logger.info(f"🟢 Circuit closed for {host}")
+
+    def record_failure(self, url, error):
+        host = breaker_key(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if error.code not in HOST_FAILURES:
+                if state is not None:
+                    state[2] = False
+                return
+            if state is None:
+                if len(self._hosts) >= self.max_hosts:
+                    self._hosts.pop(next(iter(self._hosts)))
+                state = self._hosts[host] = [0, None, False]
+            state[0] += 1
+            # A name that does not resolve will not resolve on the next try either
+            threshold = 1 if error.code == DNS_FAILURE else self.failure_threshold
+            if state[0] >= threshold and (state[1] is None or state[2]):
+                self.opened_total += 1
+                logger.warning(f"🔴 Circuit open for {host} after {state[0]} failure(s) [{error.code}]")
+            if state[0] >= threshold:
+                state[1] = time.time()
+            state[2] = False
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                "tracked_hosts": len(self._hosts),
+                "open": sum(1 for state in self._hosts.values()
+                            if state[1] is not None and now - state[1] < self.cooldown),
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+            }
@@ -0,0 +1,190 @@
+"""Scraper worker process: leases scrape tasks from the shared queue and runs them.
+
+Start any number of these, on any node that can reach the queue; the API
+front ends only submit tasks and read results, so throughput grows with the
+number of workers::
+
+    SCRAPER_TASK_QUEUE=redis://queue-host:6379/0 python scrape_worker.py --threads 2
+
+Each thread owns a browser, leases one task at a time and renews its lease
+while the scrape runs. On SIGTERM/SIGINT the worker stops leasing, finishes
+the tasks in hand and exits; a worker that dies instead loses its leases and
+its tasks are delivered to another worker.
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+
+import config
+from jobs import JobFailed
+from retry_policy import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseKeeper:
+    """Renews a task's lease in the background until stopped or the lease is lost"""
+
+    def __init__(self, queue, task, visibility_timeout):
+        self.queue = queue
+        self.task = task
+        self.visibility_timeout = visibility_timeout
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{task.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.visibility_timeout / 3):
+            try:
+                renewed = self.queue.extend(self.task.id, self.task.token, self.visibility_timeout)
+            except Exception as e:
+                logger.warning(f"Could not renew the lease on task {self.task.id}: {e}")
+                continue
+            if not renewed:
+                self.lost = True
+                logger.warning(f"⚠️ Lost the lease on task {self.task.id} (cancelled or expired)")
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class ScrapeWorker:
+    """Worker threads that each own a browser and run leased tasks until stopped.
+
+    ``runner(task, worker_state)`` performs one task and returns its result,
+    raising JobFailed with a payload whose ``retryable`` flag decides whether
+    the task goes back in the queue.
+    """
+
+    def __init__(self, queue, runner, worker_factory=None, worker_cleanup=None, threads=1,
+                 visibility_timeout=60.0, poll_interval=1.0, name=None, retry_policy=None):
+        self.queue = queue
+        self.runner = runner
+        self.worker_factory = worker_factory
+        self.worker_cleanup = worker_cleanup
+        self.threads = max(1, threads)
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._stopping = threading.Event()
+        self._threads = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._loop, args=(f"{self.name}/{index}",),
+                                      name=f"scrape-worker-{index}")
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🧵 Worker {self.name} running {self.threads} thread(s)")
+
+    def stop(self):
+        """Stop leasing; threads exit once their current task is done"""
+        self._stopping.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _lease(self, worker):
+        try:
+            return self.queue.lease(worker, self.visibility_timeout)
+        except Exception as e:
+            logger.warning(f"Could not lease a task: {e}")
+            return None
+
+    def _loop(self, worker):
+        state = None
+        try:
+            while not self._stopping.is_set():
+                task = self._lease(worker)
+                if task is None:
+                    # Jittered so idle workers do not poll the queue in lockstep
+                    self._stopping.wait(self.poll_interval * random.uniform(0.5, 1.5))
+                    continue
+                if state is None and self.worker_factory is not None:
+                    state = self.worker_factory()
+                self._run(task, state)
+        finally:
+            if state is not None and self.worker_cleanup is not None:
+                self.worker_cleanup(state)
+
+    def _run(self, task, state):
+        logger.info(f"📦 Task {task.id} attempt {task.attempts}/{task.max_attempts}")
+        keeper = LeaseKeeper(self.queue, task, self.visibility_timeout)
+        try:
+            result, error = self.runner(task, state), None
+        except JobFailed as e:
+            result, error = None, e.payload
+        except Exception as e:
+            result, error = None, {"error": str(e), "retryable": False}
+        finally:
+            keeper.stop()
+
+        if error is None:
+            if self.queue.complete(task.id, task.token, result):
+                self.completed += 1
+                logger.info(f"📤 Task {task.id} done")
+            else:
+                logger.info(f"Task {task.id} had already finished; result dropped")
+            return
+
+        retry_delay = None
+        if error.get("retryable") and not keeper.lost:
+            retry_delay = max(self.retry_policy.backoff(task.attempts - 1), error.get("retry_after") or 0)
+        status = self.queue.fail(task.id, task.token, error, retry_delay)
+        if status == 'queued':
+            logger.info(f"🔁 Task {task.id} failed ({error.get('code')}); retrying in {retry_delay:.1f}s")
+        elif status is not None:
+            self.failed += 1
+            logger.info(f"📤 Task {task.id} failed: {error.get('error')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scrape tasks from the shared task queue")
+    parser.add_argument('--queue', default=config.TASK_QUEUE,
+                        help="sqlite:///path or redis://host:port/db (default: SCRAPER_TASK_QUEUE)")
+    parser.add_argument('--threads', type=int, default=config.TASK_WORKER_THREADS,
+                        help="tasks run at once, each on its own browser")
+    args = parser.parse_args()
+    if not args.queue:
+        parser.error("no task queue configured: pass --queue or set SCRAPER_TASK_QUEUE")
+
+    # The app module provides the scraping pipeline; no web server is started
+    import app
+    from task_queue import open_task_queue
+
+    queue = app.task_queue if app.task_queue is not None and args.queue == config.TASK_QUEUE \
+        else open_task_queue(args.queue, config.TASK_QUEUE_CAPACITY, config.JOB_RESULT_TTL)
+    worker = ScrapeWorker(
+        queue,
+        app.run_task,
+        worker_factory=app.SmartWebScraper,
+        worker_cleanup=lambda scraper: scraper.close(),
+        threads=args.threads,
+        visibility_timeout=config.TASK_VISIBILITY_TIMEOUT,
+        poll_interval=config.TASK_POLL_INTERVAL,
+        retry_policy=RetryPolicy(base_delay=config.RETRY_BASE_DELAY, max_delay=config.RETRY_MAX_DELAY),
+    )
+
+    def shutdown(signum, frame):
+        logger.info("Stopping: finishing the tasks in hand")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    worker.start()
+    worker.join()
+
+
+if __name__ == '__main__':
+    main()
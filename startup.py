@@ -0,0 +1,97 @@
+"""Start-up timings and readiness of a worker process.
+
+Gunicorn imports this module from its ``post_fork`` hook (and app.py imports
+it first otherwise), so the clock starts as the worker does. Milestones are
+seconds since that start; phases are the duration of one start-up step,
+such as a deferred import or a browser launch. A worker is live as soon as
+it answers requests and ready once its background warm-up has finished.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTracker:
+    """Milestones, phase durations and readiness of the current process"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.milestones = {}
+        self.phases = {}
+        self.errors = {}
+        self.warming = False
+        self.ready_after = None
+
+    def elapsed(self):
+        return time.perf_counter() - self._origin
+
+    def mark(self, name):
+        """Record that a milestone was reached now"""
+        with self._lock:
+            self.milestones.setdefault(name, round(self.elapsed(), 4))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round(time.perf_counter() - start, 4)
+
+    @property
+    def ready(self):
+        return self.ready_after is not None
+
+    def mark_ready(self):
+        with self._lock:
+            if self.ready_after is not None:
+                return
+            self.ready_after = round(self.elapsed(), 4)
+            self.warming = False
+        logger.info(f"🚦 Worker ready {self.ready_after:.2f}s after start")
+
+    def warm_in_background(self, steps):
+        """Run (name, callable) warm-up steps in a daemon thread, then report ready.
+
+        A failing step is recorded and skipped: a worker whose browsers will
+        not start can still serve static scrapes, and the pool retries on
+        demand.
+        """
+        with self._lock:
+            if self.warming or self.ready_after is not None:
+                return
+            self.warming = True
+
+        def warm():
+            for name, step in steps:
+                try:
+                    with self.phase(name):
+                        step()
+                except Exception as e:
+                    logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+                    with self._lock:
+                        self.errors[name] = str(e)
+            self.mark_ready()
+
+        threading.Thread(target=warm, name="worker-warmup", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "uptime": round(self.elapsed(), 1),
+                "warming": self.warming,
+                "ready_after": self.ready_after,
+                "milestones": dict(self.milestones),
+                "phases": dict(self.phases),
+                "errors": dict(self.errors),
+            }
+
+
+STARTUP = StartupTracker()
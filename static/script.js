@@ -141,6 +141,8 @@ class WebScraperClient {
                     <strong>Text:</strong> ${this.escapeHtml(item.text)}<br>
                     <strong>URL:</strong> <a href="${item.url}" target="_blank" rel="noopener noreferrer">${this.escapeHtml(item.url)}</a>
                 `;
+            } else if ((result.type === 'blocks' || result.type === 'main_content') && typeof item === 'object') {
+                itemDiv.innerHTML = `<strong>${this.getItemLabel(result.type)} ${index + 1} &lt;${this.escapeHtml(item.block)}&gt;:</strong> ${this.escapeHtml(item.text)}`;
             } else if (result.type === 'images') {
                 itemDiv.innerHTML = `
                     <strong>🖼️ Image ${index + 1}:</strong><br>
@@ -159,6 +161,8 @@ class WebScraperClient {
     getItemLabel(type) {
         const labels = {
             text: '📝 Text',
+            blocks: '🧱 Block',
+            main_content: '📰 Content',
             titles: '📋 Title',
             custom: '🎯 Custom',
             links: '🔗 Link',
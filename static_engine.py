@@ -0,0 +1,457 @@
+"""Static scraping engine that extracts straight from preflight HTML.
+
+Server-rendered pages do not need a browser: the body that the preflight
+request already downloaded is parsed with BeautifulSoup/lxml and run through
+the same extractors as the Selenium path, producing the same output shapes.
+The parsers are imported on the first static scrape (or by ``preload_parsers``
+while a worker warms up), not when the module is loaded.
+"""
+import logging
+import re
+from itertools import islice
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+TEXT_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'div', 'li', 'td', 'th']
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+HIDDEN_TAGS = ['script', 'style', 'noscript', 'template', 'head']
+BLOCK_TAGS = [
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+]
+
+# Elements that start a new run of text for the blocks and main_content types
+TEXT_BLOCK_TAGS = tuple(tag for tag in BLOCK_TAGS if tag != 'br') + (
+    'body', 'caption', 'details', 'fieldset', 'legend', 'summary')
+
+# Readability-style hints for picking the main content container
+CONTENT_TAG_WEIGHTS = {'article': 1.5, 'main': 1.5, 'aside': 0.3, 'footer': 0.2, 'form': 0.3, 'header': 0.3, 'nav': 0.2}
+POSITIVE_HINTS = r'article|body|content|entry|main|post|story|text|blog'
+NEGATIVE_HINTS = (r'banner|breadcrumb|comment|cookie|footer|menu|modal|nav|popup|promo|related|share|sidebar|'
+                  r'social|sponsor|widget')
+MIN_SCORED_BLOCK_LENGTH = 25
+
+# Results per scraping type when a request does not set a limit
+DEFAULT_LIMITS = {'text': 100, 'links': 75, 'images': 75, 'titles': 75, 'custom': 75, 'recipe': 100,
+                  'blocks': 100, 'main_content': 100}
+EXTRACTOR_NAMES = {'text': 'text_content', 'links': 'links', 'images': 'images', 'titles': 'titles',
+                   'custom': 'custom_selector', 'recipe': 'recipe', 'blocks': 'text_blocks',
+                   'main_content': 'main_content'}
+
+# Empty mount points left behind by client-side frameworks
+SPA_ROOT_IDS = ('root', 'app', '__next', '__nuxt', 'svelte', 'ember-app')
+SPA_ATTRIBUTES = ('ng-app', 'data-reactroot', 'data-server-rendered', 'ng-version')
+WORD = re.compile(r'\w')
+NOSCRIPT_WALL = re.compile(r'(enable|requires?|turn on|need)\W+(\w+\W+){0,3}javascript', re.IGNORECASE)
+
+
+def preload_parsers():
+    """Import BeautifulSoup, lxml and soupsieve ahead of the first static scrape"""
+    import bs4  # noqa: F401
+    import lxml.etree  # noqa: F401
+    import lxml.html  # noqa: F401
+    import soupsieve  # noqa: F401
+
+
+def normalize_text(text):
+    """Collapse whitespace the way rendered element text reads"""
+    return ' '.join(text.split()) if text else ''
+
+
+def is_html_response(response):
+    """Whether a preflight response carries an HTML document"""
+    content_type = response.headers.get('Content-Type', '').lower()
+    return not content_type or 'html' in content_type
+
+
+def is_hidden(element):
+    """Hidden by markup alone; the static engine cannot evaluate stylesheets"""
+    return (element.get('hidden') is not None or element.get('aria-hidden') == 'true'
+            or 'display:none' in (element.get('style') or '').replace(' ', '').lower())
+
+
+def walk_text_blocks(root):
+    """Text blocks and per-element statistics of an lxml tree, in a single pass.
+
+    Every text node lands in exactly one block: the run of text inside its
+    nearest block-level ancestor, cut wherever a nested block starts or
+    ends. Blocks are (text, block tag, block element, element index);
+    statistics map each element to [first index, last index, text length,
+    link text length], with lengths summed over its subtree.
+    """
+    blocks = []
+    stats = {}
+    open_blocks = []  # [element, text parts] of every enclosing block
+    link_depth = 0
+    counter = 0
+
+    def add(element, value):
+        if not value or not open_blocks:
+            return
+        open_blocks[-1][1].append(value)
+        length = len(value.strip())
+        if length and element in stats:
+            stats[element][2] += length
+            if link_depth:
+                stats[element][3] += length
+
+    def flush():
+        element, parts = open_blocks[-1]
+        text = normalize_text(''.join(parts))
+        parts.clear()
+        if WORD.search(text):
+            blocks.append((text, element.tag, element, stats[element][0]))
+
+    stack = [(root, False)]
+    while stack:
+        element, leaving = stack.pop()
+        if leaving:
+            stat = stats[element]
+            stat[1] = counter
+            if element.tag == 'a':
+                link_depth -= 1
+            if element.tag in TEXT_BLOCK_TAGS or element is root:
+                flush()
+                open_blocks.pop()
+            if element is not root:
+                parent = element.getparent()
+                stats[parent][2] += stat[2]
+                stats[parent][3] += stat[3]
+                add(parent, element.tail)
+            continue
+
+        if not isinstance(element.tag, str) or is_hidden(element):
+            # Comments and hidden elements only contribute the text that follows them
+            if element is not root:
+                add(element.getparent(), element.tail)
+            continue
+
+        counter += 1
+        stats[element] = [counter, 0, 0, 0]
+        if element.tag == 'a':
+            link_depth += 1
+        if element.tag == 'br':
+            add(element, ' ')
+        if element.tag in TEXT_BLOCK_TAGS or element is root:
+            if open_blocks:
+                flush()
+            open_blocks.append([element, []])
+        add(element, element.text)
+        stack.append((element, True))
+        stack.extend((child, False) for child in reversed(element))
+    return blocks, stats
+
+
+def main_content_blocks(blocks, stats):
+    """The blocks inside the highest-scoring content container and its strong siblings.
+
+    Paragraph-sized blocks credit their parent and, at half weight, their
+    grandparent; a container's score is then cut by its link density and
+    weighted by its tag and class/id hints. Pages without such blocks keep
+    every block.
+    """
+    positive = re.compile(POSITIVE_HINTS, re.IGNORECASE)
+    negative = re.compile(NEGATIVE_HINTS, re.IGNORECASE)
+    raw = {}
+
+    def credit(element, score):
+        if element is not None and element in stats:
+            raw[element] = raw.get(element, 0) + score
+
+    for text, tag, element, index in blocks:
+        if len(text) < MIN_SCORED_BLOCK_LENGTH:
+            continue
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = element.getparent()
+        credit(parent, score)
+        credit(parent.getparent() if parent is not None else None, score / 2)
+
+    def final_score(element):
+        length, link_length = stats[element][2], stats[element][3]
+        hints = f"{element.get('class') or ''} {element.get('id') or ''}"
+        weight = CONTENT_TAG_WEIGHTS.get(element.tag, 1.0)
+        if negative.search(hints):
+            weight *= 0.5
+        if positive.search(hints):
+            weight *= 1.25
+        return raw[element] * (1 - (link_length / length if length else 0)) * weight
+
+    best, best_score = None, 0
+    for element in raw:
+        score = final_score(element)
+        if score > best_score:
+            best, best_score = element, score
+    if best is None:
+        return blocks
+
+    # Keep the headline of an article whose body won
+    parent = best.getparent()
+    if parent is not None and parent.tag in ('article', 'main') and parent in stats:
+        best = parent
+    kept = [best]
+    threshold = max(10, best_score * 0.2)
+    parent = best.getparent()
+    if parent is not None:
+        kept.extend(sibling for sibling in parent
+                    if sibling is not best and sibling in raw and final_score(sibling) >= threshold)
+    ranges = [stats[element][:2] for element in kept]
+    return [block for block in blocks if any(first <= block[3] <= last for first, last in ranges)]
+
+
+def needs_javascript(soup, min_text_length=250):
+    """Heuristic check for pages that only render client-side.
+
+    Returns ``(needs_js, reason)``.
+    """
+    for noscript in soup.find_all('noscript'):
+        if NOSCRIPT_WALL.search(noscript.get_text(' ')):
+            return True, "noscript wall"
+
+    for root_id in SPA_ROOT_IDS:
+        mount = soup.find(id=root_id)
+        if mount is not None and not normalize_text(mount.get_text()):
+            return True, f"empty #{root_id} mount point"
+
+    body = soup.body
+    body_text = ''
+    if body is not None:
+        body_text = normalize_text(' '.join(
+            s for s in body.find_all(string=True)
+            if s.parent is not None and s.parent.name not in HIDDEN_TAGS
+        ))
+
+    if len(body_text) < min_text_length:
+        if any(soup.find(attrs={attr: True}) for attr in SPA_ATTRIBUTES):
+            return True, "SPA markers with little body text"
+        return True, f"little body text ({len(body_text)} chars)"
+
+    return False, "server-rendered content"
+
+
+class StaticScraper:
+    """Runs the scraping extractors on an already downloaded HTML document"""
+
+    def __init__(self, html, url, encoding=None, min_text_length=250):
+        self.url = url
+        self.source = html
+        self.encoding = encoding
+        self._tree = None
+        self._text_blocks = None
+        from bs4 import BeautifulSoup
+        self.soup = BeautifulSoup(html, 'lxml', from_encoding=encoding)
+
+        base = self.soup.find('base', href=True)
+        self.base_url = urljoin(url, base['href']) if base else url
+
+        title = self.soup.title
+        self.title = normalize_text(title.get_text()) if title else ''
+
+        self.needs_js, self.needs_js_reason = needs_javascript(self.soup, min_text_length)
+
+        # Hidden content never shows up in rendered element text
+        for tag in self.soup.find_all(['script', 'style', 'noscript', 'template']):
+            tag.decompose()
+
+        # Block boundaries separate words in rendered text, so pad them once
+        for tag in self.soup.find_all(BLOCK_TAGS):
+            tag.insert(0, ' ')
+            tag.append(' ')
+
+    @classmethod
+    def from_response(cls, response, **kwargs):
+        """Build a scraper from a requests response"""
+        content_type = response.headers.get('Content-Type', '').lower()
+        encoding = response.encoding if 'charset=' in content_type else None
+        return cls(response.content, response.url, encoding=encoding, **kwargs)
+
+    def lxml_tree(self):
+        """lxml tree of the document for XPath recipes, without hidden content; built on first use"""
+        if self._tree is None:
+            import lxml.html
+            # huge_tree lifts libxml2's nesting limit, which silently truncates deep DOMs
+            parser = lxml.html.HTMLParser(encoding=self.encoding, huge_tree=True)
+            self._tree = lxml.html.document_fromstring(self.source, parser=parser)
+            for tag in self._tree.xpath('//script | //style | //noscript | //template'):
+                tag.drop_tree()
+        return self._tree
+    
+    def _text(self, element):
+        return normalize_text(element.get_text())
+
+    def _absolute(self, value):
+        return urljoin(self.base_url, value.strip()) if value else value
+
+    def iter_text_content(self):
+        """Unique text of text-bearing elements, in document order"""
+        seen = set()
+        for element in self.soup.find_all(TEXT_TAGS):
+            if element.name == 'div' and element.find(['script', 'style'], recursive=False):
+                continue
+            text = self._text(element)
+            if text and len(text) > 5 and text not in seen:
+                seen.add(text)
+                yield text
+
+    def text_blocks(self):
+        """Blocks and element statistics of the body, from one walk of the lxml tree; built on first use"""
+        if self._text_blocks is None:
+            tree = self.lxml_tree()
+            body = tree.find('body')
+            self._text_blocks = walk_text_blocks(body if body is not None else tree)
+        return self._text_blocks
+
+    def iter_text_blocks(self):
+        """Each run of text once, with the tag of the block it sits in"""
+        blocks, _ = self.text_blocks()
+        for text, tag, element, index in blocks:
+            yield {"text": text, "block": tag}
+
+    def iter_main_content(self):
+        """Text blocks of the page's main content region only"""
+        for text, tag, element, index in main_content_blocks(*self.text_blocks()):
+            yield {"text": text, "block": tag}
+
+    def iter_links(self):
+        """Unique absolute links with their text"""
+        seen_urls = set()
+        for link in self.soup.find_all('a', href=True):
+            href = self._absolute(link['href'])
+            if not href or not href.startswith(('http://', 'https://', '/')):
+                continue
+            if href in seen_urls:
+                continue
+            seen_urls.add(href)
+            text = self._text(link) or href
+            yield {"text": text[:150], "url": href}
+
+    def iter_images(self):
+        """Unique absolute image URLs"""
+        seen = set()
+        for img in self.soup.find_all('img', src=True):
+            src = self._absolute(img['src'])
+            if src and src.startswith(('http://', 'https://', 'data:')) and src not in seen:
+                seen.add(src)
+                yield src
+
+    def iter_titles(self):
+        """The page title followed by unique headings"""
+        seen = set()
+        if self.title:
+            seen.add(f"Page Title: {self.title}")
+            yield f"Page Title: {self.title}"
+
+        for heading in self.soup.find_all(HEADING_TAGS):
+            text = self._text(heading)
+            if text and text not in seen:
+                seen.add(text)
+                yield text
+
+    def iter_custom_selector(self, selector):
+        """Unique text (or fallback attribute/markup) of elements matching a CSS selector"""
+        seen = set()
+        for element in self.soup.select(selector):
+            text = self._text(element)
+            if not text:
+                text = (element.get('value') or
+                        element.get('alt') or
+                        element.get('title') or
+                        self._absolute(element.get('href')) or
+                        self._absolute(element.get('src')))
+
+            if not text:
+                html = str(element)
+                text = html[:300] + "..." if len(html) > 300 else html
+            if text not in seen:
+                seen.add(text)
+                yield text
+
+    def run_recipe(self, recipe, limit=None):
+        """Structured records of a compiled extraction recipe"""
+        if recipe.syntax == 'xpath':
+            raw_records = recipe.extract_tree(self.lxml_tree(), limit)
+        else:
+            raw_records = recipe.extract_soup(self.soup, limit)
+        return recipe.finish(raw_records, self.base_url)
+    
+    def iter_recipe(self, recipe):
+        """Records of a compiled extraction recipe"""
+        yield from self.run_recipe(recipe)
+    
+    def scrape_text_content(self, limit=DEFAULT_LIMITS['text'], offset=0):
+        """Static text content scraping"""
+        unique_content = list(islice(self.iter_text_content(), offset, offset + limit))
+        logger.info(f"Found {len(unique_content)} text elements (static)")
+        return unique_content
+
+    def scrape_text_blocks(self, limit=DEFAULT_LIMITS['blocks'], offset=0):
+        """Static leaf-text block scraping"""
+        blocks = list(islice(self.iter_text_blocks(), offset, offset + limit))
+        logger.info(f"Found {len(blocks)} text blocks (static)")
+        return blocks
+
+    def scrape_main_content(self, limit=DEFAULT_LIMITS['main_content'], offset=0):
+        """Static main-content text block scraping"""
+        blocks = list(islice(self.iter_main_content(), offset, offset + limit))
+        logger.info(f"Found {len(blocks)} main content blocks (static)")
+        return blocks
+
+    def scrape_links(self, limit=DEFAULT_LIMITS['links'], offset=0):
+        """Static link scraping"""
+        unique_links = list(islice(self.iter_links(), offset, offset + limit))
+        logger.info(f"Found {len(unique_links)} unique links (static)")
+        return unique_links
+
+    def scrape_images(self, limit=DEFAULT_LIMITS['images'], offset=0):
+        """Static image scraping"""
+        unique_images = list(islice(self.iter_images(), offset, offset + limit))
+        logger.info(f"Found {len(unique_images)} unique images (static)")
+        return unique_images
+
+    def scrape_titles(self, limit=DEFAULT_LIMITS['titles'], offset=0):
+        """Static title scraping"""
+        unique_titles = list(islice(self.iter_titles(), offset, offset + limit))
+        logger.info(f"Found {len(unique_titles)} unique titles (static)")
+        return unique_titles
+
+    def scrape_custom_selector(self, selector, limit=DEFAULT_LIMITS['custom'], offset=0):
+        """Static custom selector scraping"""
+        unique_results = list(islice(self.iter_custom_selector(selector), offset, offset + limit))
+        logger.info(f"Found {len(unique_results)} elements with selector '{selector}' (static)")
+        return unique_results
+
+    def scrape_recipe(self, recipe, limit=DEFAULT_LIMITS['recipe'], offset=0):
+        """Static extraction recipe scraping"""
+        records = self.run_recipe(recipe, offset + limit)[offset:]
+        logger.info(f"Extracted {len(records)} records with recipe '{recipe.name}' (static)")
+        return records
+    
+    def iterate(self, scraping_type, custom_selector=None, limit=None, offset=0, chunk_size=None):
+        """Lazily yield the results of a scraping type, without building the full list"""
+        if scraping_type not in EXTRACTOR_NAMES:
+            raise ValueError(f"Invalid scraping type: {scraping_type}")
+        extractor = getattr(self, f"iter_{EXTRACTOR_NAMES[scraping_type]}")
+        items = extractor(custom_selector) if scraping_type in ('custom', 'recipe') else extractor()
+        return islice(items, offset, None if limit is None else offset + limit)
+
+    def extract(self, scraping_type, custom_selector=None, limit=None, offset=0):
+        """Run the extractor for a scraping type"""
+        limit = DEFAULT_LIMITS.get(scraping_type) if limit is None else limit
+        if scraping_type == 'text':
+            return self.scrape_text_content(limit, offset)
+        if scraping_type == 'blocks':
+            return self.scrape_text_blocks(limit, offset)
+        if scraping_type == 'main_content':
+            return self.scrape_main_content(limit, offset)
+        if scraping_type == 'links':
+            return self.scrape_links(limit, offset)
+        if scraping_type == 'images':
+            return self.scrape_images(limit, offset)
+        if scraping_type == 'titles':
+            return self.scrape_titles(limit, offset)
+        if scraping_type == 'custom':
+            return self.scrape_custom_selector(custom_selector, limit, offset)
+        if scraping_type == 'recipe':
+            return self.scrape_recipe(custom_selector, limit, offset)
+        raise ValueError(f"Invalid scraping type: {scraping_type}")
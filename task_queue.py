@@ -0,0 +1,533 @@
+"""Durable scrape task queue shared by API front ends and scraper workers.
+
+Front ends submit tasks and poll for their outcome; scraper worker
+processes on any node lease them. A lease hides a task from other workers
+for a visibility timeout, which the worker keeps extending while it scrapes.
+A lease that runs out (the worker died or hung) puts the task back in the
+queue, so every task is delivered at least once; the first result recorded
+wins and later ones for the same task are dropped. Failed attempts go back
+in the queue after a back-off until the task runs out of attempts or time.
+
+Two backends share one interface, chosen by URL:
+
+- ``sqlite:///path/to/tasks.sqlite3``: one SQLite file, for workers on one machine
+- ``redis://host:6379/0``: any Redis-protocol server, for workers on many nodes
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from jobs import CANCELLED, EXPIRED, FAILED, FINISHED_STATES, QUEUED, RUNNING, SUCCEEDED, QueueFull
+
+logger = logging.getLogger(__name__)
+
+LEASE_LOST_ERROR = {"error": "Worker stopped renewing the task's lease", "code": "LEASE_EXPIRED", "retryable": True}
+DEADLINE_ERROR = {"error": "Job deadline passed before it finished", "code": "TIMEOUT", "retryable": False}
+
+
+class Task:
+    """A queued scrape, as stored by a queue backend"""
+
+    def __init__(self, id, payload, summary, status, attempts, max_attempts, created_at, deadline,
+                 started_at=None, finished_at=None, result=None, error=None, token=None, worker=None):
+        self.id = id
+        self.payload = payload
+        self.summary = summary or {}
+        self.status = status
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.created_at = created_at
+        self.deadline = deadline
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.result = result
+        self.error = error
+        self.token = token  # Lease token of the worker holding the task
+        self.worker = worker
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def remaining(self):
+        """Seconds left before the task's deadline"""
+        return max(0.0, self.deadline - time.time())
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "request": self.summary,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "worker": self.worker,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "deadline": iso(self.deadline),
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+def _loads(value):
+    return json.loads(value) if value is not None else None
+
+
+def _dumps(value):
+    return json.dumps(value) if value is not None else None
+
+
+class SqliteTaskQueue:
+    """Task queue in a SQLite file shared by the processes of one machine"""
+
+    def __init__(self, path, capacity=1000, result_ttl=900.0):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        # Autocommit: every change runs in an explicit BEGIN IMMEDIATE transaction
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                summary TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                deadline REAL NOT NULL,
+                available_at REAL NOT NULL,
+                lease_expires REAL,
+                token TEXT,
+                worker TEXT,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, available_at)")
+        logger.info(f"📬 SQLite task queue at {path}")
+
+    @contextmanager
+    def _transaction(self):
+        """Serialise a read-modify-write against every process using the file"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _row_to_task(self, row):
+        return Task(row[0], _loads(row[1]), _loads(row[2]), row[3], row[4], row[5], row[6], row[7],
+                    started_at=row[8], finished_at=row[9], result=_loads(row[10]), error=_loads(row[11]),
+                    token=row[12], worker=row[13])
+
+    def _fetch(self, db, task_id):
+        row = db.execute(
+            "SELECT id, payload, summary, status, attempts, max_attempts, created_at, deadline, "
+            "started_at, finished_at, result, error, token, worker FROM tasks WHERE id = ?",
+            (task_id,)
+        ).fetchone()
+        return self._row_to_task(row) if row is not None else None
+
+    def submit(self, payload, summary=None, deadline=300.0, max_attempts=3):
+        """Queue a task; raises QueueFull when capacity tasks are already waiting"""
+        now = time.time()
+        task_id = uuid.uuid4().hex
+        with self._transaction() as db:
+            waiting = db.execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if waiting >= self.capacity:
+                raise QueueFull(f"Task queue is full ({waiting} tasks waiting)")
+            db.execute(
+                "INSERT INTO tasks (id, payload, summary, status, max_attempts, created_at, deadline, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, json.dumps(payload), _dumps(summary), QUEUED, max(1, max_attempts), now, now + deadline, now)
+            )
+            task = self._fetch(db, task_id)
+        self._purge_expired()
+        logger.info(f"📥 Queued task {task_id} ({waiting + 1} waiting)")
+        return task
+
+    def _release_expired_leases(self, db, now):
+        """Requeue tasks whose worker stopped renewing its lease, or give up on them"""
+        rows = db.execute(
+            "SELECT id, attempts, max_attempts, deadline FROM tasks WHERE status = ? AND lease_expires < ?",
+            (RUNNING, now)
+        ).fetchall()
+        for task_id, attempts, max_attempts, deadline in rows:
+            if deadline <= now:
+                db.execute("UPDATE tasks SET status = ?, error = ?, finished_at = ?, token = NULL WHERE id = ?",
+                           (EXPIRED, json.dumps(DEADLINE_ERROR), now, task_id))
+            elif attempts >= max_attempts:
+                db.execute("UPDATE tasks SET status = ?, error = ?, finished_at = ?, token = NULL WHERE id = ?",
+                           (FAILED, json.dumps(LEASE_LOST_ERROR), now, task_id))
+            else:
+                db.execute("UPDATE tasks SET status = ?, error = ?, available_at = ?, token = NULL WHERE id = ?",
+                           (QUEUED, json.dumps(LEASE_LOST_ERROR), now, task_id))
+            logger.warning(f"⏳ Lease on task {task_id} expired after attempt {attempts}")
+
+    def lease(self, worker, visibility_timeout=60.0):
+        """The oldest runnable task, hidden from other workers for visibility_timeout; None if there is none"""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as db:
+            self._release_expired_leases(db, now)
+            db.execute("UPDATE tasks SET status = ?, error = ?, finished_at = ? WHERE status = ? AND deadline <= ?",
+                       (EXPIRED, json.dumps(DEADLINE_ERROR), now, QUEUED, now))
+            row = db.execute(
+                "SELECT id FROM tasks WHERE status = ? AND available_at <= ? ORDER BY available_at, created_at LIMIT 1",
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, token = ?, worker = ?, lease_expires = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, token, worker, now + visibility_timeout, now, row[0])
+            )
+            return self._fetch(db, row[0])
+
+    def extend(self, task_id, token, visibility_timeout=60.0):
+        """Renew a lease; False once the lease was lost or the task cancelled"""
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND token = ? AND status = ?",
+                (time.time() + visibility_timeout, task_id, token, RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, token, result):
+        """Record a task's result; False if it already finished (another delivery won, or it was cancelled)"""
+        now = time.time()
+        with self._transaction() as db:
+            task = self._fetch(db, task_id)
+            if task is None or task.finished:
+                return False
+            if now > task.deadline:
+                status, result, error = FAILED, None, {"error": "Job exceeded its deadline", "code": "TIMEOUT"}
+            else:
+                status, error = SUCCEEDED, None
+            db.execute("UPDATE tasks SET status = ?, result = ?, error = ?, finished_at = ?, token = NULL WHERE id = ?",
+                       (status, _dumps(result), _dumps(error), now, task_id))
+            return True
+
+    def fail(self, task_id, token, error, retry_delay=None):
+        """Record a failed attempt: requeue it after retry_delay when one is given and attempts and time remain.
+
+        Returns the task's new status, or None when the caller no longer held the lease.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            task = self._fetch(db, task_id)
+            if task is None or task.status != RUNNING or task.token != token:
+                return None
+            if retry_delay is not None and task.attempts < task.max_attempts and now + retry_delay < task.deadline:
+                db.execute("UPDATE tasks SET status = ?, error = ?, available_at = ?, token = NULL WHERE id = ?",
+                           (QUEUED, json.dumps(error), now + retry_delay, task_id))
+                return QUEUED
+            db.execute("UPDATE tasks SET status = ?, error = ?, finished_at = ?, token = NULL WHERE id = ?",
+                       (FAILED, json.dumps(error), now, task_id))
+            return FAILED
+
+    def cancel(self, task_id):
+        """Cancel a task that has not finished; returns the task, or None if it is unknown"""
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET status = ?, finished_at = ?, token = NULL WHERE id = ? AND status IN (?, ?)",
+                       (CANCELLED, time.time(), task_id, QUEUED, RUNNING))
+            return self._fetch(db, task_id)
+
+    def get(self, task_id):
+        with self._lock:
+            return self._fetch(self._db, task_id)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self._transaction() as db:
+            db.execute("DELETE FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        return {"backend": "sqlite", "capacity": self.capacity, "tasks": counts}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Redis keys: {prefix}:task:{id} hashes, a {prefix}:queued sorted set scored by
+# when a task may run, a {prefix}:running sorted set scored by lease expiry
+# and a {prefix}:totals hash of counters. Every state change is one Lua script,
+# so it is atomic however many front ends and workers share the server.
+
+_REDIS_FINISH = """
+local unpack = unpack or table.unpack
+local function finish(key, id, status, now, error, ttl)
+    redis.call('HSET', key, 'status', status, 'finished_at', tostring(now))
+    if error then redis.call('HSET', key, 'error', error) end
+    redis.call('HDEL', key, 'token')
+    redis.call('EXPIRE', key, ttl)
+    redis.call('HINCRBY', KEYS[3], status, 1)
+end
+"""
+
+# KEYS: queued, running, totals; ARGV: prefix, now, visibility timeout, token, worker, ttl, lease lost error, deadline error
+_REDIS_LEASE = _REDIS_FINISH + """
+local prefix, now = ARGV[1], tonumber(ARGV[2])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, 100)) do
+    redis.call('ZREM', KEYS[2], id)
+    local key = prefix .. id
+    local task = redis.call('HMGET', key, 'status', 'attempts', 'max_attempts', 'deadline')
+    if task[1] == 'running' then
+        if tonumber(task[4]) <= now then
+            finish(key, id, 'expired', now, ARGV[8], ARGV[6])
+        elseif tonumber(task[2]) >= tonumber(task[3]) then
+            finish(key, id, 'failed', now, ARGV[7], ARGV[6])
+        else
+            redis.call('HSET', key, 'status', 'queued', 'error', ARGV[7])
+            redis.call('HDEL', key, 'token')
+            redis.call('ZADD', KEYS[1], now, id)
+            redis.call('HINCRBY', KEYS[3], 'lease_expired', 1)
+        end
+    end
+end
+while true do
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, 1)
+    if #ids == 0 then return false end
+    local id = ids[1]
+    redis.call('ZREM', KEYS[1], id)
+    local key = prefix .. id
+    local task = redis.call('HMGET', key, 'status', 'deadline', 'started_at')
+    if task[1] == 'queued' then
+        if tonumber(task[2]) <= now then
+            finish(key, id, 'expired', now, ARGV[8], ARGV[6])
+        else
+            redis.call('HINCRBY', key, 'attempts', 1)
+            redis.call('HSET', key, 'status', 'running', 'token', ARGV[4], 'worker', ARGV[5],
+                       'lease_expires', tostring(now + tonumber(ARGV[3])), 'started_at', task[3] or ARGV[2])
+            redis.call('ZADD', KEYS[2], now + tonumber(ARGV[3]), id)
+            return id
+        end
+    end
+end
+"""
+
+# KEYS: queued, running, totals; ARGV: task key, id, token, now, visibility timeout
+_REDIS_EXTEND = """
+local task = redis.call('HMGET', ARGV[1], 'status', 'token')
+if task[1] ~= 'running' or task[2] ~= ARGV[3] then return 0 end
+local expires = tonumber(ARGV[4]) + tonumber(ARGV[5])
+redis.call('HSET', ARGV[1], 'lease_expires', tostring(expires))
+redis.call('ZADD', KEYS[2], expires, ARGV[2])
+return 1
+"""
+
+# KEYS: queued, running, totals; ARGV: task key, id, now, result, ttl, deadline error
+_REDIS_COMPLETE = _REDIS_FINISH + """
+local key, id, now = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local task = redis.call('HMGET', key, 'status', 'deadline')
+if task[1] ~= 'queued' and task[1] ~= 'running' then return 0 end
+redis.call('ZREM', KEYS[1], id)
+redis.call('ZREM', KEYS[2], id)
+if now > tonumber(task[2]) then
+    finish(key, id, 'failed', now, ARGV[6], ARGV[5])
+else
+    redis.call('HSET', key, 'result', ARGV[4])
+    redis.call('HDEL', key, 'error')
+    finish(key, id, 'succeeded', now, false, ARGV[5])
+end
+return 1
+"""
+
+# KEYS: queued, running, totals; ARGV: task key, id, token, now, error, retry delay (or ''), ttl
+_REDIS_FAIL = _REDIS_FINISH + """
+local key, id, now = ARGV[1], ARGV[2], tonumber(ARGV[4])
+local task = redis.call('HMGET', key, 'status', 'token', 'attempts', 'max_attempts', 'deadline')
+if task[1] ~= 'running' or task[2] ~= ARGV[3] then return false end
+redis.call('ZREM', KEYS[2], id)
+local delay = tonumber(ARGV[6])
+if delay and tonumber(task[3]) < tonumber(task[4]) and now + delay < tonumber(task[5]) then
+    redis.call('HSET', key, 'status', 'queued', 'error', ARGV[5])
+    redis.call('HDEL', key, 'token')
+    redis.call('ZADD', KEYS[1], now + delay, id)
+    redis.call('HINCRBY', KEYS[3], 'retried', 1)
+    return 'queued'
+end
+finish(key, id, 'failed', now, ARGV[5], ARGV[7])
+return 'failed'
+"""
+
+# KEYS: queued, running, totals; ARGV: task key, id, now, ttl
+_REDIS_CANCEL = _REDIS_FINISH + """
+local status = redis.call('HGET', ARGV[1], 'status')
+if status ~= 'queued' and status ~= 'running' then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('ZREM', KEYS[2], ARGV[2])
+finish(ARGV[1], ARGV[2], 'cancelled', ARGV[3], false, ARGV[4])
+return 1
+"""
+
+# KEYS: queued, running, totals; ARGV: task key, id, capacity, key TTL, then field/value pairs
+_REDIS_SUBMIT = """
+local unpack = unpack or table.unpack
+local waiting = redis.call('ZCARD', KEYS[1])
+if waiting >= tonumber(ARGV[3]) then return -1 end
+redis.call('HSET', ARGV[1], unpack(ARGV, 5))
+redis.call('EXPIRE', ARGV[1], ARGV[4])
+redis.call('ZADD', KEYS[1], redis.call('HGET', ARGV[1], 'created_at'), ARGV[2])
+redis.call('HINCRBY', KEYS[3], 'submitted', 1)
+return waiting + 1
+"""
+
+
+class RedisTaskQueue:
+    """Task queue on a Redis-protocol server shared by the front ends and workers of many nodes"""
+
+    def __init__(self, url, capacity=1000, result_ttl=900.0, prefix='scraper:tasks'):
+        # Only needed by this backend, so only imported when it is chosen
+        import redis
+
+        self.url = url
+        self.capacity = max(1, capacity)
+        self.result_ttl = result_ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._keys = [f"{prefix}:queued", f"{prefix}:running", f"{prefix}:totals"]
+        self._submit = self._redis.register_script(_REDIS_SUBMIT)
+        self._lease = self._redis.register_script(_REDIS_LEASE)
+        self._extend = self._redis.register_script(_REDIS_EXTEND)
+        self._complete = self._redis.register_script(_REDIS_COMPLETE)
+        self._fail = self._redis.register_script(_REDIS_FAIL)
+        self._cancel = self._redis.register_script(_REDIS_CANCEL)
+        logger.info(f"📬 Redis task queue at {url}")
+
+    def _key(self, task_id):
+        return f"{self.prefix}:task:{task_id}"
+
+    def _ttl(self):
+        return max(1, int(self.result_ttl))
+
+    def submit(self, payload, summary=None, deadline=300.0, max_attempts=3):
+        """Queue a task; raises QueueFull when capacity tasks are already waiting"""
+        now = time.time()
+        task_id = uuid.uuid4().hex
+        fields = {
+            "payload": json.dumps(payload),
+            "summary": json.dumps(summary or {}),
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max(1, max_attempts),
+            "created_at": repr(now),
+            "deadline": repr(now + deadline),
+        }
+        flat = [item for pair in fields.items() for item in pair]
+        # Unfinished tasks outlive their deadline by the result TTL at most
+        waiting = self._submit(keys=self._keys, args=[self._key(task_id), task_id, self.capacity,
+                                                      int(deadline) + self._ttl(), *flat])
+        if waiting < 0:
+            raise QueueFull(f"Task queue is full ({self.capacity} tasks waiting)")
+        logger.info(f"📥 Queued task {task_id} ({waiting} waiting)")
+        return self.get(task_id)
+
+    def lease(self, worker, visibility_timeout=60.0):
+        """The oldest runnable task, hidden from other workers for visibility_timeout; None if there is none"""
+        token = uuid.uuid4().hex
+        task_id = self._lease(keys=self._keys, args=[
+            f"{self.prefix}:task:", repr(time.time()), visibility_timeout, token, worker, self._ttl(),
+            json.dumps(LEASE_LOST_ERROR), json.dumps(DEADLINE_ERROR),
+        ])
+        return self.get(task_id) if task_id else None
+
+    def extend(self, task_id, token, visibility_timeout=60.0):
+        """Renew a lease; False once the lease was lost or the task cancelled"""
+        return bool(self._extend(keys=self._keys, args=[
+            self._key(task_id), task_id, token, repr(time.time()), visibility_timeout]))
+
+    def complete(self, task_id, token, result):
+        """Record a task's result; False if it already finished (another delivery won, or it was cancelled)"""
+        return bool(self._complete(keys=self._keys, args=[
+            self._key(task_id), task_id, repr(time.time()), json.dumps(result), self._ttl(),
+            json.dumps({"error": "Job exceeded its deadline", "code": "TIMEOUT"})]))
+
+    def fail(self, task_id, token, error, retry_delay=None):
+        """Record a failed attempt: requeue it after retry_delay when one is given and attempts and time remain.
+
+        Returns the task's new status, or None when the caller no longer held the lease.
+        """
+        return self._fail(keys=self._keys, args=[
+            self._key(task_id), task_id, token, repr(time.time()), json.dumps(error),
+            '' if retry_delay is None else repr(retry_delay), self._ttl()]) or None
+
+    def cancel(self, task_id):
+        """Cancel a task that has not finished; returns the task, or None if it is unknown"""
+        self._cancel(keys=self._keys, args=[self._key(task_id), task_id, repr(time.time()), self._ttl()])
+        return self.get(task_id)
+
+    def get(self, task_id):
+        fields = self._redis.hgetall(self._key(task_id))
+        if not fields:
+            return None
+
+        def number(name):
+            value = fields.get(name)
+            return float(value) if value else None
+
+        return Task(task_id, _loads(fields.get("payload")), _loads(fields.get("summary")), fields["status"],
+                    int(fields.get("attempts") or 0), int(fields.get("max_attempts") or 1),
+                    number("created_at"), number("deadline"), started_at=number("started_at"),
+                    finished_at=number("finished_at"), result=_loads(fields.get("result")),
+                    error=_loads(fields.get("error")), token=fields.get("token"), worker=fields.get("worker"))
+
+    def stats(self):
+        pipe = self._redis.pipeline()
+        pipe.zcard(self._keys[0])
+        pipe.zcard(self._keys[1])
+        pipe.hgetall(self._keys[2])
+        queued, running, totals = pipe.execute()
+        return {
+            "backend": "redis",
+            "capacity": self.capacity,
+            "tasks": {QUEUED: queued, RUNNING: running},
+            "totals": {name: int(count) for name, count in totals.items()},
+        }
+
+    def close(self):
+        self._redis.close()
+
+
+def open_task_queue(url, capacity=1000, result_ttl=900.0):
+    """The task queue backend for a sqlite:/// or redis:// URL"""
+    if url.startswith('sqlite:///'):
+        return SqliteTaskQueue(url[len('sqlite:///'):], capacity, result_ttl)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisTaskQueue(url, capacity, result_ttl)
+    raise ValueError(f"Unsupported task queue URL: {url} (expected sqlite:///path or redis://host:port/db)")
+
+
+def wait_for(queue, task_id, timeout, poll_interval=0.05, max_poll_interval=0.5):
+    """Poll until a task finishes or timeout seconds pass; returns the last state seen"""
+    give_up = time.time() + timeout
+    while True:
+        task = queue.get(task_id)
+        if task is None or task.finished or time.time() >= give_up:
+            return task
+        time.sleep(min(poll_interval, max(0.0, give_up - time.time())))
+        poll_interval = min(max_poll_interval, poll_interval * 2)
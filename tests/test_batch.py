@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+from batch import BatchRunner, BrowserSlots
+
+
+def test_browser_items_wait_for_a_free_browser():
+    slots = BrowserSlots({'selenium': 2})
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def run_one(item):
+        with slots.hold('selenium', deadline=time.time() + 5):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(item)
+        return item["url"]
+
+    items = [{"url": f"https://host{index}.example/"} for index in range(8)]
+    results = list(BatchRunner(run_one, parallelism=8, per_host_limit=2).run(items))
+    assert all(error is None for _, _, _, error in results)
+    assert len(results) == 8
+    assert max(peak) == 2
+
+
+def test_waiting_past_the_deadline_times_out():
+    slots = BrowserSlots({'selenium': 1})
+    with slots.hold('selenium'):
+        with pytest.raises(TimeoutError):
+            with slots.hold('selenium', deadline=time.time() + 0.05):
+                pass
+    with slots.hold('static'):
+        pass  # Engines without a cap never wait
@@ -0,0 +1,74 @@
+import types
+
+import chrome_watchdog
+from chrome_watchdog import Watchdog
+
+OUR_PROFILE = '--user-data-dir=/tmp/chrome_smart_abc'
+
+
+def scraper_with_driver(pid):
+    return types.SimpleNamespace(
+        driver=types.SimpleNamespace(service=types.SimpleNamespace(process=types.SimpleNamespace(pid=pid))),
+        driver_started_at=None, pages_served=3, recycle_reason=None, busy=False,
+    )
+
+
+def reap(monkeypatch, processes, live_scrapers=(), rss_bytes=0, watchdog_options=None):
+    """Run a watchdog pass over a fake process table {pid: (parent, cmdline)}; returns the pids killed"""
+    killed = []
+    monkeypatch.setattr(chrome_watchdog.procinfo, 'cmdline', lambda pid: processes[pid][1])
+    monkeypatch.setattr(chrome_watchdog.os, 'kill', lambda pid, sig: killed.append(pid))
+    monkeypatch.setattr(chrome_watchdog.glob, 'glob', lambda pattern: [])
+    pool = types.SimpleNamespace(members=lambda: [])
+    watchdog = Watchdog(pool, reap_interval=0, live_scrapers=lambda: list(live_scrapers), **(watchdog_options or {}))
+    parents = {pid: parent for pid, (parent, _) in processes.items()}
+    monkeypatch.setattr(chrome_watchdog.procinfo, 'parent_map', lambda: parents)
+    monkeypatch.setattr(chrome_watchdog.procinfo, 'tree_usage',
+                        lambda pid, parents: {"rss_bytes": rss_bytes, "cpu_seconds": 0, "processes": 1})
+    watchdog.run_once()
+    return sorted(killed)
+
+
+def test_orphaned_driver_tree_on_our_profile_is_killed(monkeypatch):
+    processes = {
+        100: (1, ['/usr/bin/chromedriver', '--port=9515']),
+        101: (100, ['/opt/chrome/chrome', OUR_PROFILE]),
+        102: (101, ['/opt/chrome/chrome', '--type=renderer']),
+        200: (1, ['/opt/chrome/chrome', OUR_PROFILE]),
+    }
+    assert reap(monkeypatch, processes) == [100, 101, 102, 200]
+
+
+def test_other_services_chromedrivers_are_left_alone(monkeypatch):
+    processes = {
+        300: (1, ['/usr/bin/chromedriver', '--port=4444']),
+        301: (300, ['/opt/chrome/chrome', '--user-data-dir=/var/lib/ci/profile']),
+        302: (1, ['/usr/bin/chromedriver', '--port=4445']),
+    }
+    assert reap(monkeypatch, processes) == []
+
+
+def test_live_scrapers_outside_the_pool_are_protected(monkeypatch):
+    # The app runs as PID 1, so its own job-worker drivers look orphaned
+    processes = {
+        400: (1, ['/usr/bin/chromedriver', '--port=9515']),
+        401: (400, ['/opt/chrome/chrome', OUR_PROFILE]),
+        500: (1, ['/usr/bin/chromedriver', '--port=9516']),
+        501: (500, ['/opt/chrome/chrome', '--user-data-dir=/tmp/chrome_smart_def']),
+    }
+    assert reap(monkeypatch, processes, live_scrapers=[scraper_with_driver(400)]) == [500, 501]
+
+
+def test_oversized_worker_driver_is_flagged_for_recycling(monkeypatch):
+    processes = {
+        600: (42, ['/usr/bin/chromedriver', '--port=9515']),
+        601: (600, ['/opt/chrome/chrome', OUR_PROFILE]),
+    }
+    big, small = scraper_with_driver(600), scraper_with_driver(700)
+    reap(monkeypatch, processes, live_scrapers=[big], rss_bytes=2000 * chrome_watchdog.MB,
+         watchdog_options={"max_rss_mb": 1500})
+    assert big.recycle_reason == "RSS 2000 MB over 1500 MB"
+
+    reap(monkeypatch, {**processes, 700: (42, ['/usr/bin/chromedriver'])}, live_scrapers=[small],
+         rss_bytes=100 * chrome_watchdog.MB, watchdog_options={"max_rss_mb": 1500})
+    assert small.recycle_reason is None
@@ -0,0 +1,38 @@
+import functools
+import http.server
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def site(tmp_path):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    links = ''.join(f'<a href="/page{index}.html">Page {index}</a>' for index in range(120))
+    (tmp_path / 'index.html').write_text(f"<html><head><title>Index</title></head><body>{links}</body></html>")
+    yield f"http://127.0.0.1:{server.server_port}/index.html"
+    server.shutdown()
+
+
+def test_links_to_follow_ignore_the_record_page(site):
+    params = app.parse_scrape_request({'url': site, 'scrapingType': 'links', 'render': False, 'limit': 5, 'cursor': '10'})
+    params.pop("url")
+    record, links = app.crawl_page(params, site)
+    assert len(record["data"]) == 5
+    assert record["data"][0]["url"].endswith("/page10.html")
+    assert "follow_links" not in record
+    assert len(links) == 120
+
+
+def test_links_are_followed_even_when_not_recorded(site):
+    params = app.parse_scrape_request({'url': site, 'scrapingType': 'titles', 'render': False})
+    params.pop("url")
+    record, links = app.crawl_page(params, site)
+    assert record["type"] == "titles"
+    assert isinstance(record["data"], list)
+    assert len(links) == 120
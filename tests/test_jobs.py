@@ -0,0 +1,31 @@
+import threading
+import time
+
+from jobs import CANCELLED, JobManager
+
+
+def test_cancelled_running_job_keeps_its_cancellation_time():
+    started, release, returned = threading.Event(), threading.Event(), threading.Event()
+
+    def runner(params, state, job):
+        started.set()
+        release.wait(5)
+        returned.set()
+        return {"count": 1}
+
+    manager = JobManager(runner, workers=1)
+    try:
+        job = manager.submit({"url": "https://example.com"})
+        assert started.wait(5)
+        cancelled_at = manager.cancel(job.id).finished_at
+        time.sleep(0.02)
+        release.set()
+        assert returned.wait(5)
+        time.sleep(0.05)  # Let the worker record the scrape's return
+
+        job = manager.get(job.id)
+        assert job.status == CANCELLED
+        assert job.result is None
+        assert job.finished_at == cancelled_at
+    finally:
+        manager.shutdown(timeout=1)
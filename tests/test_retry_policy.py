@@ -0,0 +1,40 @@
+import pytest
+import requests
+
+from retry_policy import (CIRCUIT_OPEN, CONNECTION_RESET, DNS_FAILURE, DNS_TEMPORARY_FAILURE, CircuitBreakers, ScrapeError,
+                          classify)
+
+TEMPORARY = ("HTTPSConnectionPool(host='example.com', port=443): Max retries exceeded with url: / "
+             "(Caused by NameResolutionError(\"<urllib3.connection.HTTPSConnection object at 0x7f>: "
+             "Failed to resolve 'example.com' ([Errno -3] Temporary failure in name resolution)\"))")
+NXDOMAIN = TEMPORARY.replace("[Errno -3] Temporary failure in name resolution", "[Errno -2] Name or service not known")
+
+
+def test_resolver_hiccup_is_transient():
+    error = classify(requests.exceptions.ConnectionError(TEMPORARY))
+    assert error.code == DNS_TEMPORARY_FAILURE
+    assert error.transient
+    assert classify(Exception("unknown error: net::ERR_NAME_RESOLUTION_FAILED")).code == DNS_TEMPORARY_FAILURE
+
+
+def test_unknown_name_is_permanent():
+    error = classify(requests.exceptions.ConnectionError(NXDOMAIN))
+    assert error.code == DNS_FAILURE
+    assert not error.transient
+    assert classify(Exception("unknown error: net::ERR_NAME_NOT_RESOLVED")).code == DNS_FAILURE
+
+
+def test_other_resolution_errors_fall_back_to_connection_errors():
+    message = TEMPORARY.replace("[Errno -3] Temporary failure in name resolution", "[Errno -11] System error")
+    assert classify(requests.exceptions.ConnectionError(message)).code == CONNECTION_RESET
+
+
+def test_one_resolver_hiccup_does_not_open_the_circuit():
+    breakers = CircuitBreakers(failure_threshold=3, cooldown=60)
+    breakers.record_failure("https://example.com/", classify(requests.exceptions.ConnectionError(TEMPORARY)))
+    breakers.check("https://example.com/")
+
+    breakers.record_failure("https://example.com/", ScrapeError(DNS_FAILURE, NXDOMAIN))
+    with pytest.raises(ScrapeError) as raised:
+        breakers.check("https://example.com/")
+    assert raised.value.code == CIRCUIT_OPEN
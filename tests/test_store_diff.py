@@ -0,0 +1,51 @@
+import functools
+import http.server
+import threading
+
+import pytest
+
+import app
+from result_store import ResultStore
+
+PAGE = "<html><head><title>Monitor</title></head><body><ul>{}</ul></body></html>"
+
+
+@pytest.fixture
+def site(tmp_path):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def publish(*items):
+        (tmp_path / 'page.html').write_text(PAGE.format(''.join(f"<li>{item}</li>" for item in items)))
+        return f"http://127.0.0.1:{server.server_port}/page.html"
+
+    yield publish
+    server.shutdown()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'result_store', ResultStore(str(tmp_path / 'results.sqlite3')))
+    return app.app.test_client()
+
+
+def scrape(client, url, **fields):
+    body = dict(url=url, scrapingType='custom', customSelector='li', render=False, **fields)
+    response = client.post('/api/scrape', json=body)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_diff_sees_a_change_within_the_cache_ttl(site, client):
+    url = site("one", "two")
+    assert scrape(client, url)["data"] == ["one", "two"]  # Cached for CACHE_TTL
+    scrape(client, url, store=True)
+
+    site("one", "two", "three")
+    diff = scrape(client, url, diff=True)
+    assert diff["changes"]["changed"]
+    assert diff["data"] == ["three"]
+    assert diff["removed"] == []
+    assert diff.get("cache") != "hit"
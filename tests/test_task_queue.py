@@ -0,0 +1,218 @@
+"""Task queue behaviour shared by the SQLite and Redis backends.
+
+The Redis backend runs against fakeredis (with lupa for the Lua scripts)
+and is skipped when they are not installed. Both backends take the time
+from task_queue.time, so a fake clock drives lease expiry and retries.
+"""
+import types
+
+import pytest
+
+import task_queue
+from jobs import CANCELLED, EXPIRED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobFailed, QueueFull
+from scrape_worker import ScrapeWorker
+from task_queue import LEASE_LOST_ERROR, RedisTaskQueue, SqliteTaskQueue
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(task_queue, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def redis_queue(monkeypatch, capacity):
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, 'from_url',
+                        classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)))
+    return RedisTaskQueue('redis://stand-in:6379/0', capacity=capacity, result_ttl=900)
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def make_queue(request, tmp_path, monkeypatch, clock):
+    queues = []
+
+    def make(capacity=10):
+        if request.param == 'sqlite':
+            queue = SqliteTaskQueue(str(tmp_path / 'tasks.sqlite3'), capacity=capacity, result_ttl=900)
+        else:
+            queue = redis_queue(monkeypatch, capacity)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def test_lease_hands_out_each_task_once(make_queue, clock):
+    queue = make_queue()
+    first = queue.submit({"url": "https://a.example"}, summary={"url": "https://a.example"})
+    clock.advance(0.001)
+    second = queue.submit({"url": "https://b.example"})
+
+    leased = queue.lease("w1", visibility_timeout=30)
+    assert leased.id == first.id
+    assert leased.status == RUNNING
+    assert leased.attempts == 1
+    assert leased.worker == "w1"
+    assert leased.payload == {"url": "https://a.example"}
+    assert queue.lease("w2", visibility_timeout=30).id == second.id
+    assert queue.lease("w3", visibility_timeout=30) is None
+
+
+def test_extend_keeps_the_lease_past_its_timeout(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1})
+    leased = queue.lease("w1", visibility_timeout=10)
+
+    clock.advance(8)
+    assert queue.extend(task.id, leased.token, visibility_timeout=10)
+    clock.advance(8)
+    assert queue.lease("w2", visibility_timeout=10) is None
+    assert queue.get(task.id).status == RUNNING
+    assert not queue.extend(task.id, "not-the-token", visibility_timeout=10)
+
+
+def test_expired_lease_requeues_the_task(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, max_attempts=3)
+    stale = queue.lease("w1", visibility_timeout=10)
+
+    clock.advance(11)
+    redelivered = queue.lease("w2", visibility_timeout=10)
+    assert redelivered.id == task.id
+    assert redelivered.attempts == 2
+    assert redelivered.worker == "w2"
+    assert redelivered.token != stale.token
+    # The first worker lost its lease: it can neither renew nor fail the task
+    assert not queue.extend(task.id, stale.token, visibility_timeout=10)
+    assert queue.fail(task.id, stale.token, {"error": "boom"}, retry_delay=0) is None
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_task(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, max_attempts=1)
+    queue.lease("w1", visibility_timeout=10)
+
+    clock.advance(11)
+    assert queue.lease("w2", visibility_timeout=10) is None
+    failed = queue.get(task.id)
+    assert failed.status == FAILED
+    assert failed.error == LEASE_LOST_ERROR
+
+
+def test_task_past_its_deadline_expires(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, deadline=5)
+
+    clock.advance(6)
+    assert queue.lease("w1", visibility_timeout=10) is None
+    assert queue.get(task.id).status == EXPIRED
+
+
+def test_fail_with_retry_delay_requeues_after_the_delay(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, max_attempts=2)
+    leased = queue.lease("w1", visibility_timeout=10)
+
+    assert queue.fail(task.id, leased.token, {"error": "503", "retryable": True}, retry_delay=5) == QUEUED
+    assert queue.get(task.id).status == QUEUED
+    assert queue.lease("w1", visibility_timeout=10) is None
+    clock.advance(5)
+    retried = queue.lease("w1", visibility_timeout=10)
+    assert retried.attempts == 2
+
+    # Out of attempts: the failure is final whatever the delay
+    assert queue.fail(task.id, retried.token, {"error": "503"}, retry_delay=5) == FAILED
+    assert queue.get(task.id).error == {"error": "503"}
+
+
+def test_fail_without_retry_delay_is_final(make_queue):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, max_attempts=3)
+    leased = queue.lease("w1", visibility_timeout=10)
+
+    assert queue.fail(task.id, leased.token, {"error": "bad selector"}) == FAILED
+    assert queue.get(task.id).status == FAILED
+
+
+def test_first_completion_wins(make_queue, clock):
+    queue = make_queue()
+    task = queue.submit({"n": 1})
+    slow = queue.lease("w1", visibility_timeout=10)
+    clock.advance(11)
+    fast = queue.lease("w2", visibility_timeout=10)
+
+    assert queue.complete(task.id, fast.token, {"count": 2})
+    assert not queue.complete(task.id, slow.token, {"count": 1})
+    done = queue.get(task.id)
+    assert done.status == SUCCEEDED
+    assert done.result == {"count": 2}
+    assert done.finished_at == clock.now
+
+
+def test_cancel_stops_queued_and_running_tasks(make_queue):
+    queue = make_queue()
+    waiting = queue.submit({"n": 1})
+    assert queue.cancel(waiting.id).status == CANCELLED
+    assert queue.lease("w1", visibility_timeout=10) is None
+
+    running = queue.submit({"n": 2})
+    leased = queue.lease("w1", visibility_timeout=10)
+    assert queue.cancel(running.id).status == CANCELLED
+    # The worker notices at its next renewal, and its result is dropped
+    assert not queue.extend(running.id, leased.token, visibility_timeout=10)
+    assert not queue.complete(running.id, leased.token, {"count": 1})
+    assert queue.get(running.id).status == CANCELLED
+    assert queue.cancel("unknown") is None
+
+
+def test_capacity_counts_waiting_tasks(make_queue, clock):
+    queue = make_queue(capacity=2)
+    first = queue.submit({"n": 1})
+    clock.advance(0.001)
+    queue.submit({"n": 2})
+    with pytest.raises(QueueFull):
+        queue.submit({"n": 3})
+
+    # A leased task no longer waits, so it frees a slot
+    assert queue.lease("w1", visibility_timeout=10).id == first.id
+    queue.submit({"n": 3})
+
+
+def test_worker_retries_retryable_failures_then_completes(make_queue):
+    queue = make_queue()
+    task = queue.submit({"n": 1}, max_attempts=3)
+    outcomes = [JobFailed({"error": "503", "code": "HTTP_503", "retryable": True}), {"count": 1}]
+
+    def runner(task, state):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    worker = ScrapeWorker(queue, runner, visibility_timeout=30,
+                          retry_policy=types.SimpleNamespace(backoff=lambda attempt: 0))
+    worker._run(queue.lease("w1", visibility_timeout=30), None)
+    assert queue.get(task.id).status == QUEUED
+    worker._run(queue.lease("w1", visibility_timeout=30), None)
+    done = queue.get(task.id)
+    assert done.status == SUCCEEDED
+    assert done.attempts == 2
+    assert (worker.completed, worker.failed) == (1, 0)
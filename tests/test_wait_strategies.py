@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from selenium.common.exceptions import TimeoutException
+
+from wait_strategies import wait_for_dom_quiescence
+
+
+class FakeDriver:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.timeouts = SimpleNamespace(script=30)
+        self.script_timeout_during_wait = None
+
+    def set_script_timeout(self, seconds):
+        self.timeouts.script = seconds
+
+    def execute_async_script(self, script, *args):
+        self.script_timeout_during_wait = self.timeouts.script
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def test_quiescence_wait_restores_the_script_timeout():
+    driver = FakeDriver(True)
+    assert wait_for_dom_quiescence(driver, 0.5, 10)
+    assert driver.script_timeout_during_wait == 15
+    assert driver.timeouts.script == 30
+
+
+def test_script_timeout_is_restored_after_a_timed_out_wait():
+    driver = FakeDriver(TimeoutException("timed out"))
+    assert not wait_for_dom_quiescence(driver, 0.5, 10)
+    assert driver.timeouts.script == 30
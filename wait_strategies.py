@@ -0,0 +1,182 @@
+"""Readiness-based waiting for browser navigations.
+
+Replaces fixed sleeps with a wait that finishes as soon as the page is ready
+by one of these measures:
+
+- ``domcontentloaded``: the document has been parsed
+- ``load``: the load event has fired
+- ``networkidle``: no more than ``max_inflight`` requests in flight for
+  ``idle_time`` seconds, observed through CDP ``Network`` events
+- ``selector``: an element matching a CSS selector is present
+- ``mutations``: the DOM stopped changing for ``quiet_window`` seconds
+
+A wait that runs out of time is not an error; the page is scraped as it is
+and the timeout is reported with the timings. Selenium's wait helpers are
+only imported by the waits that use them.
+"""
+import json
+import logging
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger(__name__)
+
+WAIT_STRATEGIES = ('domcontentloaded', 'load', 'networkidle', 'selector', 'mutations')
+
+NETWORK_START_EVENTS = ('Network.requestWillBeSent',)
+NETWORK_END_EVENTS = ('Network.loadingFinished', 'Network.loadingFailed')
+
+MUTATION_QUIESCENCE_JS = """
+const [quietMs, timeoutMs, done] = arguments;
+const started = performance.now();
+let last = started;
+const observer = new MutationObserver(() => { last = performance.now(); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+const check = () => {
+    const now = performance.now();
+    if (now - last >= quietMs || now - started >= timeoutMs) {
+        observer.disconnect();
+        done(now - last >= quietMs);
+    } else {
+        setTimeout(check, Math.min(50, quietMs));
+    }
+};
+setTimeout(check, Math.min(50, quietMs));
+"""
+
+
+class WaitStrategy:
+    """How to decide that a navigated page is ready to be scraped"""
+
+    def __init__(self, kind='domcontentloaded', selector=None, timeout=15.0,
+                 idle_time=0.5, max_inflight=0, quiet_window=0.5):
+        if kind not in WAIT_STRATEGIES:
+            raise ValueError(f"Invalid wait strategy: {kind}")
+        if kind == 'selector' and not selector:
+            raise ValueError("The selector wait strategy needs a waitSelector")
+        self.kind = kind
+        self.selector = selector
+        self.timeout = timeout
+        self.idle_time = idle_time
+        self.max_inflight = max_inflight
+        self.quiet_window = quiet_window
+
+    @classmethod
+    def from_request(cls, data, default_kind='domcontentloaded', default_timeout=15.0):
+        """Build a strategy from /api/scrape request fields"""
+        kind = data.get('waitStrategy') or default_kind
+        timeout = float(data.get('waitTimeout') or default_timeout)
+        return cls(kind, selector=data.get('waitSelector'), timeout=timeout)
+
+    @property
+    def uses_network_events(self):
+        return self.kind == 'networkidle'
+
+    def before_navigation(self, driver):
+        """Drop buffered network events from earlier navigations"""
+        if self.uses_network_events:
+            drain_network_events(driver)
+
+    def wait(self, driver):
+        """Block until the page is ready; returns False if the wait timed out"""
+        if self.kind == 'domcontentloaded':
+            return wait_for_ready_state(driver, ('interactive', 'complete'), self.timeout)
+        if self.kind == 'load':
+            return wait_for_ready_state(driver, ('complete',), self.timeout)
+        if self.kind == 'networkidle':
+            return wait_for_network_idle(driver, self.timeout, self.idle_time, self.max_inflight)
+        if self.kind == 'selector':
+            return wait_for_selector(driver, self.selector, self.timeout)
+        return wait_for_dom_quiescence(driver, self.quiet_window, self.timeout)
+
+
+def wait_for_ready_state(driver, states, timeout):
+    """Wait for document.readyState to reach one of the given states"""
+    from selenium.webdriver.support.ui import WebDriverWait
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+            lambda d: d.execute_script("return document.readyState") in states
+        )
+        return True
+    except TimeoutException:
+        logger.warning(f"Timed out waiting for readyState {states}")
+        return False
+
+
+def wait_for_selector(driver, selector, timeout):
+    """Wait for an element matching a CSS selector to be present"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        return True
+    except TimeoutException:
+        logger.warning(f"Timed out waiting for selector '{selector}'")
+        return False
+
+
+def wait_for_dom_quiescence(driver, quiet_window, timeout):
+    """Wait until no DOM mutations happened for quiet_window seconds"""
+    # The driver is shared with later scripts, so only this one gets the longer timeout
+    previous_timeout = driver.timeouts.script
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return bool(driver.execute_async_script(
+            MUTATION_QUIESCENCE_JS, int(quiet_window * 1000), int(timeout * 1000)
+        ))
+    except TimeoutException:
+        logger.warning("Timed out waiting for DOM mutations to settle")
+        return False
+    finally:
+        driver.set_script_timeout(previous_timeout)
+
+
+def drain_network_events(driver):
+    """Read and discard the buffered performance log"""
+    try:
+        driver.get_log('performance')
+    except Exception as e:
+        logger.debug(f"Performance log unavailable: {e}")
+
+
+def wait_for_network_idle(driver, timeout, idle_time=0.5, max_inflight=0):
+    """Track CDP Network events from the performance log until traffic settles"""
+    inflight = set()
+    deadline = time.monotonic() + timeout
+    idle_since = None
+
+    while time.monotonic() < deadline:
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            logger.warning(f"Performance log unavailable, falling back to load event: {e}")
+            return wait_for_ready_state(driver, ('complete',), max(0.0, deadline - time.monotonic()))
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            request_id = message.get('params', {}).get('requestId')
+            if method in NETWORK_START_EVENTS:
+                inflight.add(request_id)
+            elif method in NETWORK_END_EVENTS:
+                inflight.discard(request_id)
+
+        now = time.monotonic()
+        if len(inflight) <= max_inflight:
+            if idle_since is None:
+                idle_since = now
+            elif now - idle_since >= idle_time:
+                return True
+        else:
+            idle_since = None
+        time.sleep(0.05)
+
+    logger.warning(f"Timed out waiting for network idle ({len(inflight)} request(s) in flight)")
+    return False